@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, rfps, offers, users, organizations, products, orders, pools, ai_concierge
+from app.api.v1.endpoints import auth, rfps, offers, users, organizations, products, orders, payments, pools, ai_concierge
 
 api_router = APIRouter()
 
@@ -11,5 +11,6 @@ api_router.include_router(rfps.router, prefix="/rfps", tags=["rfps"])
 api_router.include_router(offers.router, prefix="/rfps", tags=["offers"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
+api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
 api_router.include_router(pools.router, prefix="/pools", tags=["pools"])
 api_router.include_router(ai_concierge.router, prefix="/ai-concierge", tags=["ai-concierge"])
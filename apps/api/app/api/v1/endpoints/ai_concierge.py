@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+import json
 
 from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.security import get_current_user, resolve_user_from_token
+from app.models.rfp import RFP
 from app.models.user import User
 from app.services.ai_concierge_service import ai_concierge
+from app.services.offer_analysis import offer_analyzer
 
 router = APIRouter()
 
@@ -14,31 +18,40 @@ class ConciergeMessage(BaseModel):
     message: str
     context: Optional[Dict[str, Any]] = None
 
+class OfferAnalysisRequest(BaseModel):
+    offer_id: str
+
+class RFPOffersAnalysisRequest(BaseModel):
+    rfp_id: str
+
 class ConciergeResponse(BaseModel):
     content: str
     type: str
     suggestions: list
     timestamp: str
+    prompt_usage: Optional[Dict[str, int]] = None
+
+def _build_context(user: User, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the concierge context from user data plus any request context"""
+    context = {
+        "user_role": user.role.value,
+        "user_id": str(user.id),
+        "organization_id": str(user.organization_id) if user.organization_id else None
+    }
+    if extra:
+        context.update(extra)
+    return context
 
 @router.post("/chat", response_model=ConciergeResponse)
 async def chat_with_concierge(
     message_data: ConciergeMessage,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Chat with the AI concierge"""
     
     try:
-        # Build context from user data
-        context = {
-            "user_role": current_user.role.value,
-            "user_id": str(current_user.id),
-            "organization_id": str(current_user.organization_id) if current_user.organization_id else None
-        }
-        
-        # Add any additional context from the request
-        if message_data.context:
-            context.update(message_data.context)
+        context = _build_context(current_user, message_data.context)
         
         # Process the message
         response = await ai_concierge.process_message(
@@ -52,6 +65,70 @@ async def chat_with_concierge(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+@router.post("/chat/stream")
+async def stream_chat_with_concierge(
+    message_data: ConciergeMessage,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Chat with the AI concierge, streaming tokens as Server-Sent Events"""
+    context = _build_context(current_user, message_data.context)
+    
+    # Release the request's connection; generation can take a while
+    await db.close()
+    
+    async def events():
+        async for event in ai_concierge.stream_message(
+            user_id=context["user_id"],
+            message=message_data.message,
+            context=context
+        ):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.websocket("/chat/ws")
+async def concierge_websocket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """Chat with the AI concierge over a WebSocket.
+
+    Browsers cannot set headers on a WebSocket handshake, so the access
+    token comes as a query parameter. Each client message is a JSON
+    ConciergeMessage and is answered with token events and a done event.
+    """
+    try:
+        # The chat that follows writes to the user's history
+        user = await resolve_user_from_token(token, db, revalidate=True)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    context = _build_context(user)
+    
+    # The socket may stay open for a long time; don't hold a connection for it
+    await db.close()
+    
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                message_data = ConciergeMessage(**await websocket.receive_json())
+            except (TypeError, ValueError, ValidationError):
+                await websocket.send_json({"type": "error", "content": "Invalid message"})
+                continue
+            
+            async for event in ai_concierge.stream_message(
+                user_id=context["user_id"],
+                message=message_data.message,
+                context={**context, **(message_data.context or {})}
+            ):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/templates/{category}")
 async def get_rfp_template(
     category: str,
@@ -68,17 +145,37 @@ async def get_rfp_template(
 
 @router.post("/analyze-offer")
 async def analyze_offer(
-    offer_data: Dict[str, Any],
-    current_user: User = Depends(get_current_user)
+    request: OfferAnalysisRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Analyze an offer and provide insights"""
+    """Analyze an offer against its market and seller history (buyer or seller)"""
+    row = await offer_analyzer.load_offer(db, request.offer_id, current_user.id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Offer not found")
     
-    try:
-        analysis = await ai_concierge.analyze_offer(offer_data)
-        return analysis
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing offer: {str(e)}")
+    # Only the buyer or seller can see the analysis
+    if not (row.is_seller or row.is_buyer):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return offer_analyzer.analyze(row)
+
+@router.post("/analyze-offers")
+async def analyze_offers(
+    request: RFPOffersAnalysisRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Analyze every offer on an RFP side by side (buyer only)"""
+    rfp = await db.get(RFP, request.rfp_id)
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    
+    if rfp.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the buyer can compare offers on this RFP")
+    
+    analyses = await offer_analyzer.analyze_rfp(db, request.rfp_id)
+    return {"rfp_id": request.rfp_id, "offers": analyses}
 
 @router.delete("/clear-history")
 async def clear_conversation_history(
@@ -87,7 +184,7 @@ async def clear_conversation_history(
     """Clear the user's conversation history"""
     
     try:
-        ai_concierge.clear_conversation_history(str(current_user.id))
+        await ai_concierge.clear_conversation_history(str(current_user.id))
         return {"message": "Conversation history cleared successfully"}
         
     except Exception as e:
@@ -1,15 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, exists
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
-from app.models.rfp import RFP
+from app.models.rfp import RFP, RFPStatus
 from app.models.offer import Offer
+from app.models.order import Order
 from app.schemas.offer import OfferCreate, OfferResponse
 from app.services.ai_service import suggest_counteroffer
+from app.services.market_stats import market_stats
 
 router = APIRouter()
 
@@ -18,15 +21,27 @@ async def create_offer(
     rfp_id: str,
     offer_data: OfferCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Submit an offer for an RFP"""
+    # Load the RFP state and any existing offer by this seller in one query
+    result = await db.execute(
+        select(
+            RFP.status,
+            RFP.buyer_id,
+            exists().where(
+                Offer.rfp_id == RFP.id,
+                Offer.seller_id == current_user.id
+            ).label("already_offered")
+        ).where(RFP.id == rfp_id)
+    )
+    rfp = result.first()
+    
     # Check if RFP exists and is published
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
-    if rfp.status != "published":
+    if rfp.status != RFPStatus.PUBLISHED:
         raise HTTPException(status_code=400, detail="Can only submit offers to published RFPs")
     
     # Check if user is not the buyer
@@ -34,12 +49,7 @@ async def create_offer(
         raise HTTPException(status_code=400, detail="Buyers cannot submit offers to their own RFPs")
     
     # Check if user already submitted an offer
-    existing_offer = db.query(Offer).filter(
-        Offer.rfp_id == rfp_id,
-        Offer.seller_id == current_user.id
-    ).first()
-    
-    if existing_offer:
+    if rfp.already_offered:
         raise HTTPException(status_code=400, detail="You have already submitted an offer for this RFP")
     
     # Create the offer
@@ -53,8 +63,8 @@ async def create_offer(
     )
     
     db.add(offer)
-    db.commit()
-    db.refresh(offer)
+    await db.commit()
+    await db.refresh(offer)
     
     return OfferResponse.from_orm(offer)
 
@@ -62,11 +72,11 @@ async def create_offer(
 async def list_offers(
     rfp_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """List all offers for an RFP"""
     # Check if RFP exists
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+    rfp = await db.get(RFP, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -74,7 +84,8 @@ async def list_offers(
     if rfp.buyer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Only the buyer can view offers")
     
-    offers = db.query(Offer).filter(Offer.rfp_id == rfp_id).all()
+    result = await db.execute(select(Offer).where(Offer.rfp_id == rfp_id))
+    offers = result.scalars().all()
     return [OfferResponse.from_orm(offer) for offer in offers]
 
 @router.get("/offers/my", response_model=List[OfferResponse])
@@ -82,65 +93,100 @@ async def list_my_offers(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """List offers submitted by the current user"""
-    offers = db.query(Offer).filter(
-        Offer.seller_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(Offer).where(
+            Offer.seller_id == current_user.id
+        ).offset(skip).limit(limit)
+    )
+    offers = result.scalars().all()
     
     return [OfferResponse.from_orm(offer) for offer in offers]
 
+def _offer_access_query(offer_id: str, user_id, *columns):
+    """Select the given columns for an offer joined to its RFP, with the
+    caller's relationship to the offer computed in SQL"""
+    return (
+        select(
+            *columns,
+            (Offer.seller_id == user_id).label("is_seller"),
+            (RFP.buyer_id == user_id).label("is_buyer"),
+        )
+        .select_from(Offer)
+        .join(RFP, RFP.id == Offer.rfp_id)
+        .where(Offer.id == offer_id)
+    )
+
 @router.get("/offers/{offer_id}", response_model=OfferResponse)
 async def get_offer(
     offer_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific offer"""
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
+    result = await db.execute(_offer_access_query(offer_id, current_user.id, Offer))
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Offer not found")
     
     # Check if user can view this offer
-    rfp = db.query(RFP).filter(RFP.id == offer.rfp_id).first()
-    if not rfp:
-        raise HTTPException(status_code=404, detail="RFP not found")
-    
-    if offer.seller_id != current_user.id and rfp.buyer_id != current_user.id:
+    if not (row.is_seller or row.is_buyer):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    return OfferResponse.from_orm(offer)
+    return OfferResponse.from_orm(row.Offer)
+
+def _rfp_open(rfp_id_column):
+    """Correlated check that an offer's RFP still takes changes"""
+    return exists().where(RFP.id == rfp_id_column, RFP.status == RFPStatus.PUBLISHED)
+
+async def _explain_offer_conflict(db: AsyncSession, offer_id: str, user_id, role: str, action: str):
+    """Work out why a conditional write on an offer matched no row"""
+    result = await db.execute(
+        _offer_access_query(offer_id, user_id, Offer.status, RFP.status.label("rfp_status"))
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    if not getattr(row, f"is_{role}"):
+        raise HTTPException(status_code=403, detail=f"Only the {role} can {action} this offer")
+    if row.rfp_status != RFPStatus.PUBLISHED:
+        raise HTTPException(status_code=400, detail=f"Cannot {action} offer for closed RFP")
+    raise HTTPException(status_code=409, detail=f"Cannot {action} an offer that is {row.status}")
 
 @router.put("/offers/{offer_id}", response_model=OfferResponse)
 async def update_offer(
     offer_id: str,
     offer_data: OfferCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an offer"""
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    
-    # Only the seller can update their offer
-    if offer.seller_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Only the seller can update this offer")
-    
-    # Check if RFP is still accepting offers
-    rfp = db.query(RFP).filter(RFP.id == offer.rfp_id).first()
-    if rfp.status != "published":
-        raise HTTPException(status_code=400, detail="Cannot update offer for closed RFP")
-    
-    # Update fields
-    offer.price = offer_data.price
-    offer.description = offer_data.description
-    offer.delivery_time = offer_data.delivery_time
-    offer.updated_at = datetime.utcnow()
+    # Conditional on the offer still being pending, so an edit can never
+    # land after (or during) the buyer accepting it
+    result = await db.execute(
+        update(Offer)
+        .where(
+            Offer.id == offer_id,
+            Offer.seller_id == current_user.id,
+            Offer.status == "pending",
+            _rfp_open(Offer.rfp_id),
+        )
+        .values(
+            price=offer_data.price,
+            description=offer_data.description,
+            delivery_time=offer_data.delivery_time,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(Offer)
+        .execution_options(synchronize_session=False)
+    )
+    offer = result.scalar_one_or_none()
+    if offer is None:
+        await _explain_offer_conflict(db, offer_id, current_user.id, "seller", "update")
     
-    db.commit()
-    db.refresh(offer)
+    await db.commit()
     
     return OfferResponse.from_orm(offer)
 
@@ -148,24 +194,23 @@ async def update_offer(
 async def delete_offer(
     offer_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete an offer"""
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    
-    # Only the seller can delete their offer
-    if offer.seller_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Only the seller can delete this offer")
-    
-    # Check if RFP is still accepting offers
-    rfp = db.query(RFP).filter(RFP.id == offer.rfp_id).first()
-    if rfp.status != "published":
-        raise HTTPException(status_code=400, detail="Cannot delete offer for closed RFP")
+    result = await db.execute(
+        delete(Offer)
+        .where(
+            Offer.id == offer_id,
+            Offer.seller_id == current_user.id,
+            Offer.status == "pending",
+            _rfp_open(Offer.rfp_id),
+        )
+        .returning(Offer.id)
+    )
+    if result.first() is None:
+        await _explain_offer_conflict(db, offer_id, current_user.id, "seller", "delete")
     
-    db.delete(offer)
-    db.commit()
+    await db.commit()
     
     return {"message": "Offer deleted successfully"}
 
@@ -173,65 +218,97 @@ async def delete_offer(
 async def accept_offer(
     offer_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Accept an offer (buyer only)"""
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    
-    rfp = db.query(RFP).filter(RFP.id == offer.rfp_id).first()
-    if not rfp:
-        raise HTTPException(status_code=404, detail="RFP not found")
-    
-    # Only the buyer can accept offers
-    if rfp.buyer_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Only the buyer can accept offers")
-    
-    # Check if RFP is still open
-    if rfp.status != "published":
-        raise HTTPException(status_code=400, detail="Cannot accept offer for closed RFP")
+    # Rolling back expires the session's objects, so keep the id around
+    buyer_id = current_user.id
+    now = datetime.utcnow()
+    
+    # Award the RFP only if it is still published and belongs to the caller.
+    # The row lock taken here serializes concurrent accepts: the loser
+    # re-evaluates the WHERE clause after the winner commits and matches nothing.
+    result = await db.execute(
+        update(RFP)
+        .where(
+            RFP.id == select(Offer.rfp_id).where(Offer.id == offer_id).scalar_subquery(),
+            RFP.status == RFPStatus.PUBLISHED,
+            RFP.buyer_id == buyer_id,
+        )
+        .values(status=RFPStatus.AWARDED, awarded_offer_id=offer_id, updated_at=now)
+        .returning(RFP.id, RFP.category)
+    )
+    awarded = result.first()
+    if awarded is None:
+        await _explain_offer_conflict(db, offer_id, buyer_id, "buyer", "accept")
+    
+    # Price and seller are read under the offer's row lock, so a concurrent
+    # edit either finished before this point or is rejected afterwards
+    result = await db.execute(
+        update(Offer)
+        .where(Offer.id == offer_id, Offer.status == "pending")
+        .values(status="accepted", updated_at=now)
+        .returning(Offer.price, Offer.seller_id)
+    )
+    accepted = result.first()
+    if accepted is None:
+        await db.rollback()
+        await _explain_offer_conflict(db, offer_id, buyer_id, "buyer", "accept")
+    
+    # Reject every other open offer on the RFP in one statement
+    await db.execute(
+        update(Offer)
+        .where(Offer.rfp_id == awarded.id, Offer.id != offer_id, Offer.status == "pending")
+        .values(status="rejected", updated_at=now)
+    )
     
-    # Update RFP status to awarded
-    rfp.status = "awarded"
-    rfp.awarded_offer_id = offer.id
-    rfp.updated_at = datetime.utcnow()
+    order = Order(
+        rfp_id=awarded.id,
+        offer_id=offer_id,
+        buyer_id=buyer_id,
+        seller_id=accepted.seller_id,
+        amount=accepted.price,
+    )
+    db.add(order)
     
-    # Update offer status to accepted
-    offer.status = "accepted"
-    offer.updated_at = datetime.utcnow()
+    # Commits or rolls back together with the acceptance
+    await market_stats.record(db, awarded.category, accepted.price)
     
-    db.commit()
+    await db.commit()
     
-    return {"message": "Offer accepted successfully"}
+    return {"message": "Offer accepted successfully", "order_id": str(order.id)}
 
 @router.get("/offers/{offer_id}/suggestions")
 async def get_offer_suggestions(
     offer_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get AI suggestions for offer negotiation"""
-    offer = db.query(Offer).filter(Offer.id == offer_id).first()
-    if not offer:
+    result = await db.execute(
+        _offer_access_query(offer_id, current_user.id, Offer.price, RFP.budget_min, RFP.budget_max, RFP.category)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Offer not found")
     
-    rfp = db.query(RFP).filter(RFP.id == offer.rfp_id).first()
-    if not rfp:
-        raise HTTPException(status_code=404, detail="RFP not found")
-    
     # Only the buyer or seller can get suggestions
-    if offer.seller_id != current_user.id and rfp.buyer_id != current_user.id:
+    if not (row.is_seller or row.is_buyer):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get market average (simplified - in real app, this would query historical data)
-    market_average = (rfp.budget_min + rfp.budget_max) / 2 if rfp.budget_min and rfp.budget_max else offer.price
+    # Prefer what the category actually trades at; fall back to the RFP budget
+    stats = await market_stats.get(db, row.category)
+    if stats:
+        market_average = stats["mean"]
+    else:
+        market_average = (row.budget_min + row.budget_max) / 2 if row.budget_min and row.budget_max else row.price
     
     # Generate AI suggestions
     suggestions = await suggest_counteroffer(
-        buyer_offer=offer.price,
-        seller_original=offer.price,
-        market_average=market_average
+        buyer_offer=row.price,
+        seller_original=row.price,
+        market_average=market_average,
+        market_stats=stats
     )
     
     return suggestions
@@ -1,13 +1,196 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Optional
+from datetime import datetime
+import enum
+import hashlib
+import json
+import uuid
+
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.core.pagination import encode_cursor, decode_timestamp_cursor
+from app.models.user import User
+from app.models.order import Order, OrderStatus
+from app.models.product import Product, ProductVariant
+from app.models.inventory import StockReservation, ReservationStatus
+from app.schemas.order import OrderCreate, OrderResponse, OrderListResponse, OrderDetailResponse
+from app.services.inventory import inventory
 
 router = APIRouter()
 
-@router.get("/")
-async def list_orders():
-    """List orders - TODO: Implement"""
-    return {"message": "Orders endpoint - coming soon"}
+class OrderRole(str, enum.Enum):
+    BUYER = "buyer"
+    SELLER = "seller"
+
+def _fingerprint(order_data: OrderCreate) -> str:
+    """Hash of a create request, to tell a retry from a reused key"""
+    payload = json.dumps(order_data.dict(), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def _replay(db: AsyncSession, buyer_id, idempotency_key: str, fingerprint: str, response: Response):
+    """The order an earlier request with this key created, or None"""
+    result = await db.execute(
+        select(Order).where(Order.buyer_id == buyer_id, Order.idempotency_key == idempotency_key)
+    )
+    order = result.scalar_one_or_none()
+    if order is None:
+        return None
+    
+    if order.request_fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different order")
+    
+    response.headers["Idempotent-Replayed"] = "true"
+    return OrderResponse.from_orm(order)
+
+@router.get("/", response_model=OrderListResponse)
+async def list_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    role: OrderRole = OrderRole.BUYER,
+    status: Optional[OrderStatus] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the caller's orders as buyer or seller, newest first, paginated by cursor"""
+    party = Order.buyer_id if role == OrderRole.BUYER else Order.seller_id
+    query = select(Order).where(party == current_user.id)
+    
+    # Apply filters
+    if status:
+        query = query.where(Order.status == status)
+    if cursor:
+        query = query.where(tuple_(Order.created_at, Order.id) < decode_timestamp_cursor(cursor))
+    
+    result = await db.execute(query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1))
+    orders = result.scalars().all()
+    
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+    
+    return OrderListResponse(
+        items=[OrderResponse.from_orm(order) for order in orders],
+        next_cursor=next_cursor
+    )
+
+@router.post("/", response_model=OrderResponse)
+async def create_order(
+    order_data: OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Check out held stock reservations as one order.
+    
+    Sending an Idempotency-Key makes the request safe to retry: a repeat
+    with the same key returns the order the first one created.
+    """
+    fingerprint = _fingerprint(order_data)
+    
+    # Retries usually arrive after the first request finished
+    if idempotency_key:
+        replayed = await _replay(db, current_user.id, idempotency_key, fingerprint, response)
+        if replayed:
+            return replayed
+    
+    # Price the reservations; committing them below re-checks they are still held
+    try:
+        reservation_ids = [uuid.UUID(reservation_id) for reservation_id in order_data.reservation_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid reservation id")
+    result = await db.execute(
+        select(
+            Product.seller_id,
+            func.sum(
+                StockReservation.quantity
+                * (Product.base_price + func.coalesce(ProductVariant.price_adjustment, 0.0))
+            ).label("amount"),
+            func.count().label("reservations"),
+        )
+        .select_from(StockReservation)
+        .join(Product, Product.id == StockReservation.product_id)
+        .outerjoin(ProductVariant, ProductVariant.id == StockReservation.variant_id)
+        .where(
+            StockReservation.id.in_(reservation_ids),
+            StockReservation.user_id == current_user.id,
+            StockReservation.status == ReservationStatus.HELD,
+        )
+        .group_by(Product.seller_id)
+    )
+    sellers = result.all()
+    if len(sellers) > 1:
+        raise HTTPException(status_code=400, detail="An order can only hold one seller's products")
+    if not sellers or sellers[0].reservations != len(reservation_ids):
+        # A concurrent request with the same key may have just checked them out
+        if idempotency_key:
+            replayed = await _replay(db, current_user.id, idempotency_key, fingerprint, response)
+            if replayed:
+                return replayed
+        raise HTTPException(status_code=409, detail="Some reservations are no longer held")
+    
+    # A concurrent request with the same key waits on the unique index here
+    # and, once the first one commits, inserts nothing
+    order_id = uuid.uuid4()
+    now = datetime.utcnow()
+    result = await db.execute(
+        insert(Order)
+        .values(
+            id=order_id,
+            buyer_id=current_user.id,
+            seller_id=sellers[0].seller_id,
+            amount=round(sellers[0].amount, 2),
+            delivery_deadline=order_data.delivery_deadline,
+            notes=order_data.notes,
+            idempotency_key=idempotency_key,
+            request_fingerprint=fingerprint,
+            created_at=now,
+            updated_at=now,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[Order.buyer_id, Order.idempotency_key],
+            index_where=Order.idempotency_key.isnot(None),
+        )
+        .returning(Order.id)
+    )
+    if result.first() is None:
+        await db.rollback()
+        return await _replay(db, current_user.id, idempotency_key, fingerprint, response)
+    
+    # All reservations become sales or none do
+    committed = await inventory.commit(db, reservation_ids, current_user.id, order_id)
+    if len(committed) != len(reservation_ids):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Some reservations are no longer held")
+    
+    await db.commit()
+    
+    return OrderResponse.from_orm(await db.get(Order, order_id))
 
-@router.post("/")
-async def create_order():
-    """Create order - TODO: Implement"""
-    return {"message": "Create order - coming soon"}
+@router.get("/{order_id}", response_model=OrderDetailResponse)
+async def get_order(
+    order_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get an order with its offer and RFP"""
+    # The offer and RFP come back joined onto the order row
+    result = await db.execute(
+        select(Order)
+        .options(joinedload(Order.offer), joinedload(Order.rfp))
+        .where(Order.id == order_id)
+    )
+    order = result.scalar_one_or_none()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    # Only the buyer or seller can view the order
+    if current_user.id not in (order.buyer_id, order.seller_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return OrderDetailResponse.from_orm(order)
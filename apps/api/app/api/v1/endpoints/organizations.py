@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.principal_cache import principal_cache
 from app.models.user import User
 from app.models.organization import Organization
 from app.schemas.organization import OrganizationCreate, OrganizationResponse
@@ -14,7 +16,7 @@ router = APIRouter()
 async def create_organization(
     org_data: OrganizationCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new organization"""
     organization = Organization(
@@ -26,12 +28,13 @@ async def create_organization(
     )
     
     db.add(organization)
-    db.commit()
-    db.refresh(organization)
+    await db.commit()
+    await db.refresh(organization)
     
     # Assign current user to organization
     current_user.organization_id = organization.id
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(current_user.id)
     
     return OrganizationResponse.from_orm(organization)
 
@@ -39,10 +42,11 @@ async def create_organization(
 async def get_organization(
     org_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get organization details"""
-    organization = db.query(Organization).filter(Organization.id == org_id).first()
+    result = await db.execute(select(Organization).where(Organization.id == org_id))
+    organization = result.scalar_one_or_none()
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
     
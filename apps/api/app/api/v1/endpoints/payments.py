@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import json
+
+import stripe
+
+from app.core.database import get_db
+from app.core.config import settings
+from app.services.stripe_events import stripe_events
+
+router = APIRouter()
+
+@router.post("/stripe/webhook")
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Receive a Stripe event; the payments worker applies it to its order.
+    
+    Only the signature is checked and the event stored here, so Stripe
+    gets its answer quickly and never times out into a redelivery.
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Stripe webhooks are not configured")
+    
+    payload = (await request.body()).decode("utf-8")
+    try:
+        stripe.WebhookSignature.verify_header(
+            payload, stripe_signature or "", settings.STRIPE_WEBHOOK_SECRET, settings.STRIPE_WEBHOOK_TOLERANCE_SECONDS
+        )
+    except stripe.error.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    
+    try:
+        event = json.loads(payload)
+        if not (isinstance(event["id"], str) and isinstance(event["type"], str) and isinstance(event["created"], int)):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid event")
+    
+    # Redeliveries of an event already stored are acknowledged all the same
+    await stripe_events.ingest(db, event, payload)
+    await db.commit()
+    
+    return {"received": True}
@@ -1,13 +1,286 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select, update, delete, exists, literal, tuple_, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
+import uuid
+
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.core.pagination import encode_cursor, decode_timestamp_cursor
+from app.models.user import User
+from app.models.pool import Pool, PoolMember, PoolStatus
+from app.schemas.pool import PoolCreate, PoolJoin, PoolResponse, PoolListResponse, PoolMembershipResponse
+from app.services.pool_pricing import pool_price
 
 router = APIRouter()
 
-@router.get("/")
-async def list_pools():
-    """List buying pools - TODO: Implement"""
-    return {"message": "Pools endpoint - coming soon"}
+def _pool_open(now: datetime):
+    """Conditions under which a pool accepts joins and leaves"""
+    return (
+        Pool.status == PoolStatus.ACTIVE,
+        Pool.start_date <= now,
+        Pool.end_date > now,
+    )
+
+async def _explain_pool_conflict(db: AsyncSession, pool_id: str, user_id, action: str):
+    """Raise the error explaining why a conditional join, leave or confirm matched nothing"""
+    pool = await db.get(Pool, pool_id)
+    if not pool:
+        raise HTTPException(status_code=404, detail="Pool not found")
+    
+    now = datetime.utcnow()
+    if pool.status != PoolStatus.ACTIVE or not (pool.start_date <= now < pool.end_date):
+        raise HTTPException(status_code=400, detail=f"Cannot {action} a pool that is not open")
+    
+    result = await db.execute(
+        select(PoolMember.id).where(PoolMember.pool_id == pool_id, PoolMember.user_id == user_id)
+    )
+    is_member = result.first() is not None
+    if action == "join" and is_member:
+        raise HTTPException(status_code=400, detail="Already a member of this pool")
+    if action != "join" and not is_member:
+        raise HTTPException(status_code=404, detail="Not a member of this pool")
+    raise HTTPException(status_code=409, detail="Pool is full")
+
+async def _reprice(db: AsyncSession, pool_id: str, pool, now: datetime) -> float:
+    """Store the pool's price for its new participant count; only tier crossings write.
+    
+    A crossing changes every member's price, so their commitments are
+    rewritten with it while the pool row lock is held.
+    """
+    current_price = pool_price(pool.target_price, pool.discount_tiers or [], pool.participant_count)
+    if current_price != pool.current_price:
+        await db.execute(update(Pool).where(Pool.id == pool_id).values(current_price=current_price, updated_at=now))
+        await db.execute(
+            update(PoolMember)
+            .where(PoolMember.pool_id == pool_id)
+            .values(committed_amount=PoolMember.quantity * current_price)
+            .execution_options(synchronize_session=False)
+        )
+    return current_price
+
+@router.get("/", response_model=PoolListResponse)
+async def list_pools(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = None,
+    status: Optional[PoolStatus] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List buying pools, newest first, paginated by cursor"""
+    query = select(Pool)
+    
+    # Apply filters
+    if category:
+        query = query.where(Pool.category == category)
+    if status:
+        query = query.where(Pool.status == status)
+    if cursor:
+        query = query.where(tuple_(Pool.created_at, Pool.id) < decode_timestamp_cursor(cursor))
+    
+    result = await db.execute(query.order_by(Pool.created_at.desc(), Pool.id.desc()).limit(limit + 1))
+    pools = result.scalars().all()
+    
+    next_cursor = None
+    if len(pools) > limit:
+        pools = pools[:limit]
+        next_cursor = encode_cursor(pools[-1].created_at, pools[-1].id)
+    
+    return PoolListResponse(
+        items=[PoolResponse.from_orm(pool) for pool in pools],
+        next_cursor=next_cursor
+    )
+
+@router.post("/", response_model=PoolResponse)
+async def create_pool(
+    pool_data: PoolCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a buying pool, open for joining from its start date"""
+    start_date = pool_data.start_date or datetime.utcnow()
+    if pool_data.end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    
+    # Tiers are stored sorted so pricing can bisect them
+    tiers = [tier.dict() for tier in pool_data.discount_tiers]
+    
+    pool = Pool(
+        title=pool_data.title,
+        description=pool_data.description,
+        category=pool_data.category,
+        target_price=pool_data.target_price,
+        current_price=pool_price(pool_data.target_price, tiers, 0),
+        min_participants=pool_data.min_participants,
+        max_participants=pool_data.max_participants,
+        participant_count=0,
+        discount_tiers=tiers,
+        start_date=start_date,
+        end_date=pool_data.end_date,
+        estimated_delivery=pool_data.estimated_delivery,
+        creator_id=current_user.id,
+        organization_id=current_user.organization_id,
+        status=PoolStatus.ACTIVE,
+        requirements=pool_data.requirements,
+        terms_conditions=pool_data.terms_conditions
+    )
+    
+    db.add(pool)
+    await db.commit()
+    await db.refresh(pool)
+    
+    return PoolResponse.from_orm(pool)
+
+@router.get("/{pool_id}", response_model=PoolResponse)
+async def get_pool(
+    pool_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a specific pool"""
+    pool = await db.get(Pool, pool_id)
+    if not pool:
+        raise HTTPException(status_code=404, detail="Pool not found")
+    
+    return PoolResponse.from_orm(pool)
+
+@router.post("/{pool_id}/join", response_model=PoolMembershipResponse)
+async def join_pool(
+    pool_id: str,
+    join_data: PoolJoin = PoolJoin(),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Join an open pool and reprice it for the new participant count"""
+    # Rolling back expires the session's objects, so keep the id around
+    user_id = current_user.id
+    now = datetime.utcnow()
+    
+    # Count the member and add them in one statement. The pool row lock it
+    # takes is held until commit, so concurrent joins apply one at a time
+    # and the capacity check never sees a stale count.
+    joined = (
+        update(Pool)
+        .where(
+            Pool.id == pool_id,
+            *_pool_open(now),
+            or_(Pool.max_participants.is_(None), Pool.participant_count < Pool.max_participants),
+        )
+        .values(participant_count=Pool.participant_count + 1)
+        .returning(Pool.id, Pool.participant_count, Pool.current_price, Pool.target_price, Pool.discount_tiers)
+        .cte("joined")
+    )
+    result = await db.execute(
+        insert(PoolMember)
+        .from_select(
+            ["id", "pool_id", "user_id", "quantity", "committed_amount", "is_confirmed", "joined_at"],
+            select(
+                literal(uuid.uuid4(), PoolMember.id.type),
+                joined.c.id,
+                literal(user_id, PoolMember.user_id.type),
+                literal(join_data.quantity),
+                joined.c.current_price * join_data.quantity,
+                literal(False),
+                literal(now),
+            ),
+        )
+        .on_conflict_do_nothing(constraint="uq_pool_members_pool_user")
+        .returning(
+            PoolMember.id.label("member_id"),
+            *[select(column).scalar_subquery().label(column.name) for column in (
+                joined.c.participant_count, joined.c.current_price, joined.c.target_price, joined.c.discount_tiers
+            )],
+        )
+    )
+    pool = result.first()
+    if pool is None:
+        # The counter may have moved even though the member insert was skipped
+        await db.rollback()
+        await _explain_pool_conflict(db, pool_id, user_id, "join")
+    
+    current_price = await _reprice(db, pool_id, pool, now)
+    
+    await db.commit()
+    
+    return PoolMembershipResponse(
+        pool_id=pool_id,
+        participant_count=pool.participant_count,
+        current_price=current_price,
+        committed_amount=current_price * join_data.quantity
+    )
+
+@router.post("/{pool_id}/leave", response_model=PoolMembershipResponse)
+async def leave_pool(
+    pool_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Leave an open pool and reprice it for the remaining participants"""
+    user_id = current_user.id
+    now = datetime.utcnow()
+    
+    # Pool first, in the same lock order as joins
+    leaving = (
+        update(Pool)
+        .where(Pool.id == pool_id, *_pool_open(now))
+        .values(participant_count=Pool.participant_count - 1)
+        .returning(Pool.id, Pool.participant_count, Pool.current_price, Pool.target_price, Pool.discount_tiers)
+        .cte("leaving")
+    )
+    result = await db.execute(
+        delete(PoolMember)
+        .where(PoolMember.pool_id == select(leaving.c.id).scalar_subquery(), PoolMember.user_id == user_id)
+        .returning(*[select(column).scalar_subquery().label(column.name) for column in (
+            leaving.c.participant_count, leaving.c.current_price, leaving.c.target_price, leaving.c.discount_tiers
+        )])
+        .execution_options(synchronize_session=False)
+    )
+    pool = result.first()
+    if pool is None:
+        await db.rollback()
+        await _explain_pool_conflict(db, pool_id, user_id, "leave")
+    
+    current_price = await _reprice(db, pool_id, pool, now)
+    
+    await db.commit()
+    
+    return PoolMembershipResponse(
+        pool_id=pool_id,
+        participant_count=pool.participant_count,
+        current_price=current_price
+    )
 
-@router.post("/")
-async def create_pool():
-    """Create buying pool - TODO: Implement"""
-    return {"message": "Create pool - coming soon"}
+@router.post("/{pool_id}/confirm", response_model=PoolMembershipResponse)
+async def confirm_membership(
+    pool_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Confirm the caller's commitment; only confirmed members get an order at settlement"""
+    result = await db.execute(
+        update(PoolMember)
+        .where(
+            PoolMember.pool_id == pool_id,
+            PoolMember.user_id == current_user.id,
+            exists().where(Pool.id == PoolMember.pool_id, *_pool_open(datetime.utcnow())),
+        )
+        .values(is_confirmed=True)
+        .returning(PoolMember.committed_amount)
+        .execution_options(synchronize_session=False)
+    )
+    member = result.first()
+    if member is None:
+        await _explain_pool_conflict(db, pool_id, current_user.id, "confirm")
+    
+    pool = await db.get(Pool, pool_id)
+    await db.commit()
+    
+    return PoolMembershipResponse(
+        pool_id=pool_id,
+        participant_count=pool.participant_count,
+        current_price=pool.current_price,
+        committed_amount=member.committed_amount
+    )
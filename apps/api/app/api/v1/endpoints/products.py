@@ -1,13 +1,294 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, tuple_, cast
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import datetime
+import uuid
+
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.user import User
+from app.models.product import Product, ProductImage, ProductVariant, ProductStatus
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductSort, ReservationCreate,
+    ReservationResponse, StockStripe
+)
+from app.services.inventory import inventory, InventoryError, OutOfStock
+from app.services.product_cache import product_listing_cache
 
 router = APIRouter()
 
-@router.get("/")
-async def list_products():
-    """List products - TODO: Implement"""
-    return {"message": "Products endpoint - coming soon"}
+def _with_relations(query):
+    """Load images and variants with one extra query each, whatever the page size"""
+    return query.options(selectinload(Product.images), selectinload(Product.variants))
+
+# Sort column of each listing order and whether it descends; ties break on id
+SORT_COLUMNS = {
+    ProductSort.RECENT: (Product.created_at, True),
+    ProductSort.PRICE_ASC: (Product.base_price, False),
+    ProductSort.PRICE_DESC: (Product.base_price, True),
+    ProductSort.RATING: (Product.average_rating, True),
+}
+
+def _decode_product_cursor(cursor: str, sort: ProductSort) -> tuple:
+    """Decode a (sort value, id) cursor"""
+    value, row_id = decode_cursor(cursor, 2)
+    try:
+        value = datetime.fromisoformat(value) if sort == ProductSort.RECENT else float(value)
+        return value, uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _load_product(db: AsyncSession, product_id) -> Optional[Product]:
+    result = await db.execute(
+        _with_relations(select(Product).where(Product.id == product_id))
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+@router.get("/", response_model=ProductListResponse)
+async def list_products(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    tags: List[str] = Query([]),
+    status: ProductStatus = ProductStatus.ACTIVE,
+    sort: ProductSort = ProductSort.RECENT,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Browse products with filters, sorted and paginated by cursor"""
+    tags = sorted({tag.strip().lower() for tag in tags if tag.strip()})
+    
+    async def build_page():
+        query = select(Product)
+        
+        # Apply filters
+        query = query.where(Product.status == status)
+        if status != ProductStatus.ACTIVE:
+            # Unpublished products are only listed to their seller
+            query = query.where(Product.seller_id == current_user.id)
+        if category:
+            query = query.where(Product.category == category)
+        if subcategory:
+            query = query.where(Product.subcategory == subcategory)
+        if min_price is not None:
+            query = query.where(Product.base_price >= min_price)
+        if max_price is not None:
+            query = query.where(Product.base_price <= max_price)
+        if tags:
+            query = query.where(cast(Product.tags, JSONB).contains(tags))
+        
+        sort_column, descending = SORT_COLUMNS[sort]
+        if cursor:
+            position = tuple_(sort_column, Product.id)
+            after = _decode_product_cursor(cursor, sort)
+            query = query.where(position < after if descending else position > after)
+        if descending:
+            query = query.order_by(sort_column.desc(), Product.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Product.id.asc())
+        
+        result = await db.execute(
+            _with_relations(query.add_columns(sort_column.label("sort_value"))).limit(limit + 1)
+        )
+        rows = result.all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].Product.id)
+        
+        return jsonable_encoder(ProductListResponse(
+            items=[ProductResponse.from_orm(row.Product) for row in rows],
+            next_cursor=next_cursor
+        ))
+    
+    # Seller views of unpublished products are per user and not cached
+    if status != ProductStatus.ACTIVE:
+        return await build_page()
+    
+    listing = {
+        "cursor": cursor,
+        "limit": limit,
+        "category": category,
+        "subcategory": subcategory,
+        "min_price": min_price,
+        "max_price": max_price,
+        "tags": tags,
+        "sort": sort.value,
+    }
+    return await product_listing_cache.get_or_create(listing, build_page)
+
+@router.post("/", response_model=ProductResponse)
+async def create_product(
+    product_data: ProductCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create a product sold by the current user"""
+    product = Product(
+        **product_data.dict(exclude={"images", "variants"}),
+        seller_id=current_user.id,
+        organization_id=current_user.organization_id,
+        images=[ProductImage(**image.dict()) for image in product_data.images],
+        variants=[ProductVariant(**variant.dict()) for variant in product_data.variants]
+    )
+    
+    db.add(product)
+    await db.commit()
+    
+    if product.status == ProductStatus.ACTIVE:
+        await product_listing_cache.invalidate([product.category])
+    
+    return ProductResponse.from_orm(await _load_product(db, product.id))
+
+@router.get("/{product_id}", response_model=ProductResponse)
+async def get_product(
+    product_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a specific product"""
+    product = await _load_product(db, product_id)
+    
+    # Unpublished products are only visible to their seller
+    if not product or (product.status != ProductStatus.ACTIVE and product.seller_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    return ProductResponse.from_orm(product)
+
+@router.put("/{product_id}", response_model=ProductResponse)
+async def update_product(
+    product_id: str,
+    product_data: ProductUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Update a product"""
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Only the seller can update their product
+    if product.seller_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the seller can update this product")
+    
+    # Striped stock only moves through reservations
+    if product_data.stock_quantity is not None and product.stock_shards:
+        raise HTTPException(status_code=409, detail="Stock of a striped product cannot be set directly")
+    
+    # Listings of the old category lose the product, those of the new one gain it
+    previous_category = product.category
+    
+    # Update fields
+    update_data = product_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(product, field, value)
+    
+    product.updated_at = datetime.utcnow()
+    await db.commit()
+    
+    await product_listing_cache.invalidate([previous_category, product.category])
+    
+    return ProductResponse.from_orm(await _load_product(db, product_id))
+
+@router.delete("/{product_id}")
+async def archive_product(
+    product_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Archive a product; it stays referenced by past orders and reviews"""
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    if product.seller_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the seller can archive this product")
+    
+    product.status = ProductStatus.ARCHIVED
+    product.updated_at = datetime.utcnow()
+    await db.commit()
+    
+    await product_listing_cache.invalidate([product.category])
+    
+    return {"message": "Product archived successfully"}
+
+@router.post("/{product_id}/reservations", response_model=ReservationResponse)
+async def reserve_stock(
+    product_id: str,
+    reservation_data: ReservationCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Hold stock of a product or variant until the reservation expires"""
+    product = await db.get(Product, product_id)
+    if not product or product.status != ProductStatus.ACTIVE:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    if reservation_data.quantity < (product.min_order_quantity or 1):
+        raise HTTPException(status_code=400, detail=f"Minimum order quantity is {product.min_order_quantity}")
+    if product.max_order_quantity and reservation_data.quantity > product.max_order_quantity:
+        raise HTTPException(status_code=400, detail=f"Maximum order quantity is {product.max_order_quantity}")
+    
+    try:
+        reservation = await inventory.reserve(
+            db, current_user.id, product.id, reservation_data.variant_id, reservation_data.quantity
+        )
+    except OutOfStock:
+        raise HTTPException(status_code=409, detail="Not enough stock")
+    except InventoryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    # Commit right away: the stock row stays locked until then
+    await db.commit()
+    
+    return ReservationResponse.from_orm(reservation)
+
+@router.post("/reservations/{reservation_id}/release", response_model=ReservationResponse)
+async def release_reservation(
+    reservation_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Give back the stock held by one of the caller's reservations"""
+    reservation = await inventory.release(db, reservation_id, current_user.id)
+    if reservation is None:
+        raise HTTPException(status_code=404, detail="No held reservation found")
+    
+    await db.commit()
+    
+    return ReservationResponse.from_orm(reservation)
+
+@router.post("/{product_id}/stripe")
+async def stripe_stock(
+    product_id: str,
+    stripe_data: StockStripe,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Split a hot SKU's stock across stripes so concurrent buyers do not queue on one row"""
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    if product.seller_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the seller can stripe this product's stock")
+    
+    try:
+        await inventory.stripe(db, product.id, stripe_data.variant_id, stripe_data.shards)
+    except InventoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    await db.commit()
+    
+    return {"message": f"Stock striped across {stripe_data.shards} shards"}
 
-@router.post("/")
-async def create_product():
-    """Create product - TODO: Implement"""
-    return {"message": "Create product - coming soon"}
@@ -1,14 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from datetime import datetime
+import asyncio
+import json
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.pagination import encode_cursor, decode_timestamp_cursor
 from app.models.user import User
-from app.models.rfp import RFP, RFPStatus
-from app.schemas.rfp import RFPCreate, RFPResponse, RFPUpdate
-from app.services.ai_service import normalize_rfp_requirements
+from app.models.product import Product, ProductStatus
+from app.models.rfp import RFP, RFPStatus, RequirementsStatus
+from app.schemas.rfp import (
+    RFPCreate, RFPResponse, RFPUpdate, RFPRequirementsResponse, RFPListResponse, RFPSearchHit, RFPSearchResponse,
+    SellerMatchResponse, RFPMatchesResponse, SimilarProduct, SimilarProductsResponse, SimilarSeller,
+    SimilarSellersResponse
+)
+from app.services.rfp_pipeline import enqueue_rfp_requirements, get_requirements_status
+from app.services.rfp_search import search_rfps
+from app.services.matching_engine import matching_engine
+from app.services.embeddings import embedding_index, rfp_text
+from app.services.ai_service import match_sellers_to_rfp
+
+# How often the requirements event stream re-checks the RFP, and for how long
+REQUIREMENTS_POLL_INTERVAL_SECONDS = 1.0
+REQUIREMENTS_STREAM_TIMEOUT_SECONDS = 120.0
 
 router = APIRouter()
 
@@ -16,12 +34,9 @@ router = APIRouter()
 async def create_rfp(
     rfp_data: RFPCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new RFP"""
-    # Normalize requirements using AI
-    normalized_requirements = await normalize_rfp_requirements(rfp_data.description)
-    
     rfp = RFP(
         title=rfp_data.title,
         description=rfp_data.description,
@@ -30,7 +45,7 @@ async def create_rfp(
         budget_max=rfp_data.budget_max,
         deadline=rfp_data.deadline,
         location=rfp_data.location,
-        requirements=normalized_requirements,
+        requirements_status=RequirementsStatus.PENDING,
         buyer_id=current_user.id,
         organization_id=current_user.organization_id,
         is_private=rfp_data.is_private,
@@ -38,45 +53,99 @@ async def create_rfp(
     )
     
     db.add(rfp)
-    db.commit()
-    db.refresh(rfp)
+    await db.commit()
+    await db.refresh(rfp)
+    
+    # Normalize requirements using AI in the background
+    await enqueue_rfp_requirements(rfp.id)
     
     return RFPResponse.from_orm(rfp)
 
-@router.get("/", response_model=List[RFPResponse])
+@router.get("/", response_model=RFPListResponse)
 async def list_rfps(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
     status: Optional[RFPStatus] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List RFPs with filters"""
-    query = db.query(RFP)
-    
-    # Apply filters
-    if category:
-        query = query.filter(RFP.category == category)
-    if status:
-        query = query.filter(RFP.status == status)
-    
-    # Don't show private RFPs unless user is the buyer
-    query = query.filter(
-        (RFP.is_private == False) | (RFP.buyer_id == current_user.id)
+    """List RFPs with filters, newest first, paginated by cursor"""
+    def page(*criteria):
+        query = select(RFP.id, RFP.created_at).where(*criteria)
+        
+        # Apply filters
+        if category:
+            query = query.where(RFP.category == category)
+        if status:
+            query = query.where(RFP.status == status)
+        if cursor:
+            query = query.where(tuple_(RFP.created_at, RFP.id) < decode_timestamp_cursor(cursor))
+        
+        return query.order_by(RFP.created_at.desc(), RFP.id.desc()).limit(limit + 1)
+    
+    # Don't show private RFPs unless user is the buyer. Each half is a separate
+    # keyset scan so both can walk an index instead of sorting an OR'ed filter.
+    candidates = union_all(
+        page(RFP.is_private == False),
+        page(RFP.is_private == True, RFP.buyer_id == current_user.id),
+    ).subquery()
+    
+    result = await db.execute(
+        select(RFP)
+        .join(candidates, RFP.id == candidates.c.id)
+        .order_by(RFP.created_at.desc(), RFP.id.desc())
+        .limit(limit + 1)
     )
+    rfps = result.scalars().all()
     
-    rfps = query.offset(skip).limit(limit).all()
-    return [RFPResponse.from_orm(rfp) for rfp in rfps]
+    next_cursor = None
+    if len(rfps) > limit:
+        rfps = rfps[:limit]
+        next_cursor = encode_cursor(rfps[-1].created_at, rfps[-1].id)
+    
+    return RFPListResponse(
+        items=[RFPResponse.from_orm(rfp) for rfp in rfps],
+        next_cursor=next_cursor
+    )
+
+@router.get("/search", response_model=RFPSearchResponse)
+async def search(
+    q: Optional[str] = Query(None, max_length=200),
+    category: Optional[str] = None,
+    status: Optional[RFPStatus] = None,
+    budget: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text RFP search with relevance ranking and facet counts"""
+    results = await search_rfps(
+        db,
+        user_id=current_user.id,
+        q=q,
+        category=category,
+        status=status,
+        budget=budget,
+        limit=limit,
+        offset=offset
+    )
+    
+    items = [
+        RFPSearchHit(**RFPResponse.from_orm(rfp).dict(), rank=rank)
+        for rfp, rank in results["hits"]
+    ]
+    return RFPSearchResponse(items=items, total=results["total"], facets=results["facets"])
 
 @router.get("/{rfp_id}", response_model=RFPResponse)
 async def get_rfp(
     rfp_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific RFP"""
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+    rfp = await db.get(RFP, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -91,10 +160,10 @@ async def update_rfp(
     rfp_id: str,
     rfp_data: RFPUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an RFP"""
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+    rfp = await db.get(RFP, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -103,23 +172,193 @@ async def update_rfp(
         raise HTTPException(status_code=403, detail="Only the buyer can update this RFP")
     
     # Update fields
-    for field, value in rfp_data.dict(exclude_unset=True).items():
+    update_data = rfp_data.dict(exclude_unset=True)
+    for field, value in update_data.items():
         setattr(rfp, field, value)
     
+    # A new description needs its requirements normalized again
+    renormalize = "description" in update_data
+    if renormalize:
+        rfp.requirements_status = RequirementsStatus.PENDING
+    
     rfp.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(rfp)
+    await db.commit()
+    await db.refresh(rfp)
+    
+    if renormalize:
+        await enqueue_rfp_requirements(rfp.id)
     
     return RFPResponse.from_orm(rfp)
 
+@router.get("/{rfp_id}/requirements", response_model=RFPRequirementsResponse)
+async def get_rfp_requirements(
+    rfp_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Poll the AI normalization status of an RFP's requirements"""
+    rfp = await db.get(RFP, rfp_id)
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    
+    if rfp.is_private and rfp.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return RFPRequirementsResponse.from_orm(rfp)
+
+@router.get("/{rfp_id}/requirements/events")
+async def stream_rfp_requirements(
+    rfp_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Server-Sent Events stream that reports when normalization finishes"""
+    rfp = await db.get(RFP, rfp_id)
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    
+    if rfp.is_private and rfp.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Release the request's connection; the stream polls with its own sessions
+    await db.close()
+    
+    async def events():
+        deadline = asyncio.get_running_loop().time() + REQUIREMENTS_STREAM_TIMEOUT_SECONDS
+        last_status = None
+        while True:
+            status = await get_requirements_status(rfp_id)
+            if status != last_status:
+                last_status = status
+                yield f"event: status\ndata: {json.dumps({'requirements_status': status.value if status else None})}\n\n"
+            
+            if status in (RequirementsStatus.COMPLETED, RequirementsStatus.FAILED, None):
+                return
+            if asyncio.get_running_loop().time() >= deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            
+            await asyncio.sleep(REQUIREMENTS_POLL_INTERVAL_SECONDS)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.get("/{rfp_id}/matches", response_model=RFPMatchesResponse)
+async def get_rfp_matches(
+    rfp_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    explain: bool = Query(False, description="Ask the AI to explain the top matches"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rank sellers against an RFP's requirements (buyer only)"""
+    rfp = await db.get(RFP, rfp_id)
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    
+    if rfp.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the buyer can view matches for this RFP")
+    
+    matches = await matching_engine.match(db, rfp, limit)
+    items = [SellerMatchResponse(**match.__dict__) for match in matches]
+    
+    # Only the already-ranked top sellers go to the model, so the prompt
+    # stays small however many sellers there are
+    if explain and items:
+        seller_ids = [item.seller_id for item in items]
+        result = await db.execute(
+            select(User.id, User.first_name, User.last_name, User.email, Product.category)
+            .outerjoin(Product, (Product.seller_id == User.id) & (Product.status == ProductStatus.ACTIVE))
+            .where(User.id.in_(seller_ids))
+        )
+        sellers = {}
+        for row in result:
+            seller = sellers.setdefault(str(row.id), {
+                "id": str(row.id),
+                "name": " ".join(filter(None, [row.first_name, row.last_name])) or row.email,
+                "specialties": set(),
+            })
+            if row.category:
+                seller["specialties"].add(row.category)
+        
+        explanations = await match_sellers_to_rfp(
+            {"title": rfp.title},
+            [
+                {
+                    **sellers[item.seller_id],
+                    "specialties": ", ".join(sorted(sellers[item.seller_id]["specialties"])) or "n/a",
+                    "rating": item.reputation_score,
+                    "location": "n/a",
+                }
+                for item in items if item.seller_id in sellers
+            ]
+        )
+        reasoning = {str(entry.get("seller_id")): entry.get("reasoning") for entry in explanations}
+        for item in items:
+            item.reasoning = reasoning.get(item.seller_id)
+    
+    return RFPMatchesResponse(items=items)
+
+async def _get_visible_rfp(db: AsyncSession, rfp_id: str, user: User) -> RFP:
+    rfp = await db.get(RFP, rfp_id)
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    if rfp.is_private and rfp.buyer_id != user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return rfp
+
+@router.get("/{rfp_id}/similar-products", response_model=SimilarProductsResponse)
+async def get_similar_products(
+    rfp_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Products semantically closest to an RFP's requirements"""
+    rfp = await _get_visible_rfp(db, rfp_id, current_user)
+    
+    hits = await embedding_index.similar_products(db, rfp_text(rfp), limit)
+    if not hits:
+        return SimilarProductsResponse(items=[])
+    
+    result = await db.execute(select(Product).where(Product.id.in_([product_id for product_id, _ in hits])))
+    products = {str(product.id): product for product in result.scalars()}
+    
+    return SimilarProductsResponse(items=[
+        SimilarProduct(
+            product_id=product_id,
+            seller_id=str(products[product_id].seller_id),
+            title=products[product_id].title,
+            category=products[product_id].category,
+            base_price=products[product_id].base_price,
+            score=round(score, 4),
+        )
+        for product_id, score in hits if product_id in products
+    ])
+
+@router.get("/{rfp_id}/similar-sellers", response_model=SimilarSellersResponse)
+async def get_similar_sellers(
+    rfp_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sellers whose products are semantically closest to an RFP's requirements"""
+    rfp = await _get_visible_rfp(db, rfp_id, current_user)
+    
+    sellers = await embedding_index.similar_sellers(db, rfp_text(rfp), limit)
+    return SimilarSellersResponse(items=[
+        SimilarSeller(seller_id=seller["seller_id"], score=round(seller["score"], 4), matching_products=seller["matching_products"])
+        for seller in sellers
+    ])
+
 @router.post("/{rfp_id}/publish")
 async def publish_rfp(
     rfp_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Publish an RFP (change status from DRAFT to PUBLISHED)"""
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+    rfp = await db.get(RFP, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -131,7 +370,7 @@ async def publish_rfp(
     
     rfp.status = RFPStatus.PUBLISHED
     rfp.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     return {"message": "RFP published successfully"}
 
@@ -139,10 +378,10 @@ async def publish_rfp(
 async def close_rfp(
     rfp_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Close an RFP"""
-    rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+    rfp = await db.get(RFP, rfp_id)
     if not rfp:
         raise HTTPException(status_code=404, detail="RFP not found")
     
@@ -151,6 +390,6 @@ async def close_rfp(
     
     rfp.status = RFPStatus.CLOSED
     rfp.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     return {"message": "RFP closed successfully"}
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.models.user import User
+from app.core.principal_cache import principal_cache
+from app.models.user import User, UserRole
 from app.schemas.auth import UserResponse
 
 router = APIRouter()
@@ -17,7 +18,7 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
 async def update_current_user_profile(
     user_data: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update current user profile"""
     # Update allowed fields
@@ -26,7 +27,29 @@ async def update_current_user_profile(
         if field in allowed_fields:
             setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await principal_cache.invalidate(current_user.id)
     
     return UserResponse.from_orm(current_user)
+
+@router.post("/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate_user(
+    user_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Deactivate a user account (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can deactivate users")
+    
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user.is_active = False
+    await db.commit()
+    await db.refresh(user)
+    await principal_cache.invalidate(user.id)
+    
+    return UserResponse.from_orm(user)
@@ -1,25 +1,72 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+def _async_database_url(url: str) -> str:
+    """Point a plain postgresql:// URL at the asyncpg driver"""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+ASYNC_DATABASE_URL = _async_database_url(settings.DATABASE_URL)
+
+# Pool sizing only applies to server databases; SQLite (used for test runs)
+# gets SQLAlchemy's default pool
+pool_options = {}
+if not ASYNC_DATABASE_URL.startswith("sqlite"):
+    pool_options = {
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    }
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
     pool_pre_ping=True,
     pool_recycle=300,
+    **pool_options,
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Statements executed in the current context, when a caller is counting them
+_query_log: ContextVar[Optional[List[str]]] = ContextVar("query_log", default=None)
+
+# Listens on every engine, including the per-task engines of the Celery workers
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    log = _query_log.get()
+    if log is not None:
+        log.append(statement)
+
+def start_query_log() -> List[str]:
+    """Start recording the SQL statements run in the current context.
+
+    Used to report per-request round trips and to assert in tests that an
+    endpoint did not regress to extra queries.
+    """
+    log: List[str] = []
+    _query_log.set(log)
+    return log
+
+# Create session factory. Objects stay usable after commit so handlers can
+# build responses without triggering a lazy refresh outside the event loop.
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
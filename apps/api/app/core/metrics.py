@@ -0,0 +1,12 @@
+from typing import Any, Callable, Dict
+
+# Registered stats providers, keyed by metric group name
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]):
+    """Register a callable that returns the current stats for a subsystem"""
+    _providers[name] = provider
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Collect the current stats from every registered provider"""
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,187 @@
+import enum
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, Enum, inspect, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.user import User
+
+# Columns of a user that callers of get_current_user read. Credentials and
+# contact details stay out of the cache, which Redis shares across workers.
+PRINCIPAL_FIELDS = (
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "role",
+    "organization_id",
+    "is_active",
+    "is_verified",
+)
+
+# Fields authorization depends on, rechecked against the database before a
+# cached user may change anything
+AUTHORIZATION_FIELDS = ("is_active", "role", "organization_id")
+
+def _serialize_user(user: User, fields=PRINCIPAL_FIELDS) -> Dict[str, Any]:
+    """Dump the principal fields of a user (or a row of them) into JSON-safe values"""
+    data = {}
+    for key in fields:
+        value = getattr(user, key)
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        data[key] = value
+    return data
+
+def _deserialize_user(data: Dict[str, Any]) -> User:
+    """Rebuild a detached User from cached principal fields.
+
+    Other columns are left unloaded; code that needs them must refresh
+    the user from the database first.
+    """
+    columns = inspect(User).columns
+    values = {}
+    for key in PRINCIPAL_FIELDS:
+        value = data.get(key)
+        column_type = columns[key].type
+        if value is not None:
+            if isinstance(column_type, UUID):
+                value = uuid.UUID(value)
+            elif isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Enum) and column_type.enum_class is not None:
+                value = column_type.enum_class(value)
+        values[key] = value
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+class PrincipalCache:
+    """Cache of authenticated users keyed by user id.
+
+    Entries are held in process for ``ttl_seconds`` and, when enabled, in
+    Redis so other workers can skip the users lookup too. Local entries in
+    other workers are not notified of invalidations, so reads may see a
+    change up to one TTL late. Writes resolve with ``revalidate``, which
+    rechecks the authorization fields on every hit: a deactivated user can
+    never change anything, whatever the number of workers.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, use_redis: bool):
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._local = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.revalidations = 0
+        self.stale = 0
+
+    def _redis_key(self, user_id: str) -> str:
+        return f"principal:{user_id}"
+
+    async def _get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        data = self._local.get(user_id)
+        if data is not None:
+            return data
+
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(self._redis_key(user_id))
+            except RedisError:
+                raw = None
+            if raw is not None:
+                data = json.loads(raw)
+                self._local.set(user_id, data)
+                self.redis_hits += 1
+                return data
+
+        return None
+
+    async def store(self, user: User):
+        """Cache the given user's principal fields"""
+        user_id = str(user.id)
+        data = _serialize_user(user)
+        self._local.set(user_id, data)
+
+        if self.use_redis:
+            try:
+                await get_redis().set(self._redis_key(user_id), json.dumps(data), ex=self.ttl_seconds)
+            except RedisError:
+                pass
+
+    async def invalidate(self, user_id: str):
+        """Drop a user from every cache tier after it changes"""
+        user_id = str(user_id)
+        self._local.delete(user_id)
+
+        if self.use_redis:
+            try:
+                await get_redis().delete(self._redis_key(user_id))
+            except RedisError:
+                pass
+
+    async def _is_current(self, db: AsyncSession, user_id: str, data: Dict[str, Any]) -> bool:
+        """Whether a cached user's authorization fields still match the database"""
+        self.revalidations += 1
+        row = (await db.execute(
+            select(*[getattr(User, key) for key in AUTHORIZATION_FIELDS]).where(User.id == user_id)
+        )).first()
+        current = row is not None and _serialize_user(row, AUTHORIZATION_FIELDS) == {key: data[key] for key in AUTHORIZATION_FIELDS}
+        if not current:
+            self.stale += 1
+            await self.invalidate(user_id)
+        return current
+
+    async def resolve(self, db: AsyncSession, user_id: str, revalidate: bool = False) -> Optional[User]:
+        """Return the user attached to ``db``, querying only on a cache miss.
+
+        With ``revalidate`` a hit is checked against the database first and
+        reloaded if its authorization fields changed.
+        """
+        data = await self._get(str(user_id))
+        if data is not None and (not revalidate or await self._is_current(db, str(user_id), data)):
+            self.hits += 1
+            return await db.merge(_deserialize_user(data), load=False)
+
+        self.misses += 1
+        user = await db.get(User, user_id)
+        if user is not None:
+            await self.store(user)
+        return user
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "revalidations": self.revalidations,
+            "stale": self.stale,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "local_entries": len(self._local),
+        }
+
+# Global instance
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    use_redis=settings.PRINCIPAL_CACHE_USE_REDIS,
+)
+
+metrics.register("principal_cache", principal_cache.stats)
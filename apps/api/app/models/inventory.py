@@ -0,0 +1,51 @@
+from sqlalchemy import Column, DateTime, Boolean, Integer, ForeignKey, Enum, Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+import enum
+
+from app.core.database import Base
+
+class ReservationStatus(str, enum.Enum):
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+
+# A striped (hot) SKU keeps its stock split across these rows instead of
+# in its stock_quantity, so concurrent reservations lock different rows
+class StockShard(Base):
+    __tablename__ = "stock_shards"
+    __table_args__ = (
+        CheckConstraint("quantity >= 0", name="ck_stock_shards_quantity"),
+    )
+
+    # Id of the product or variant whose stock this is
+    sku_id = Column(UUID(as_uuid=True), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # The expiry sweeper only ever looks at held reservations
+        Index("ix_stock_reservations_held_expiry", "expires_at", postgresql_where=text("status = 'HELD'")),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
+    variant_id = Column(UUID(as_uuid=True), ForeignKey("product_variants.id"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), nullable=True)
+    quantity = Column(Integer, nullable=False)
+
+    # Where the held units came from: the variant's or the product's own
+    # counter, or one stripe of it when ``shard`` is set
+    from_variant = Column(Boolean, nullable=False, default=False)
+    shard = Column(Integer, nullable=True)
+
+    status = Column(Enum(ReservationStatus), nullable=False, default=ReservationStatus.HELD)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, DateTime, Integer, Float, JSON
+from datetime import datetime
+
+from app.core.database import Base
+
+class MarketPriceStat(Base):
+    __tablename__ = "market_price_stats"
+    
+    category = Column(String, primary_key=True)
+    
+    # Running aggregates over accepted offers and completed orders
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    histogram = Column(JSON, nullable=False)  # Counts per log-spaced price bucket
+    
+    # Derived from the aggregates on every write so reads need no math
+    mean = Column(Float, nullable=True)
+    median = Column(Float, nullable=True)
+    p10 = Column(Float, nullable=True)
+    p90 = Column(Float, nullable=True)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum, JSON, Numeric
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum, JSON, Numeric, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -23,10 +23,20 @@ class PaymentStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Keyset pagination over (created_at, id) for each side of an order
+        Index("ix_orders_buyer_created", "buyer_id", "created_at", "id"),
+        Index("ix_orders_seller_created", "seller_id", "created_at", "id"),
+        # A retried create with the same key finds the order instead of inserting another
+        Index(
+            "ux_orders_buyer_idempotency_key", "buyer_id", "idempotency_key",
+            unique=True, postgresql_where=text("idempotency_key IS NOT NULL")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    rfp_id = Column(UUID(as_uuid=True), ForeignKey("rfps.id"), nullable=False)
-    offer_id = Column(UUID(as_uuid=True), ForeignKey("offers.id"), nullable=False)
+    rfp_id = Column(UUID(as_uuid=True), ForeignKey("rfps.id"), nullable=True)  # Null for pool orders
+    offer_id = Column(UUID(as_uuid=True), ForeignKey("offers.id"), nullable=True)  # Null for pool orders
     buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
@@ -37,6 +47,11 @@ class Order(Base):
     delivery_deadline = Column(DateTime, nullable=True)
     completion_date = Column(DateTime, nullable=True)
     notes = Column(Text, nullable=True)
+    
+    # Client supplied Idempotency-Key and a hash of the request it created the order for
+    idempotency_key = Column(String(255), nullable=True)
+    request_fingerprint = Column(String(64), nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+from app.core.database import Base
+
+class StripeEvent(Base):
+    """Inbox of Stripe webhook events, stored as received and applied by the payments worker"""
+    __tablename__ = "stripe_events"
+    __table_args__ = (
+        # The worker only ever looks at events it has not applied yet
+        Index(
+            "ix_stripe_events_pending", "payment_intent_id", "event_created_at",
+            postgresql_where=text("processed_at IS NULL")
+        ),
+    )
+
+    id = Column(String, primary_key=True)  # Stripe's event id; redeliveries collide on it
+    type = Column(String, nullable=False)
+    payment_intent_id = Column(String, nullable=True)
+    order_id = Column(UUID(as_uuid=True), nullable=True)  # From the payment intent's metadata
+    event_created_at = Column(DateTime, nullable=False)
+    payload = Column(Text, nullable=False)  # Raw request body
+    received_at = Column(DateTime, default=datetime.utcnow)
+
+    # Events that cannot be applied yet (their order or payment is not known)
+    # are retried with backoff
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -16,6 +16,12 @@ class PoolStatus(str, enum.Enum):
 
 class Pool(Base):
     __tablename__ = "pools"
+    __table_args__ = (
+        # Keyset pagination of the pool listing, optionally by status
+        Index("ix_pools_status_created", "status", "created_at", "id"),
+        # Lets the settlement scheduler find due pools without scanning
+        Index("ix_pools_status_end_date", "status", "end_date"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
@@ -28,8 +34,11 @@ class Pool(Base):
     min_participants = Column(Integer, default=1)
     max_participants = Column(Integer, nullable=True)
     
+    # Maintained by join/leave with conditional updates, never by counting members
+    participant_count = Column(Integer, nullable=False, default=0)
+    
     # Discount structure
-    discount_tiers = Column(JSON, nullable=True)  # e.g., [{"participants": 5, "discount": 10}]
+    discount_tiers = Column(JSON, nullable=True)  # e.g., [{"participants": 5, "discount": 10}], sorted by participants
     
     # Timeline
     start_date = Column(DateTime, nullable=False)
@@ -60,6 +69,9 @@ class Pool(Base):
 
 class PoolMember(Base):
     __tablename__ = "pool_members"
+    __table_args__ = (
+        UniqueConstraint("pool_id", "user_id", name="uq_pool_members_pool_user"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     pool_id = Column(UUID(as_uuid=True), ForeignKey("pools.id"), nullable=False)
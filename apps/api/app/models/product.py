@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey, JSON, Enum, Index, cast
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from datetime import datetime
 import enum
@@ -15,6 +15,14 @@ class ProductStatus(str, enum.Enum):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Browse pages: keyset scans per sort order, optionally within a category
+        Index("ix_products_status_created", "status", "created_at", "id"),
+        Index("ix_products_status_price", "status", "base_price", "id"),
+        Index("ix_products_status_category_created", "status", "category", "created_at", "id"),
+        Index("ix_products_status_category_price", "status", "category", "base_price", "id"),
+        Index("ix_products_status_rating", "status", "average_rating", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
@@ -29,6 +37,7 @@ class Product(Base):
     
     # Inventory
     stock_quantity = Column(Integer, nullable=True)  # null for services
+    stock_shards = Column(Integer, nullable=False, default=0)  # > 0 when striped across stock_shards
     min_order_quantity = Column(Integer, default=1)
     max_order_quantity = Column(Integer, nullable=True)
     
@@ -51,6 +60,16 @@ class Product(Base):
     meta_description = Column(Text, nullable=True)
     slug = Column(String, nullable=True, unique=True)
     
+    # Review aggregates, kept current by app.services.product_ratings
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    average_rating = Column(Float, nullable=False, default=0.0)
+    
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -58,15 +77,23 @@ class Product(Base):
     # Relationships
     seller = relationship("User")
     organization = relationship("Organization")
-    images = relationship("ProductImage", back_populates="product")
+    images = relationship("ProductImage", back_populates="product", order_by="ProductImage.sort_order")
     variants = relationship("ProductVariant", back_populates="product")
     reviews = relationship("ProductReview", back_populates="product")
+    
+    @property
+    def rating_histogram(self):
+        """Review counts for 1 to 5 stars"""
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
+# Tag filters use jsonb containment
+Index("ix_products_tags", cast(Product.tags, JSONB), postgresql_using="gin")
 
 class ProductImage(Base):
     __tablename__ = "product_images"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
     image_path = Column(String, nullable=False)
     alt_text = Column(String, nullable=True)
     is_primary = Column(Boolean, default=False)
@@ -81,11 +108,12 @@ class ProductVariant(Base):
     __tablename__ = "product_variants"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
     name = Column(String, nullable=False)  # e.g., "Size", "Color"
     value = Column(String, nullable=False)  # e.g., "Large", "Red"
     price_adjustment = Column(Float, default=0.0)
-    stock_quantity = Column(Integer, nullable=True)
+    stock_quantity = Column(Integer, nullable=True)  # null when stock is tracked on the product
+    stock_shards = Column(Integer, nullable=False, default=0)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -96,7 +124,7 @@ class ProductReview(Base):
     __tablename__ = "product_reviews"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False, index=True)
     reviewer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), nullable=False)
     
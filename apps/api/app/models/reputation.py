@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Integer, Float, Boolean, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -10,7 +10,7 @@ class ReputationMetric(Base):
     __tablename__ = "reputation_metrics"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
     
     # Overall scores
     overall_score = Column(Float, default=0.0)  # 0-100
@@ -31,7 +31,7 @@ class ReputationMetric(Base):
     negative_reviews = Column(Integer, default=0)
     
     # Verification
-    is_verified = Column(String, default=False)
+    is_verified = Column(Boolean, default=False)
     verification_date = Column(DateTime, nullable=True)
     verification_method = Column(String, nullable=True)  # email, phone, id, business
     
@@ -63,3 +63,11 @@ class Review(Base):
     reviewed_user = relationship("User", foreign_keys=[reviewed_user_id])
     order = relationship("Order")
     reputation_metric = relationship("ReputationMetric", back_populates="reviews")
+
+class ReputationEvent(Base):
+    """Idempotency keys of the events already applied to reputation_metrics"""
+    __tablename__ = "reputation_events"
+    
+    key = Column(String, primary_key=True)  # e.g. review:<id>, order:<id>:completed
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
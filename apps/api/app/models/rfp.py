@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum, JSON, Index, text, event, DDL
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 import uuid
 from datetime import datetime
 import enum
@@ -14,8 +14,29 @@ class RFPStatus(str, enum.Enum):
     AWARDED = "awarded"
     CANCELLED = "cancelled"
 
+class RequirementsStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class RFP(Base):
     __tablename__ = "rfps"
+    __table_args__ = (
+        # Keyset pagination over (created_at, id) for each list filter combination.
+        # Public listings only ever read non-private rows, so those indexes are partial.
+        Index("ix_rfps_public_created", "created_at", "id", postgresql_where=text("NOT is_private")),
+        Index("ix_rfps_public_category_created", "category", "created_at", "id", postgresql_where=text("NOT is_private")),
+        Index("ix_rfps_public_status_created", "status", "created_at", "id", postgresql_where=text("NOT is_private")),
+        Index("ix_rfps_public_category_status_created", "category", "status", "created_at", "id", postgresql_where=text("NOT is_private")),
+        Index("ix_rfps_buyer_created", "buyer_id", "created_at", "id"),
+        Index("ix_rfps_search_vector", "search_vector", postgresql_using="gin"),
+        # The stale-claim sweep only looks at RFPs still waiting for their requirements
+        Index(
+            "ix_rfps_requirements_unfinished", "requirements_claimed_at",
+            postgresql_where=text("requirements_status IN ('PENDING', 'PROCESSING')")
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
@@ -26,11 +47,18 @@ class RFP(Base):
     deadline = Column(DateTime, nullable=False)
     location = Column(String, nullable=True)
     requirements = Column(JSON, nullable=True)  # AI-normalized structured requirements
+    requirements_status = Column(Enum(RequirementsStatus), default=RequirementsStatus.PENDING)
+    # Lease of the job processing the requirements: only the holder of the
+    # claim token may write them back, and an expired lease can be reclaimed
+    requirements_claim = Column(UUID(as_uuid=True), nullable=True)
+    requirements_claimed_at = Column(DateTime, nullable=True)
     status = Column(Enum(RFPStatus), default=RFPStatus.DRAFT)
     buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=True)
     is_private = Column(Boolean, default=False)
     ai_summary = Column(Text, nullable=True)
+    awarded_offer_id = Column(String, nullable=True)  # Set when an offer is accepted; no FK to keep rfps/offers acyclic
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)  # Maintained by trigger
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -40,3 +68,30 @@ class RFP(Base):
     offers = relationship("Offer", back_populates="rfp")
     files = relationship("RFPFile", back_populates="rfp")
     threads = relationship("RFPThread", back_populates="rfp")
+
+# Keep search_vector in sync on Postgres: title ranks above description,
+# which ranks above the normalized requirement specifications.
+event.listen(
+    RFP.__table__,
+    "after_create",
+    DDL("""
+        CREATE OR REPLACE FUNCTION rfps_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+                setweight(jsonb_to_tsvector('english', coalesce(NEW.requirements::jsonb -> 'specifications', '[]'::jsonb), '["string", "numeric"]'), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """).execute_if(dialect="postgresql"),
+)
+event.listen(
+    RFP.__table__,
+    "after_create",
+    DDL("""
+        CREATE TRIGGER rfps_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description, requirements ON rfps
+        FOR EACH ROW EXECUTE FUNCTION rfps_search_vector_update()
+    """).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field, validator
+from typing import Optional, List
+from datetime import datetime
+from app.models.order import OrderStatus, PaymentStatus
+from app.models.rfp import RFPStatus
+
+class OrderCreate(BaseModel):
+    reservation_ids: List[str] = Field(..., min_length=1, max_length=100)
+    delivery_deadline: Optional[datetime] = None
+    notes: Optional[str] = None
+
+    @validator('reservation_ids')
+    def validate_reservation_ids(cls, v):
+        if len(set(v)) != len(v):
+            raise ValueError('reservation_ids must be distinct')
+        return sorted(v)
+
+class OrderResponse(BaseModel):
+    id: str
+    rfp_id: Optional[str]
+    offer_id: Optional[str]
+    pool_id: Optional[str]
+    buyer_id: str
+    seller_id: str
+    amount: float
+    status: OrderStatus
+    payment_status: PaymentStatus
+    escrow_release_date: Optional[datetime]
+    delivery_deadline: Optional[datetime]
+    completion_date: Optional[datetime]
+    notes: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class OrderListResponse(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+class OrderOfferSummary(BaseModel):
+    id: str
+    price: float
+    description: str
+    delivery_time: str
+    status: str
+
+    class Config:
+        from_attributes = True
+
+class OrderRFPSummary(BaseModel):
+    id: str
+    title: str
+    category: str
+    deadline: datetime
+    status: RFPStatus
+
+    class Config:
+        from_attributes = True
+
+class OrderDetailResponse(OrderResponse):
+    offer: Optional[OrderOfferSummary] = None
+    rfp: Optional[OrderRFPSummary] = None
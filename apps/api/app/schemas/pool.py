@@ -0,0 +1,73 @@
+from pydantic import BaseModel, Field, validator
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from app.models.pool import PoolStatus
+
+class DiscountTier(BaseModel):
+    participants: int = Field(..., gt=0)
+    discount: float = Field(..., ge=0, lt=100)  # Percent off the target price
+
+class PoolCreate(BaseModel):
+    title: str
+    description: str
+    category: str
+    target_price: float = Field(..., gt=0)
+    min_participants: int = Field(1, ge=1)
+    max_participants: Optional[int] = Field(None, ge=1)
+    discount_tiers: List[DiscountTier] = []
+    start_date: Optional[datetime] = None
+    end_date: datetime
+    estimated_delivery: Optional[datetime] = None
+    requirements: Optional[Dict[str, Any]] = None
+    terms_conditions: Optional[str] = None
+
+    @validator('max_participants')
+    def validate_max_participants(cls, v, values):
+        if v and 'min_participants' in values and v < values['min_participants']:
+            raise ValueError('max_participants must be at least min_participants')
+        return v
+
+    @validator('discount_tiers')
+    def validate_discount_tiers(cls, v):
+        thresholds = [tier.participants for tier in v]
+        if len(set(thresholds)) != len(thresholds):
+            raise ValueError('discount tiers must have distinct participant thresholds')
+        return sorted(v, key=lambda tier: tier.participants)
+
+class PoolJoin(BaseModel):
+    quantity: int = Field(1, ge=1)
+
+class PoolResponse(BaseModel):
+    id: str
+    title: str
+    description: str
+    category: str
+    target_price: float
+    current_price: float
+    min_participants: int
+    max_participants: Optional[int]
+    participant_count: int
+    discount_tiers: Optional[List[Dict[str, Any]]]
+    start_date: datetime
+    end_date: datetime
+    estimated_delivery: Optional[datetime]
+    creator_id: str
+    organization_id: Optional[str]
+    status: PoolStatus
+    requirements: Optional[Dict[str, Any]]
+    terms_conditions: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class PoolListResponse(BaseModel):
+    items: List[PoolResponse]
+    next_cursor: Optional[str] = None
+
+class PoolMembershipResponse(BaseModel):
+    pool_id: str
+    participant_count: int
+    current_price: float
+    committed_amount: Optional[float] = None
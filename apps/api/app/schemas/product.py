@@ -0,0 +1,149 @@
+from pydantic import BaseModel, Field, validator
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import enum
+from app.models.product import ProductStatus
+from app.models.inventory import ReservationStatus
+
+class ProductSort(str, enum.Enum):
+    RECENT = "recent"
+    PRICE_ASC = "price_asc"
+    PRICE_DESC = "price_desc"
+    RATING = "rating"
+
+class ProductImageCreate(BaseModel):
+    image_path: str
+    alt_text: Optional[str] = None
+    is_primary: bool = False
+    sort_order: int = 0
+
+class ProductVariantCreate(BaseModel):
+    name: str
+    value: str
+    price_adjustment: float = 0.0
+    stock_quantity: Optional[int] = Field(None, ge=0)
+
+class ProductCreate(BaseModel):
+    title: str
+    description: str
+    category: str
+    subcategory: Optional[str] = None
+    base_price: float = Field(..., gt=0)
+    currency: str = "USD"
+    price_type: str = "fixed"
+    stock_quantity: Optional[int] = Field(None, ge=0)
+    min_order_quantity: int = Field(1, ge=1)
+    max_order_quantity: Optional[int] = Field(None, ge=1)
+    specifications: Optional[Dict[str, Any]] = None
+    features: Optional[List[str]] = None
+    tags: List[str] = []
+    status: ProductStatus = ProductStatus.DRAFT
+    images: List[ProductImageCreate] = []
+    variants: List[ProductVariantCreate] = []
+
+    @validator('max_order_quantity')
+    def validate_max_order_quantity(cls, v, values):
+        if v and 'min_order_quantity' in values and v < values['min_order_quantity']:
+            raise ValueError('max_order_quantity must be at least min_order_quantity')
+        return v
+
+    @validator('tags')
+    def normalize_tags(cls, v):
+        # Stored lowercased and deduplicated so tag filters match exactly
+        return sorted({tag.strip().lower() for tag in v if tag.strip()})
+
+class ProductUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    base_price: Optional[float] = Field(None, gt=0)
+    stock_quantity: Optional[int] = Field(None, ge=0)
+    min_order_quantity: Optional[int] = Field(None, ge=1)
+    max_order_quantity: Optional[int] = Field(None, ge=1)
+    specifications: Optional[Dict[str, Any]] = None
+    features: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    status: Optional[ProductStatus] = None
+
+    @validator('tags')
+    def normalize_tags(cls, v):
+        if v is None:
+            return v
+        return sorted({tag.strip().lower() for tag in v if tag.strip()})
+
+class ProductImageResponse(BaseModel):
+    id: str
+    image_path: str
+    alt_text: Optional[str]
+    is_primary: bool
+    sort_order: int
+
+    class Config:
+        from_attributes = True
+
+class ProductVariantResponse(BaseModel):
+    id: str
+    name: str
+    value: str
+    price_adjustment: float
+    stock_quantity: Optional[int]
+
+    class Config:
+        from_attributes = True
+
+class ProductResponse(BaseModel):
+    id: str
+    title: str
+    description: str
+    category: str
+    subcategory: Optional[str]
+    base_price: float
+    currency: str
+    price_type: str
+    stock_quantity: Optional[int]
+    min_order_quantity: int
+    max_order_quantity: Optional[int]
+    seller_id: str
+    organization_id: Optional[str]
+    specifications: Optional[Dict[str, Any]]
+    features: Optional[List[Any]]
+    tags: Optional[List[str]]
+    status: ProductStatus
+    is_featured: bool
+    is_verified: bool
+    average_rating: float
+    rating_count: int
+    rating_histogram: List[int]  # Review counts for 1 to 5 stars
+    images: List[ProductImageResponse] = []
+    variants: List[ProductVariantResponse] = []
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ProductListResponse(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
+class ReservationCreate(BaseModel):
+    variant_id: Optional[str] = None
+    quantity: int = Field(1, ge=1)
+
+class ReservationResponse(BaseModel):
+    id: str
+    product_id: str
+    variant_id: Optional[str]
+    quantity: int
+    status: ReservationStatus
+    order_id: Optional[str]
+    expires_at: datetime
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockStripe(BaseModel):
+    variant_id: Optional[str] = None
+    shards: int = Field(..., ge=2, le=64)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
-from app.models.rfp import RFPStatus
+from app.models.rfp import RFPStatus, RequirementsStatus
 
 class RFPCreate(BaseModel):
     title: str
@@ -41,13 +41,66 @@ class RFPResponse(BaseModel):
     deadline: datetime
     location: Optional[str]
     requirements: Optional[Dict[str, Any]]
+    requirements_status: RequirementsStatus
     status: RFPStatus
     buyer_id: str
     organization_id: Optional[str]
     is_private: bool
     ai_summary: Optional[str]
+    awarded_offer_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+class RFPRequirementsResponse(BaseModel):
+    id: str
+    requirements_status: RequirementsStatus
+    requirements: Optional[Dict[str, Any]]
+    ai_summary: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class RFPListResponse(BaseModel):
+    items: List[RFPResponse]
+    next_cursor: Optional[str] = None
+
+class RFPSearchHit(RFPResponse):
+    rank: float
+
+class RFPSearchResponse(BaseModel):
+    items: List[RFPSearchHit]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+class SellerMatchResponse(BaseModel):
+    seller_id: str
+    score: float
+    specialty_score: float
+    category_match: bool
+    reputation_score: float
+    reasoning: Optional[str] = None
+
+class RFPMatchesResponse(BaseModel):
+    items: List[SellerMatchResponse]
+
+class SimilarProduct(BaseModel):
+    product_id: str
+    seller_id: str
+    title: str
+    category: str
+    base_price: float
+    score: float
+
+class SimilarProductsResponse(BaseModel):
+    items: List[SimilarProduct]
+
+class SimilarSeller(BaseModel):
+    seller_id: str
+    score: float
+    matching_products: int
+
+class SimilarSellersResponse(BaseModel):
+    items: List[SimilarSeller]
@@ -1,15 +1,16 @@
-import openai
 import json
-from typing import Dict, Any, List, Optional
+import logging
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
-from app.core.config import settings
+from app.services.conversation_store import conversation_store
+from app.services.llm_client import llm_client
+from app.services.prompt_builder import prompt_builder
 
-# Initialize OpenAI client
-openai.api_key = settings.OPENAI_API_KEY
+logger = logging.getLogger(__name__)
 
 class AIConciergeService:
-    def __init__(self):
-        self.conversation_history = {}
+    def __init__(self, history_store=conversation_store):
+        self.history_store = history_store
     
     async def process_message(
         self, 
@@ -20,103 +21,90 @@ class AIConciergeService:
         """Process a user message and return AI response with suggestions"""
         
         # Get conversation history
-        history = self.conversation_history.get(user_id, [])
-        
-        # Build context for AI
-        system_prompt = self._build_system_prompt(context)
-        user_prompt = self._build_user_prompt(message, history)
+        history = await self.history_store.get(user_id)
+        messages, prompt_usage = prompt_builder.build(message, history, context, self._analyze_intent(message))
         
         try:
-            response = await openai.ChatCompletion.acreate(
+            ai_response, _ = await llm_client.chat(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    *history,
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.7,
                 max_tokens=800
             )
             
-            ai_response = response.choices[0].message.content
-            
             # Generate suggestions based on the response
             suggestions = await self._generate_suggestions(message, ai_response, context)
             
-            # Update conversation history
-            history.append({"role": "user", "content": message})
-            history.append({"role": "assistant", "content": ai_response})
-            
-            # Keep only last 10 messages to manage context length
-            if len(history) > 10:
-                history = history[-10:]
-            
-            self.conversation_history[user_id] = history
+            # Update conversation history; the store keeps only the most
+            # recent messages to manage context length
+            await self.history_store.append(user_id, [
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": ai_response}
+            ])
             
             return {
                 "content": ai_response,
                 "type": "text",
                 "suggestions": suggestions,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": datetime.utcnow().isoformat(),
+                "prompt_usage": prompt_usage
             }
             
         except Exception as e:
-            return {
-                "content": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment.",
-                "type": "text",
-                "suggestions": ["Try again", "Contact support"],
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            return self._error_response()
     
-    def _build_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
-        """Build the system prompt for the AI concierge"""
-        
-        base_prompt = """You are an AI Concierge for an AI-powered marketplace platform. Your role is to help users with:
-
-1. **RFP Creation**: Help buyers write clear, detailed RFPs (Request for Proposals)
-2. **Offer Analysis**: Analyze and compare offers from sellers
-3. **Market Research**: Provide insights about market trends and pricing
-4. **Negotiation**: Offer advice for both buyers and sellers
-5. **Platform Guidance**: Help users navigate the marketplace features
-
-Key capabilities:
-- You can access user's RFPs, offers, and order history
-- You provide actionable advice with specific examples
-- You suggest relevant marketplace features
-- You maintain a helpful, professional tone
-
-Always provide practical, actionable advice and suggest next steps."""
+    async def stream_message(
+        self, 
+        user_id: str, 
+        message: str, 
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the AI response as token events, ending with a done event carrying suggestions"""
         
-        if context:
-            if context.get("user_role"):
-                base_prompt += f"\n\nCurrent user is a {context['user_role']}."
-            if context.get("active_rfp"):
-                base_prompt += f"\n\nUser is currently working on RFP: {context['active_rfp']['title']}"
-            if context.get("recent_orders"):
-                base_prompt += f"\n\nUser has {len(context['recent_orders'])} recent orders."
+        history = await self.history_store.get(user_id)
+        messages, prompt_usage = prompt_builder.build(message, history, context, self._analyze_intent(message))
+        tokens = []
         
-        return base_prompt
+        try:
+            async for token in llm_client.stream_chat(
+                model="gpt-4",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800
+            ):
+                tokens.append(token)
+                yield {"type": "token", "content": token}
+            
+        except Exception:
+            logger.exception("Concierge stream failed after %d tokens", len(tokens))
+            yield {**self._error_response(), "type": "error"}
+            return
+        
+        ai_response = "".join(tokens)
+        suggestions = await self._generate_suggestions(message, ai_response, context)
+        
+        # Only a completed stream becomes part of the conversation; a client
+        # that disconnects midway leaves the history untouched
+        await self.history_store.append(user_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": ai_response}
+        ])
+        
+        yield {
+            "type": "done",
+            "content": ai_response,
+            "suggestions": suggestions,
+            "timestamp": datetime.utcnow().isoformat(),
+            "prompt_usage": prompt_usage
+        }
     
-    def _build_user_prompt(self, message: str, history: List[Dict[str, str]]) -> str:
-        """Build the user prompt with context"""
-        
-        # Add context about the user's intent
-        intent_context = self._analyze_intent(message)
-        
-        prompt = f"""
-User message: "{message}"
-
-User intent: {intent_context}
-
-Please provide a helpful response with:
-1. Direct answer to their question
-2. Specific examples or templates if relevant
-3. Suggested next actions
-4. Relevant marketplace features they might want to use
-
-Keep the response conversational and actionable."""
-        
-        return prompt
+    def _error_response(self) -> Dict[str, Any]:
+        return {
+            "content": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment.",
+            "type": "text",
+            "suggestions": ["Try again", "Contact support"],
+            "timestamp": datetime.utcnow().isoformat()
+        }
     
     def _analyze_intent(self, message: str) -> str:
         """Analyze user intent from message"""
@@ -255,38 +243,9 @@ Keep the response conversational and actionable."""
         
         return templates.get(category, templates["consulting"])
     
-    async def analyze_offer(self, offer_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze an offer and provide insights"""
-        
-        analysis = {
-            "price_analysis": {
-                "market_position": "competitive",  # competitive, high, low
-                "value_score": 75,  # 0-100
-                "price_breakdown": "reasonable"
-            },
-            "seller_analysis": {
-                "reputation_score": offer_data.get("seller_rating", 0),
-                "response_time": "24 hours",
-                "completion_rate": "95%"
-            },
-            "risk_assessment": {
-                "overall_risk": "low",
-                "concerns": [],
-                "recommendations": []
-            },
-            "recommendations": [
-                "Consider requesting a detailed project timeline",
-                "Ask for references from similar projects",
-                "Negotiate payment terms (e.g., milestone payments)"
-            ]
-        }
-        
-        return analysis
-    
-    def clear_conversation_history(self, user_id: str):
+    async def clear_conversation_history(self, user_id: str):
         """Clear conversation history for a user"""
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
+        await self.history_store.clear(user_id)
 
 # Global instance
 ai_concierge = AIConciergeService()
@@ -1,10 +1,64 @@
-import openai
 import json
-from typing import Dict, Any, List
-from app.core.config import settings
+from typing import Callable, Dict, Any, List, Optional
+from app.services.llm_cache import llm_cache, make_cache_key
+from app.services.llm_client import llm_client
 
-# Initialize OpenAI client
-openai.api_key = settings.OPENAI_API_KEY
+# How long cached completions stay valid, per prompt type
+NORMALIZE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+SUMMARY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+COUNTEROFFER_CACHE_TTL_SECONDS = 6 * 3600
+
+def _parse_json_object(content: str) -> Dict[str, Any]:
+    """The JSON object in a completion, which may wrap it in markdown"""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1]
+    
+    value = json.loads(content.strip())
+    if not isinstance(value, dict):
+        raise ValueError("Completion is not a JSON object")
+    return value
+
+def _parse_counteroffer(content: str) -> Dict[str, Any]:
+    value = _parse_json_object(content)
+    if not isinstance(value.get("suggested_price"), (int, float)):
+        raise ValueError("Completion has no numeric suggested_price")
+    return value
+
+def _parse_summary(content: str) -> str:
+    summary = content.strip()
+    if not summary:
+        raise ValueError("Completion is empty")
+    return summary
+
+async def _cached_completion(
+    namespace: str,
+    ttl_seconds: int,
+    parse: Callable[[str], Any],
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int
+) -> Any:
+    """Chat completion served from the LLM cache when the same prompt was seen before.
+    
+    Returns the completion as read by ``parse``, which raises on output it
+    cannot use; such completions are not cached.
+    """
+    
+    async def create():
+        content, tokens = await llm_client.chat(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        parse(content)
+        return content, tokens
+    
+    key = make_cache_key(model, messages, temperature, max_tokens)
+    return parse(await llm_cache.get_or_create(namespace, key, ttl_seconds, create))
 
 async def normalize_rfp_requirements(description: str) -> Dict[str, Any]:
     """Use AI to normalize RFP requirements into structured format"""
@@ -25,7 +79,10 @@ async def normalize_rfp_requirements(description: str) -> Dict[str, Any]:
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
+        return await _cached_completion(
+            "normalize_rfp_requirements",
+            NORMALIZE_CACHE_TTL_SECONDS,
+            _parse_json_object,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert at analyzing business requirements and converting them into structured specifications."},
@@ -34,16 +91,6 @@ async def normalize_rfp_requirements(description: str) -> Dict[str, Any]:
             temperature=0.3,
             max_tokens=1000
         )
-        
-        # Parse the JSON response
-        content = response.choices[0].message.content
-        # Extract JSON from the response (in case it's wrapped in markdown)
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1]
-        
-        return json.loads(content.strip())
     
     except Exception as e:
         # Fallback to basic structure if AI fails
@@ -82,7 +129,7 @@ async def match_sellers_to_rfp(rfp_data: Dict[str, Any], sellers: List[Dict[str,
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
+        content, _ = await llm_client.chat(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert at matching buyers with the best suppliers based on requirements and capabilities."},
@@ -92,7 +139,6 @@ async def match_sellers_to_rfp(rfp_data: Dict[str, Any], sellers: List[Dict[str,
             max_tokens=800
         )
         
-        content = response.choices[0].message.content
         if "```json" in content:
             content = content.split("```json")[1].split("```")[0]
         elif "```" in content:
@@ -122,7 +168,10 @@ async def generate_rfp_summary(rfp_data: Dict[str, Any]) -> str:
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
+        return await _cached_completion(
+            "generate_rfp_summary",
+            SUMMARY_CACHE_TTL_SECONDS,
+            _parse_summary,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert at summarizing business requirements concisely."},
@@ -131,20 +180,31 @@ async def generate_rfp_summary(rfp_data: Dict[str, Any]) -> str:
             temperature=0.3,
             max_tokens=200
         )
-        
-        return response.choices[0].message.content.strip()
     
     except Exception as e:
         return f"RFP for {rfp_data['category']} services with budget range ${rfp_data.get('budget_min', 'N/A')} - ${rfp_data.get('budget_max', 'N/A')}"
 
-async def suggest_counteroffer(buyer_offer: float, seller_original: float, market_average: float) -> Dict[str, Any]:
+async def suggest_counteroffer(
+    buyer_offer: float,
+    seller_original: float,
+    market_average: float,
+    market_stats: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Generate a fair counteroffer suggestion"""
     
+    market_range = ""
+    if market_stats:
+        market_range = (
+            f"\n    Market median: ${market_stats['median']}"
+            f"\n    Typical range (p10-p90): ${market_stats['p10']} - ${market_stats['p90']}"
+            f" over {market_stats['count']} deals"
+        )
+    
     prompt = f"""
     Generate a fair counteroffer for:
     Buyer offer: ${buyer_offer}
     Seller original: ${seller_original}
-    Market average: ${market_average}
+    Market average: ${market_average}{market_range}
 
     Consider:
     - Quality differences
@@ -159,7 +219,10 @@ async def suggest_counteroffer(buyer_offer: float, seller_original: float, marke
     """
     
     try:
-        response = await openai.ChatCompletion.acreate(
+        return await _cached_completion(
+            "suggest_counteroffer",
+            COUNTEROFFER_CACHE_TTL_SECONDS,
+            _parse_counteroffer,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an expert negotiator who helps create fair and mutually beneficial deals."},
@@ -168,18 +231,18 @@ async def suggest_counteroffer(buyer_offer: float, seller_original: float, marke
             temperature=0.3,
             max_tokens=400
         )
-        
-        content = response.choices[0].message.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1]
-        
-        return json.loads(content.strip())
     
     except Exception as e:
         # Fallback calculation
         suggested_price = (buyer_offer + seller_original) / 2
+        if market_stats:
+            # Keep the midpoint within what the category usually trades at
+            suggested_price = min(max(suggested_price, market_stats["p10"]), market_stats["p90"])
+            return {
+                "suggested_price": suggested_price,
+                "reasoning": f"Midpoint between buyer offer and seller original, kept within the typical market range (median ${market_stats['median']})",
+                "negotiation_tips": ["Focus on value proposition", "Consider payment terms", "Discuss delivery timeline"]
+            }
         return {
             "suggested_price": suggested_price,
             "reasoning": "Midpoint between buyer offer and seller original",
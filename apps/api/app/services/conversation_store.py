@@ -0,0 +1,148 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis import get_redis
+
+Message = Dict[str, str]
+
+def _message_size(message: Message) -> int:
+    """Bytes a message takes once serialized, as stored in Redis"""
+    return len(json.dumps(message).encode("utf-8"))
+
+class MemoryConversationStore:
+    """Per-process chat histories bounded by user count and total size.
+
+    Each user keeps at most ``max_messages`` messages. Least recently
+    active users are evicted once either ``max_users`` or ``max_bytes`` is
+    exceeded, and histories idle for ``ttl_seconds`` are dropped on access.
+    """
+
+    def __init__(self, max_users: int, max_bytes: int, max_messages: int, ttl_seconds: int):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        # user_id -> (expires_at, messages, size in bytes)
+        self._histories: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def _drop(self, user_id: str):
+        entry = self._histories.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    async def get(self, user_id: str) -> List[Message]:
+        entry = self._histories.get(user_id)
+        if entry is None:
+            return []
+        if entry[0] < time.monotonic():
+            self._drop(user_id)
+            return []
+        self._histories.move_to_end(user_id)
+        return list(entry[1])
+
+    async def append(self, user_id: str, messages: List[Message]):
+        entry = self._histories.get(user_id)
+        history = entry[1] if entry is not None and entry[0] >= time.monotonic() else []
+        history = (history + messages)[-self.max_messages:]
+        size = sum(_message_size(message) for message in history)
+
+        self._drop(user_id)
+        self._histories[user_id] = (time.monotonic() + self.ttl_seconds, history, size)
+        self._bytes += size
+
+        while self._histories and (len(self._histories) > self.max_users or self._bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._histories.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    async def clear(self, user_id: str):
+        self._drop(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "users": len(self._histories),
+            "bytes": self._bytes,
+            "max_users": self.max_users,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+class RedisConversationStore:
+    """Chat histories kept as Redis lists, shared by every worker.
+
+    Appends push, trim to ``max_messages`` and refresh the key's TTL in one
+    round trip, so Redis bounds both the length and lifetime of each history.
+    Redis errors degrade to an empty history instead of failing the chat.
+    """
+
+    def __init__(self, max_messages: int, ttl_seconds: int):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.bytes_written = 0
+        self.errors = 0
+
+    def _key(self, user_id: str) -> str:
+        return f"concierge:history:{user_id}"
+
+    async def get(self, user_id: str) -> List[Message]:
+        try:
+            raw = await get_redis().lrange(self._key(user_id), 0, -1)
+        except RedisError:
+            self.errors += 1
+            return []
+        return [json.loads(item) for item in raw]
+
+    async def append(self, user_id: str, messages: List[Message]):
+        key = self._key(user_id)
+        payloads = [json.dumps(message) for message in messages]
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                pipe.rpush(key, *payloads)
+                pipe.ltrim(key, -self.max_messages, -1)
+                pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+        except RedisError:
+            self.errors += 1
+            return
+        self.bytes_written += sum(len(payload.encode("utf-8")) for payload in payloads)
+
+    async def clear(self, user_id: str):
+        try:
+            await get_redis().delete(self._key(user_id))
+        except RedisError:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "bytes_written": self.bytes_written,
+            "errors": self.errors,
+        }
+
+def create_conversation_store():
+    """Build the history store selected by CONVERSATION_STORE"""
+    if settings.CONVERSATION_STORE == "redis":
+        return RedisConversationStore(
+            max_messages=settings.CONVERSATION_MAX_MESSAGES,
+            ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+        )
+    return MemoryConversationStore(
+        max_users=settings.CONVERSATION_MEMORY_MAX_USERS,
+        max_bytes=settings.CONVERSATION_MEMORY_MAX_BYTES,
+        max_messages=settings.CONVERSATION_MAX_MESSAGES,
+        ttl_seconds=settings.CONVERSATION_TTL_SECONDS,
+    )
+
+# Global instance
+conversation_store = create_conversation_store()
+
+metrics.register("conversation_store", conversation_store.stats)
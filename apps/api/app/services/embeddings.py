@@ -0,0 +1,380 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.product import Product, ProductStatus
+
+# Below this many vectors a brute-force scan is as fast as the IVF probe
+MIN_TRAIN_SIZE = 4096
+KMEANS_SAMPLE_SIZE = 50000
+KMEANS_ITERATIONS = 8
+LOAD_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _flatten(value: Any) -> Iterable[str]:
+    """Strings inside a JSON value, whatever its shape"""
+    if value is None:
+        return
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    else:
+        yield str(value)
+
+def product_text(product) -> str:
+    parts = [product.title, product.category, product.subcategory, product.description]
+    for field in (product.specifications, product.features, product.tags):
+        parts.extend(_flatten(field))
+    return " ".join(part for part in parts if part)
+
+def rfp_text(rfp) -> str:
+    requirements = rfp.requirements or {}
+    parts = [rfp.title, rfp.category]
+    if requirements:
+        for field in ("category", "specifications", "technical_requirements", "quality_standards"):
+            parts.extend(_flatten(requirements.get(field)))
+    else:
+        parts.append(rfp.description)
+    return " ".join(part for part in parts if part)
+
+class HashingEncoder:
+    """Dependency-free encoder: signed feature hashing of word unigrams and bigrams.
+
+    Deterministic and fast, which makes it suitable for offline tests and
+    as a baseline; swap in a learned model through ENCODERS for semantics.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _encode_one(self, text: str, out: np.ndarray):
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = Counter(tokens)
+        features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        for feature, count in features.items():
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            weight = 1.0 + math.log(count)
+            out[h % self.dimensions] += weight if (h >> 32) & 1 else -weight
+        norm = np.linalg.norm(out)
+        if norm:
+            out /= norm
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            self._encode_one(text, vectors[i])
+        return vectors
+
+# Encoders selectable with EMBEDDING_ENCODER. An encoder takes the vector
+# size and exposes ``dimensions`` and ``async encode(texts) -> (n, d) float32``
+# returning L2-normalized rows.
+ENCODERS: Dict[str, Callable[[int], Any]] = {
+    "hashing": HashingEncoder,
+}
+
+class VectorStore:
+    """Fixed-width float32 vectors in a memory-mapped file, addressed by row.
+
+    Rows of deleted ids are reused. The file grows by doubling, so vectors
+    live in the page cache rather than on the Python heap. It is an
+    anonymous temporary file in ``directory``, gone once the process exits.
+    """
+
+    def __init__(self, directory: str, dimensions: int, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._file = tempfile.TemporaryFile(dir=directory, prefix="product-embeddings-")
+        self.capacity = 0
+        self.data: Optional[np.memmap] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self._resize(initial_capacity)
+
+    def _resize(self, capacity: int):
+        if self.data is not None:
+            self.data.flush()
+        self._file.truncate(capacity * self.dimensions * 4)
+        self.data = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def size(self) -> int:
+        """Rows in use, including deleted ones"""
+        return len(self.ids)
+
+    def upsert(self, item_id: str, vector: np.ndarray) -> Tuple[int, bool]:
+        """Store ``vector`` for ``item_id``; returns its row and whether the row is new"""
+        row = self.rows.get(item_id)
+        created = row is None
+        if created:
+            if self._free:
+                row = self._free.pop()
+                self.ids[row] = item_id
+            else:
+                row = len(self.ids)
+                if row >= self.capacity:
+                    self._resize(self.capacity * 2)
+                self.ids.append(item_id)
+            self.rows[item_id] = row
+            self.alive[row] = True
+        self.data[row] = vector
+        return row, created
+
+    def delete(self, item_id: str) -> Optional[int]:
+        row = self.rows.pop(item_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.ids[row] = None
+            self._free.append(row)
+        return row
+
+class IVFIndex:
+    """Inverted-file ANN index over a VectorStore.
+
+    k-means centroids partition the vectors; a query scans only the lists
+    of its ``nprobe`` nearest centroids. Rows added after training join the
+    list of their nearest centroid. Until there are enough vectors to
+    train, queries use exact search.
+    """
+
+    def __init__(self, store: VectorStore, nprobe: int):
+        self.store = store
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[List[int]] = []
+        # row -> (list, position in it), so a row leaves its list in O(1)
+        self.row_list: Dict[int, Tuple[int, int]] = {}
+        self.trained_size = 0
+
+    @property
+    def needs_training(self) -> bool:
+        live = len(self.store)
+        if self.centroids is None:
+            return live >= MIN_TRAIN_SIZE
+        return live > 2 * self.trained_size
+
+    def train(self):
+        """Fit centroids on a sample and assign every live row (CPU bound, run in a thread)"""
+        store = self.store
+        live_rows = np.flatnonzero(store.alive[:store.size])
+        nlist = max(1, min(4096, int(math.sqrt(len(live_rows)))))
+        rng = np.random.default_rng(0)
+        sample = store.data[rng.choice(live_rows, size=min(len(live_rows), KMEANS_SAMPLE_SIZE), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignment == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+
+        lists: List[List[int]] = [[] for _ in range(nlist)]
+        row_list: Dict[int, Tuple[int, int]] = {}
+        for start in range(0, len(live_rows), 65536):
+            rows = live_rows[start:start + 65536]
+            for row, c in zip(rows.tolist(), np.argmax(store.data[rows] @ centroids.T, axis=1).tolist()):
+                row_list[row] = (c, len(lists[c]))
+                lists[c].append(row)
+
+        self.centroids, self.lists, self.row_list = centroids, lists, row_list
+        self.trained_size = len(live_rows)
+
+    def add(self, row: int, vector: np.ndarray):
+        self.remove(row)
+        if self.centroids is not None:
+            c = int(np.argmax(self.centroids @ vector))
+            self.row_list[row] = (c, len(self.lists[c]))
+            self.lists[c].append(row)
+
+    def remove(self, row: int):
+        entry = self.row_list.pop(row, None)
+        if entry is None:
+            return
+        # Move the list's last row into the hole; list order doesn't matter
+        c, position = entry
+        members = self.lists[c]
+        last = members.pop()
+        if last != row:
+            members[position] = last
+            self.row_list[last] = (c, position)
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        store = self.store
+        if self.centroids is None:
+            candidates = np.flatnonzero(store.alive[:store.size])
+        else:
+            probe = np.argpartition(-(self.centroids @ query), min(self.nprobe, len(self.centroids)) - 1)[:self.nprobe]
+            candidates = np.fromiter(
+                (row for c in probe.tolist() for row in self.lists[c]), dtype=np.int64
+            )
+        if not len(candidates):
+            return []
+
+        scores = store.data[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+class EmbeddingIndex:
+    """Product embeddings kept in sync with the products table.
+
+    Each process builds its own store from the database on first use, then
+    applies committed product changes captured by session events. RFP
+    vectors are encoded per query, so they are always current.
+    """
+
+    def __init__(self, encoder, directory: str, nprobe: int):
+        self.encoder = encoder
+        self.directory = directory
+        self.nprobe = nprobe
+        self.store: Optional[VectorStore] = None
+        self.ivf: Optional[IVFIndex] = None
+        self.sellers: Dict[str, str] = {}  # product id -> seller id
+        self.pending: Dict[str, Optional[Tuple[str, str]]] = {}  # product id -> (text, seller id), None to delete
+        self._lock = asyncio.Lock()
+        self.queries = 0
+        self.last_query_ms = 0.0
+        self.trainings = 0
+
+    async def _load(self, db: AsyncSession):
+        store = VectorStore(self.directory, self.encoder.dimensions)
+        ivf = IVFIndex(store, self.nprobe)
+        result = await db.stream(
+            select(Product).where(Product.status == ProductStatus.ACTIVE).execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        async for products in result.scalars().partitions():
+            vectors = await self.encoder.encode([product_text(product) for product in products])
+            for product, vector in zip(products, vectors):
+                store.upsert(str(product.id), vector)
+                self.sellers[str(product.id)] = str(product.seller_id)
+        self.store, self.ivf = store, ivf
+
+    async def _apply_pending(self):
+        pending, self.pending = self.pending, {}
+        upserts = [(product_id, change) for product_id, change in pending.items() if change is not None]
+        vectors = await self.encoder.encode([text for _, (text, _) in upserts]) if upserts else []
+        for (product_id, (_, seller_id)), vector in zip(upserts, vectors):
+            row, _ = self.store.upsert(product_id, vector)
+            self.ivf.add(row, vector)
+            self.sellers[product_id] = seller_id
+        for product_id, change in pending.items():
+            if change is None:
+                row = self.store.delete(product_id)
+                self.sellers.pop(product_id, None)
+                if row is not None:
+                    self.ivf.remove(row)
+
+    async def ensure_ready(self, db: AsyncSession):
+        if self.store is not None and not self.pending and not self.ivf.needs_training:
+            return
+        async with self._lock:
+            if self.store is None:
+                # Changes committed before the load are already in the table
+                self.pending = {}
+                await self._load(db)
+            if self.pending:
+                await self._apply_pending()
+            if self.ivf.needs_training:
+                await asyncio.to_thread(self.ivf.train)
+                self.trainings += 1
+
+    async def similar_products(self, db: AsyncSession, text: str, k: int) -> List[Tuple[str, float]]:
+        """Ids and cosine scores of the ``k`` products closest to ``text``"""
+        await self.ensure_ready(db)
+        query = (await self.encoder.encode([text]))[0]
+
+        started = time.perf_counter()
+        hits = self.ivf.search(query, k)
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+        self.queries += 1
+        # Orthogonal vectors share nothing; don't pad results with them
+        return [(self.store.ids[row], score) for row, score in hits if score > 0]
+
+    async def similar_sellers(self, db: AsyncSession, text: str, k: int, products_per_seller: int = 5) -> List[Dict[str, Any]]:
+        """Sellers ranked by their best-matching product"""
+        hits = await self.similar_products(db, text, k * products_per_seller)
+        sellers: Dict[str, Dict[str, Any]] = {}
+        for product_id, score in hits:
+            seller_id = self.sellers.get(product_id)
+            if seller_id is None:
+                continue
+            entry = sellers.setdefault(seller_id, {"seller_id": seller_id, "score": score, "matching_products": 0})
+            entry["matching_products"] += 1
+        return sorted(sellers.values(), key=lambda entry: entry["score"], reverse=True)[:k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "encoder": type(self.encoder).__name__,
+            "dimensions": self.encoder.dimensions,
+            "vectors": len(self.store) if self.store is not None else 0,
+            "lists": len(self.ivf.lists) if self.ivf is not None else 0,
+            "trainings": self.trainings,
+            "pending": len(self.pending),
+            "queries": self.queries,
+            "last_query_ms": round(self.last_query_ms, 3),
+        }
+
+def _index_dir() -> str:
+    directory = settings.EMBEDDING_DATA_DIR or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+# Global instance
+embedding_index = EmbeddingIndex(
+    encoder=ENCODERS[settings.EMBEDDING_ENCODER](settings.EMBEDDING_DIMENSIONS),
+    directory=_index_dir(),
+    nprobe=settings.EMBEDDING_NPROBE,
+)
+
+metrics.register("embeddings", embedding_index.stats)
+
+def _collect_product_changes(session, flush_context):
+    changes = session.info.setdefault("embedding_changes", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Product):
+            active = obj.status == ProductStatus.ACTIVE
+            changes[str(obj.id)] = (product_text(obj), str(obj.seller_id)) if active else None
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes[str(obj.id)] = None
+
+def _publish_product_changes(session):
+    changes = session.info.pop("embedding_changes", None)
+    if changes and embedding_index.store is not None:
+        embedding_index.pending.update(changes)
+
+def _discard_product_changes(session):
+    session.info.pop("embedding_changes", None)
+
+event.listen(Session, "after_flush", _collect_product_changes)
+event.listen(Session, "after_commit", _publish_product_changes)
+event.listen(Session, "after_rollback", _discard_product_changes)
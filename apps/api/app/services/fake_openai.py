@@ -0,0 +1,71 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers ``/v1/chat/completions`` like OpenAI does, streamed or not, after
+a configurable delay before the first token and between tokens. Used to
+measure the concierge's time to first token without an API key:
+
+    python -m app.services.fake_openai --port 8001 --first-token-ms 300 --token-ms 20
+    OPENAI_BASE_URL=http://localhost:8001/v1 uvicorn main:app
+"""
+import asyncio
+import json
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPLY = (
+    "A clear RFP states what you need, when you need it and how offers will be compared. "
+    "Start with the scope, list must-have requirements separately from nice-to-haves, "
+    "and give sellers a budget range so their quotes are comparable."
+)
+
+def _tokens(max_tokens: int) -> List[str]:
+    """The canned reply split into word tokens, at most ``max_tokens`` of them"""
+    words = REPLY.split(" ")
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words)][:max_tokens]
+
+def create_app(first_token_seconds: float = 0.3, token_seconds: float = 0.02) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        tokens = _tokens(body.get("max_tokens") or 800)
+        app.state.requests += 1
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_seconds + token_seconds * (len(tokens) - 1))
+            return {
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                "usage": {"total_tokens": len(tokens)},
+            }
+
+        async def chunks():
+            await asyncio.sleep(first_token_seconds)
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(token_seconds)
+                chunk = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI chat completions")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-ms", type=float, default=300)
+    parser.add_argument("--token-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.first_token_ms / 1000, args.token_ms / 1000), port=args.port)
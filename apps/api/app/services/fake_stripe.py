@@ -0,0 +1,170 @@
+"""Local stand-in for Stripe's webhook deliveries.
+
+Builds payment intent and refund events shaped like Stripe's, signs them
+with the webhook secret the way Stripe does and posts them to the webhook
+endpoint, duplicated and out of order as Stripe may deliver them. Used to
+exercise the inbox and the payments worker without a Stripe account:
+
+    python -m app.services.fake_stripe --url http://localhost:8000/api/v1/payments/stripe/webhook --orders 100
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Ways a fake payment can go, with how often the command line run picks each
+OUTCOMES = {
+    "succeeded": 0.6,
+    "failed_then_succeeded": 0.15,
+    "failed": 0.1,
+    "refunded": 0.15,
+}
+
+def signature_header(payload: str, secret: str, timestamp: Optional[int] = None) -> str:
+    """A Stripe-Signature header for ``payload``"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+class FakeStripe:
+    """Generates and delivers webhook events for orders"""
+
+    def __init__(self, secret: str, seed: Optional[int] = None):
+        self.secret = secret
+        self.random = random.Random(seed)
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_{secrets.token_hex(12)}"
+
+    def event(self, event_type: str, obj: Dict[str, Any], created: int) -> Dict[str, Any]:
+        return {
+            "id": self._id("evt"),
+            "object": "event",
+            "type": event_type,
+            "created": created,
+            "livemode": False,
+            "data": {"object": obj},
+        }
+
+    def payment_events(self, order_id: str, amount: float, outcome: str, created: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The events of one order's payment ending in ``outcome`` (see ``OUTCOMES``), in creation order"""
+        created = int(time.time()) if created is None else created
+        cents = round(amount * 100)
+        intent = {
+            "id": self._id("pi"),
+            "object": "payment_intent",
+            "amount": cents,
+            "amount_received": 0,
+            "currency": "usd",
+            "metadata": {"order_id": order_id},
+        }
+
+        events = []
+        if outcome in ("failed", "failed_then_succeeded"):
+            events.append(self.event("payment_intent.payment_failed", {**intent, "status": "requires_payment_method"}, created))
+        if outcome != "failed":
+            paid = {**intent, "status": "succeeded", "amount_received": cents}
+            events.append(self.event("payment_intent.succeeded", paid, created + len(events)))
+        if outcome == "refunded":
+            charge = {
+                "id": self._id("ch"),
+                "object": "charge",
+                "amount": cents,
+                "amount_refunded": cents,
+                "refunded": True,
+                "payment_intent": intent["id"],
+                "metadata": {},
+            }
+            events.append(self.event("charge.refunded", charge, created + len(events)))
+        return events
+
+    def deliveries(self, events: List[Dict[str, Any]], duplicate_rate: float = 0.1, shuffle: bool = True) -> List[Tuple[str, str]]:
+        """Signed (payload, signature header) requests for ``events``, some repeated and reordered"""
+        requests = []
+        for event in events:
+            payload = json.dumps(event)
+            copies = 2 if self.random.random() < duplicate_rate else 1
+            requests.extend([(payload, signature_header(payload, self.secret))] * copies)
+        if shuffle:
+            self.random.shuffle(requests)
+        return requests
+
+    async def deliver(self, client: httpx.AsyncClient, url: str, requests: List[Tuple[str, str]], concurrency: int = 20) -> List[httpx.Response]:
+        """Post the requests, ``concurrency`` at a time"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def post(payload: str, header: str) -> httpx.Response:
+            async with semaphore:
+                return await client.post(
+                    url, content=payload, headers={"Content-Type": "application/json", "Stripe-Signature": header}
+                )
+
+        return await asyncio.gather(*[post(payload, header) for payload, header in requests])
+
+async def _main(url: str, orders: int, duplicate_rate: float, seed: Optional[int]):
+    from sqlalchemy import select
+
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal, engine
+    from app.models.order import Order, PaymentStatus
+
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Order.id, Order.amount)
+                .where(Order.payment_status == PaymentStatus.PENDING, Order.payment_intent_id.is_(None))
+                .limit(orders)
+            )
+            unpaid = result.all()
+    finally:
+        await engine.dispose()
+
+    fake = FakeStripe(settings.STRIPE_WEBHOOK_SECRET, seed)
+    outcomes = {}
+    events = []
+    for order in unpaid:
+        outcome = fake.random.choices(list(OUTCOMES), weights=list(OUTCOMES.values()))[0]
+        outcomes[str(order.id)] = outcome
+        events.extend(fake.payment_events(str(order.id), float(order.amount), outcome))
+
+    requests = fake.deliveries(events, duplicate_rate)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30) as client:
+        responses = await fake.deliver(client, url, requests)
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for response in responses:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    expected = {}
+    for outcome in outcomes.values():
+        expected[outcome] = expected.get(outcome, 0) + 1
+    print(json.dumps({
+        "orders": len(unpaid),
+        "events": len(events),
+        "deliveries": len(requests),
+        "statuses": statuses,
+        "seconds": round(elapsed, 2),
+        "outcomes": expected,
+    }, indent=2))
+
+if __name__ == "__main__":
+    import argparse
+
+    # Register every mapped model so relationships resolve
+    from app.workers import celery_app  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="Deliver fake Stripe payment events for unpaid orders")
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/payments/stripe/webhook")
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(_main(args.url, args.orders, args.duplicate_rate, args.seed))
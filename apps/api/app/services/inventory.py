@@ -0,0 +1,445 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Integer, column, func, or_, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.inventory import ReservationStatus, StockReservation, StockShard
+from app.models.product import Product, ProductVariant
+from app.services.product_cache import product_listing_cache
+
+# Random stripes tried before a reservation falls back to locking them all
+SHARD_ATTEMPTS = 3
+
+# Advisory lock serializing sweeps, so two workers never lock stock rows in different orders
+SWEEP_LOCK_KEY = 7342001
+
+def _category(table):
+    """Category of the product a product or variant row belongs to, for RETURNING"""
+    if table is Product.__table__:
+        return table.c.category
+    return select(Product.category).where(Product.id == table.c.product_id).scalar_subquery().label("category")
+
+class InventoryError(Exception):
+    """Raised when a stock operation does not apply to the SKU"""
+
+class OutOfStock(InventoryError):
+    """Raised when a SKU cannot cover the requested quantity"""
+
+def _counter_values(table, **values):
+    # Stock movements are not edits of the product itself
+    if "updated_at" in table.c:
+        values["updated_at"] = table.c.updated_at
+    return values
+
+class Inventory:
+    """Holds stock for buyers with reservations that expire.
+
+    Every decrement is a conditional UPDATE (``quantity >= requested``)
+    under a row lock, so stock can never go negative however many buyers
+    race for it. A SKU's stock lives in its product's or variant's
+    ``stock_quantity``, or, once striped for a flash sale, across
+    ``stock_shards`` rows so concurrent buyers lock different rows.
+    Reservations start HELD; committing turns them into a sale and
+    releasing or expiring returns their units to where they were taken.
+    Cached listings show the counters (stripes only through their
+    snapshot), so a change to one expires its category's listings when
+    the transaction commits.
+    """
+
+    def __init__(self, reservation_ttl_seconds: int, release_batch_size: int, release_max_batches: int):
+        self.reservation_ttl = timedelta(seconds=reservation_ttl_seconds)
+        self.release_batch_size = release_batch_size
+        self.release_max_batches = release_max_batches
+        self.reserved = 0
+        self.out_of_stock = 0
+        self.shard_retries = 0
+        self.shard_consolidations = 0
+        self.committed = 0
+        self.released = 0
+        self.expired = 0
+        self.last_sweep_ms = 0.0
+        # SKUs known to be striped; a SKU never stops being striped
+        self._striped: Set[Any] = set()
+
+    async def _sku(self, db: AsyncSession, product_id, variant_id) -> Tuple[Any, Any, bool]:
+        """The table and row id holding a SKU's stock, and whether it is the variant's"""
+        products = Product.__table__
+        if variant_id is None:
+            return products, product_id, False
+
+        result = await db.execute(
+            select(ProductVariant.stock_quantity, ProductVariant.stock_shards)
+            .where(ProductVariant.id == variant_id, ProductVariant.product_id == product_id)
+        )
+        variant = result.first()
+        if variant is None:
+            raise InventoryError("Variant not found")
+        # Variants without their own stock draw on the product's
+        if variant.stock_quantity is None and not variant.stock_shards:
+            return products, product_id, False
+        return ProductVariant.__table__, variant_id, True
+
+    async def _take_from_counter(self, db: AsyncSession, table, sku_id, quantity: int) -> bool:
+        """Take ``quantity`` units from an unstriped SKU's counter in one statement.
+
+        Untracked (null) stock is unlimited and stays null. False when the
+        SKU is short or striped.
+        """
+        result = await db.execute(
+            update(table)
+            .where(
+                table.c.id == sku_id,
+                table.c.stock_shards == 0,
+                or_(table.c.stock_quantity.is_(None), table.c.stock_quantity >= quantity),
+            )
+            .values(**_counter_values(table, stock_quantity=table.c.stock_quantity - quantity))
+            .returning(_category(table))
+        )
+        taken = result.first()
+        if taken is None:
+            return False
+        product_listing_cache.invalidate_on_commit(db, [taken.category])
+        return True
+
+    async def _take_from_shards(self, db: AsyncSession, sku_id, quantity: int) -> int:
+        """Take ``quantity`` units from one stripe of a striped SKU; returns the stripe.
+
+        The stripe is picked at random among those that could cover the
+        quantity, from an unlocked read, then decremented conditionally.
+        An UPDATE that loses the race keeps the stripe locked, so each
+        attempt runs in a savepoint whose rollback frees it: a buyer only
+        ever waits on the one stripe it is after, never while holding
+        another, and stripes cannot deadlock.
+        """
+        for _ in range(SHARD_ATTEMPTS):
+            candidate = (
+                select(StockShard.shard)
+                .where(StockShard.sku_id == sku_id, StockShard.quantity >= quantity)
+                .order_by(func.random())
+                .limit(1)
+                .scalar_subquery()
+            )
+            attempt = await db.begin_nested()
+            result = await db.execute(
+                update(StockShard)
+                .where(StockShard.sku_id == sku_id, StockShard.shard == candidate, StockShard.quantity >= quantity)
+                .values(quantity=StockShard.quantity - quantity)
+                .returning(StockShard.shard)
+                .execution_options(synchronize_session=False)
+            )
+            shard = result.scalar()
+            if shard is not None:
+                await attempt.commit()
+                return shard
+            await attempt.rollback()
+            # An unlocked total settles the common sold-out case without locking
+            total = (await db.execute(
+                select(func.coalesce(func.sum(StockShard.quantity), 0)).where(StockShard.sku_id == sku_id)
+            )).scalar()
+            if total < quantity:
+                raise OutOfStock()
+            self.shard_retries += 1
+
+        # No single stripe holds enough: take from several, fullest first,
+        # locking them in shard order like every other writer
+        result = await db.execute(
+            select(StockShard.shard, StockShard.quantity)
+            .where(StockShard.sku_id == sku_id)
+            .order_by(StockShard.shard)
+            .with_for_update()
+        )
+        stripes = sorted(result.all(), key=lambda stripe: -stripe.quantity)
+        if sum(stripe.quantity for stripe in stripes) < quantity:
+            raise OutOfStock()
+
+        self.shard_consolidations += 1
+        remaining = quantity
+        deltas = []
+        for stripe in stripes:
+            if remaining <= 0:
+                break
+            taken = min(stripe.quantity, remaining)
+            deltas.append((sku_id, stripe.shard, -taken))
+            remaining -= taken
+        await self._add_to_shards(db, deltas)
+        # Released units all go back to the stripe that gave the most
+        return deltas[0][1]
+
+    async def _add_to_shards(self, db: AsyncSession, deltas: List[Tuple[Any, int, int]]):
+        """Apply (sku_id, shard, delta) adjustments to stripes in one statement"""
+        if not deltas:
+            return
+        changes = values(
+            column("sku_id", UUID(as_uuid=True)), column("shard", Integer), column("delta", Integer), name="changes"
+        ).data(deltas)
+        await db.execute(
+            update(StockShard)
+            .where(StockShard.sku_id == changes.c.sku_id, StockShard.shard == changes.c.shard)
+            .values(quantity=StockShard.quantity + changes.c.delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _restore(self, db: AsyncSession, reservations):
+        """Return the units of released reservations to where they were taken"""
+        products, variants = Product.__table__, ProductVariant.__table__
+        counter_deltas = {products: defaultdict(int), variants: defaultdict(int)}
+        shard_deltas = defaultdict(int)
+        for reservation in reservations:
+            sku_id = reservation.variant_id if reservation.from_variant else reservation.product_id
+            if reservation.shard is None:
+                counter_deltas[variants if reservation.from_variant else products][sku_id] += reservation.quantity
+            else:
+                shard_deltas[(sku_id, reservation.shard)] += reservation.quantity
+
+        # Rows are locked in key order, counters before stripes, like every other writer
+        for table, deltas in counter_deltas.items():
+            if not deltas:
+                continue
+            await db.execute(
+                select(table.c.id).where(table.c.id.in_(list(deltas))).order_by(table.c.id).with_for_update()
+            )
+            changes = values(
+                column("sku_id", UUID(as_uuid=True)), column("delta", Integer), name="changes"
+            ).data(sorted(deltas.items()))
+            result = await db.execute(
+                update(table)
+                .where(table.c.id == changes.c.sku_id, table.c.stock_shards == 0)
+                .values(**_counter_values(table, stock_quantity=table.c.stock_quantity + changes.c.delta))
+                .returning(table.c.id, _category(table))
+            )
+            rows = result.all()
+            restored = {row.id for row in rows}
+            if rows:
+                product_listing_cache.invalidate_on_commit(db, [row.category for row in rows])
+            # SKUs striped since the units were taken get them back on their first stripe
+            for sku_id, delta in deltas.items():
+                if sku_id not in restored:
+                    shard_deltas[(sku_id, 0)] += delta
+
+        if shard_deltas:
+            keys = sorted(shard_deltas)
+            await db.execute(
+                select(StockShard.shard)
+                .where(tuple_(StockShard.sku_id, StockShard.shard).in_(keys))
+                .order_by(StockShard.sku_id, StockShard.shard)
+                .with_for_update()
+            )
+            await self._add_to_shards(db, [(sku_id, shard, shard_deltas[(sku_id, shard)]) for sku_id, shard in keys])
+
+    async def reserve(self, db: AsyncSession, user_id, product_id, variant_id, quantity: int) -> StockReservation:
+        """Hold ``quantity`` units of a SKU for ``user_id``; runs in the caller's transaction"""
+        table, sku_id, from_variant = await self._sku(db, product_id, variant_id)
+
+        shard = None
+        try:
+            if sku_id in self._striped:
+                shard = await self._take_from_shards(db, sku_id, quantity)
+            elif not await self._take_from_counter(db, table, sku_id, quantity):
+                sku = (await db.execute(select(table.c.stock_shards).where(table.c.id == sku_id))).first()
+                if sku is None:
+                    raise InventoryError("Product not found")
+                if not sku.stock_shards:
+                    raise OutOfStock()
+                self._striped.add(sku_id)
+                shard = await self._take_from_shards(db, sku_id, quantity)
+        except OutOfStock:
+            self.out_of_stock += 1
+            raise
+
+        reservation = StockReservation(
+            product_id=product_id,
+            variant_id=variant_id,
+            user_id=user_id,
+            quantity=quantity,
+            from_variant=from_variant,
+            shard=shard,
+            status=ReservationStatus.HELD,
+            expires_at=datetime.utcnow() + self.reservation_ttl,
+        )
+        db.add(reservation)
+        await db.flush()
+        self.reserved += 1
+        return reservation
+
+    async def commit(self, db: AsyncSession, reservation_ids, user_id, order_id) -> List[StockReservation]:
+        """Turn unexpired held reservations into sales for ``order_id``; returns those that were held"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id.in_(reservation_ids),
+                StockReservation.user_id == user_id,
+                StockReservation.status == ReservationStatus.HELD,
+                StockReservation.expires_at > now,
+            )
+            .values(status=ReservationStatus.COMMITTED, order_id=order_id, updated_at=now)
+            .returning(StockReservation)
+        )
+        reservations = result.scalars().all()
+        self.committed += len(reservations)
+        return reservations
+
+    async def release(self, db: AsyncSession, reservation_id, user_id) -> Optional[StockReservation]:
+        """Give back a held reservation's units; None if it is not held"""
+        result = await db.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id == reservation_id,
+                StockReservation.user_id == user_id,
+                StockReservation.status == ReservationStatus.HELD,
+            )
+            .values(status=ReservationStatus.RELEASED, updated_at=datetime.utcnow())
+            .returning(StockReservation)
+        )
+        reservation = result.scalar_one_or_none()
+        if reservation is not None:
+            await self._restore(db, [reservation])
+            self.released += 1
+        return reservation
+
+    async def stripe(self, db: AsyncSession, product_id, variant_id, shards: int):
+        """Spread a SKU's stock evenly over ``shards`` stripes; stripes can only be added"""
+        table, sku_id, _ = await self._sku(db, product_id, variant_id)
+        result = await db.execute(
+            select(table.c.stock_quantity, table.c.stock_shards).where(table.c.id == sku_id).with_for_update()
+        )
+        sku = result.first()
+        if sku is None:
+            raise InventoryError("Product not found")
+        if sku.stock_quantity is None and not sku.stock_shards:
+            raise InventoryError("Only tracked stock can be striped")
+        if shards <= sku.stock_shards:
+            raise InventoryError("A SKU's stripes can only be added to")
+
+        if sku.stock_shards:
+            result = await db.execute(
+                select(StockShard.quantity)
+                .where(StockShard.sku_id == sku_id)
+                .order_by(StockShard.shard)
+                .with_for_update()
+            )
+            total = sum(result.scalars())
+        else:
+            total = sku.stock_quantity
+
+        base, extra = divmod(total, shards)
+        stmt = insert(StockShard).values([
+            {"sku_id": sku_id, "shard": shard, "product_id": product_id, "quantity": base + (shard < extra)}
+            for shard in range(shards)
+        ])
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StockShard.sku_id, StockShard.shard],
+                set_={"quantity": stmt.excluded.quantity},
+            )
+        )
+        # From now on stock_quantity is only a snapshot of the stripes' total
+        await db.execute(
+            update(table)
+            .where(table.c.id == sku_id)
+            .values(**_counter_values(table, stock_shards=shards, stock_quantity=total))
+        )
+
+    async def _lock_sweep(self, db: AsyncSession) -> bool:
+        """Take the sweep lock for this transaction; False when another worker holds it"""
+        return (await db.execute(select(func.pg_try_advisory_xact_lock(SWEEP_LOCK_KEY)))).scalar()
+
+    async def release_expired_batch(self, db: AsyncSession, now: datetime) -> int:
+        """Expire up to ``release_batch_size`` overdue reservations; returns how many were expired"""
+        if not await self._lock_sweep(db):
+            return 0
+
+        due = (
+            select(StockReservation.id)
+            .where(StockReservation.status == ReservationStatus.HELD, StockReservation.expires_at <= now)
+            .order_by(StockReservation.expires_at)
+            .limit(self.release_batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        result = await db.execute(
+            update(StockReservation)
+            .where(StockReservation.id.in_(select(due.c.id)))
+            .values(status=ReservationStatus.EXPIRED, updated_at=now)
+            .returning(
+                StockReservation.product_id,
+                StockReservation.variant_id,
+                StockReservation.from_variant,
+                StockReservation.shard,
+                StockReservation.quantity,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        expired = result.all()
+        if expired:
+            await self._restore(db, expired)
+        await db.commit()
+        self.expired += len(expired)
+        return len(expired)
+
+    async def refresh_snapshots(self, db: AsyncSession):
+        """Copy each striped SKU's stripe total into its stock_quantity for display"""
+        if not await self._lock_sweep(db):
+            return
+        totals = (
+            select(StockShard.sku_id, func.sum(StockShard.quantity).cast(Integer).label("total"))
+            .group_by(StockShard.sku_id)
+            .subquery()
+        )
+        for table in (Product.__table__, ProductVariant.__table__):
+            result = await db.execute(
+                update(table)
+                .where(
+                    table.c.id == totals.c.sku_id,
+                    table.c.stock_shards > 0,
+                    table.c.stock_quantity.is_distinct_from(totals.c.total),
+                )
+                .values(**_counter_values(table, stock_quantity=totals.c.total))
+                .returning(_category(table))
+            )
+            categories = result.scalars().all()
+            if categories:
+                product_listing_cache.invalidate_on_commit(db, categories)
+        await db.commit()
+
+    async def run(self, session_factory) -> int:
+        """Expire overdue reservations batch by batch, then refresh snapshots; returns how many expired"""
+        started = time.perf_counter()
+        expired = 0
+        for _ in range(self.release_max_batches):
+            async with session_factory() as db:
+                released = await self.release_expired_batch(db, datetime.utcnow())
+            expired += released
+            if released < self.release_batch_size:
+                break
+        async with session_factory() as db:
+            await self.refresh_snapshots(db)
+        self.last_sweep_ms = (time.perf_counter() - started) * 1000
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reserved": self.reserved,
+            "out_of_stock": self.out_of_stock,
+            "shard_retries": self.shard_retries,
+            "shard_consolidations": self.shard_consolidations,
+            "committed": self.committed,
+            "released": self.released,
+            "expired": self.expired,
+            "last_sweep_ms": round(self.last_sweep_ms, 1),
+        }
+
+# Global instance
+inventory = Inventory(
+    reservation_ttl_seconds=settings.STOCK_RESERVATION_TTL_SECONDS,
+    release_batch_size=settings.STOCK_RELEASE_BATCH_SIZE,
+    release_max_batches=settings.STOCK_RELEASE_MAX_BATCHES,
+)
+
+metrics.register("inventory", inventory.stats)
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+# A completion producer returns the response text and the tokens it consumed
+CompletionFactory = Callable[[], Awaitable[Tuple[str, int]]]
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """Content address of a chat completion request"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """Two-tier cache for LLM completions with in-flight request sharing.
+
+    Lookups go to an in-process LRU first, then to Redis when enabled.
+    Concurrent misses for the same key wait on a single upstream call
+    instead of each asking the model.
+    """
+
+    def __init__(self, max_entries: int, default_ttl_seconds: int, use_redis: bool):
+        self.use_redis = use_redis
+        self._local = TTLCache(max_entries=max_entries, ttl_seconds=default_ttl_seconds)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"memory_hits": 0, "redis_hits": 0, "coalesced": 0, "misses": 0, "tokens_saved": 0}
+        )
+
+    def _redis_key(self, key: str) -> str:
+        return f"llm:{key}"
+
+    async def _lookup(self, key: str, ttl_seconds: int, stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        entry = self._local.get(key)
+        if entry is not None:
+            stats["memory_hits"] += 1
+            return entry
+
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(self._redis_key(key))
+            except RedisError:
+                raw = None
+            if raw is not None:
+                entry = json.loads(raw)
+                self._local.set(key, entry, ttl_seconds)
+                stats["redis_hits"] += 1
+                return entry
+
+        return None
+
+    async def _store(self, key: str, entry: Dict[str, Any], ttl_seconds: int):
+        self._local.set(key, entry, ttl_seconds)
+        if self.use_redis:
+            try:
+                await get_redis().set(self._redis_key(key), json.dumps(entry), ex=ttl_seconds)
+            except RedisError:
+                pass
+
+    async def get_or_create(self, namespace: str, key: str, ttl_seconds: int, create: CompletionFactory) -> str:
+        """Return the cached completion for ``key`` or produce it with ``create``"""
+        stats = self._stats[namespace]
+
+        entry = await self._lookup(key, ttl_seconds, stats)
+        if entry is not None:
+            stats["tokens_saved"] += entry["tokens"]
+            return entry["content"]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Counted before waiting, so callers of a call that fails count too
+            stats["coalesced"] += 1
+            entry = await asyncio.shield(inflight)
+            stats["tokens_saved"] += entry["tokens"]
+            return entry["content"]
+
+        # The upstream call runs in its own task, so a caller that is
+        # cancelled (e.g. its client went away) does not cancel it for the
+        # requests sharing it
+        stats["misses"] += 1
+        task = asyncio.create_task(self._produce(key, ttl_seconds, create))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._settle(key, done))
+        entry = await asyncio.shield(task)
+        return entry["content"]
+
+    async def _produce(self, key: str, ttl_seconds: int, create: CompletionFactory) -> Dict[str, Any]:
+        content, tokens = await create()
+        entry = {"content": content, "tokens": tokens}
+        await self._store(key, entry, ttl_seconds)
+        return entry
+
+    def _settle(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every waiter may have gone; mark a failure retrieved so it does not warn
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for namespace, counts in self._stats.items():
+            lookups = counts["memory_hits"] + counts["redis_hits"] + counts["coalesced"] + counts["misses"]
+            hits = lookups - counts["misses"]
+            result[namespace] = {**counts, "hit_rate": hits / lookups if lookups else 0.0}
+        result["local_entries"] = len(self._local)
+        return result
+
+# Global instance
+llm_cache = LLMCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    default_ttl_seconds=3600,
+    use_redis=settings.LLM_CACHE_USE_REDIS,
+)
+
+metrics.register("llm_cache", llm_cache.stats)
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+# Upstream responses worth retrying; anything else in 4xx is our bug
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """The completion request failed"""
+
+class LLMUnavailableError(LLMError):
+    """The LLM provider is unreachable or shedding load; callers should use their fallback"""
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through once ``reset_seconds`` pass"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            self.rejected += 1
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        if state == "half_open":
+            self.trial_in_flight = True
+
+    def end_call(self):
+        # A trial that ended without a verdict (cancelled, rejected request)
+        # must not keep the breaker half-open forever
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class LLMClient:
+    """Shared client for the OpenAI chat completions API.
+
+    One pooled httpx client is reused for every call. A semaphore caps
+    concurrent requests, transient failures are retried with jittered
+    exponential backoff, and a circuit breaker fails calls fast while the
+    provider is down. The client is created on first use and closed by
+    the app lifespan (or by each Celery task, which runs its own loop).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout_seconds: float,
+        connect_timeout_seconds: float,
+        max_connections: int,
+        max_concurrency: int,
+        max_retries: int,
+        breaker: CircuitBreaker
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    async def _acquire(self) -> asyncio.Semaphore:
+        self._get_client()
+        semaphore = self._semaphore
+        # Waiting for a slot counts against the same deadline as the call itself
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout.read)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError("LLM concurrency limit reached")
+        return semaphore
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, 0.5s * 2^attempt], capped at 8s
+        return random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+
+    async def _send(self, payload: Dict[str, Any], stream: bool) -> httpx.Response:
+        """POST a completion request, retrying transient failures; the caller closes the response"""
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                request = client.build_request("POST", "/chat/completions", json=payload)
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error: LLMError = LLMUnavailableError(f"LLM request failed: {e!r}")
+            else:
+                if response.status_code < 400:
+                    return response
+                await response.aclose()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise LLMError(f"LLM request rejected with status {response.status_code}")
+                error = LLMUnavailableError(f"LLM request failed with status {response.status_code}")
+
+            if attempt == self.max_retries:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, int]:
+        """Return the completion text and the total tokens it consumed"""
+        self.breaker.before_call()
+        try:
+            semaphore = await self._acquire()
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                response = await self._send(
+                    {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+                    stream=False,
+                )
+                data = response.json()
+            except LLMUnavailableError:
+                self.failures += 1
+                self.breaker.record_failure()
+                raise
+            finally:
+                self.in_flight -= 1
+                semaphore.release()
+            self.breaker.record_success()
+        finally:
+            self.breaker.end_call()
+
+        usage = data.get("usage") or {}
+        return data["choices"][0]["message"]["content"], usage.get("total_tokens", 0)
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Yield completion tokens as they arrive.
+
+        Retries only happen before the first token; a stream that breaks
+        midway raises LLMUnavailableError.
+        """
+        self.breaker.before_call()
+        try:
+            semaphore = await self._acquire()
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                response = await self._send(
+                    {
+                        "model": model,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "stream": True,
+                    },
+                    stream=True,
+                )
+            except BaseException as e:
+                self.in_flight -= 1
+                semaphore.release()
+                if isinstance(e, LLMUnavailableError):
+                    self.failures += 1
+                    self.breaker.record_failure()
+                raise
+
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta") or {}
+                    if delta.get("content"):
+                        yield delta["content"]
+            except httpx.TransportError as e:
+                self.failures += 1
+                self.breaker.record_failure()
+                raise LLMUnavailableError(f"LLM stream interrupted: {e!r}")
+            finally:
+                await response.aclose()
+                self.in_flight -= 1
+                semaphore.release()
+            self.breaker.record_success()
+        finally:
+            self.breaker.end_call()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "circuit_state": self.breaker.state,
+            "circuit_rejected": self.breaker.rejected,
+        }
+
+# Global instance
+llm_client = LLMClient(
+    base_url=settings.OPENAI_BASE_URL,
+    api_key=settings.OPENAI_API_KEY,
+    timeout_seconds=settings.OPENAI_TIMEOUT_SECONDS,
+    connect_timeout_seconds=settings.OPENAI_CONNECT_TIMEOUT_SECONDS,
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.OPENAI_CIRCUIT_RESET_SECONDS,
+    ),
+)
+
+metrics.register("llm_client", llm_client.stats)
@@ -0,0 +1,217 @@
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.market import MarketPriceStat
+from app.models.inventory import ReservationStatus, StockReservation
+from app.models.offer import Offer
+from app.models.order import Order, OrderStatus
+from app.models.pool import Pool
+from app.models.product import Product
+from app.models.rfp import RFP
+
+# Prices are bucketed on a log scale: 20 buckets per decade from $1 to
+# $100M keeps quantile estimates within ~6% of the true value
+MIN_PRICE = 1.0
+BUCKETS_PER_DECADE = 20
+NUM_BUCKETS = 8 * BUCKETS_PER_DECADE
+
+def bucket_index(price: float) -> int:
+    if price <= MIN_PRICE:
+        return 0
+    return min(NUM_BUCKETS - 1, int(math.log10(price / MIN_PRICE) * BUCKETS_PER_DECADE))
+
+def _bucket_bounds(index: int):
+    return (
+        MIN_PRICE * 10 ** (index / BUCKETS_PER_DECADE),
+        MIN_PRICE * 10 ** ((index + 1) / BUCKETS_PER_DECADE),
+    )
+
+def histogram_quantile(histogram: List[int], count: int, q: float) -> Optional[float]:
+    """Estimate the ``q`` quantile, interpolating geometrically inside the bucket"""
+    if not count:
+        return None
+    rank = q * count
+    cumulative = 0
+    for index, bucket_count in enumerate(histogram):
+        if bucket_count and cumulative + bucket_count >= rank:
+            low, high = _bucket_bounds(index)
+            fraction = (rank - cumulative) / bucket_count
+            return round(low * (high / low) ** fraction, 2)
+        cumulative += bucket_count
+    return round(_bucket_bounds(len(histogram) - 1)[1], 2)
+
+def histogram_rank(histogram: List[int], count: int, price: float) -> Optional[float]:
+    """Estimated fraction (0-1) of recorded trades priced below ``price``"""
+    if not count:
+        return None
+    index = bucket_index(price)
+    below = sum(histogram[:index])
+    low, high = _bucket_bounds(index)
+    if price <= low:
+        fraction = 0.0
+    elif price >= high:
+        fraction = 1.0
+    else:
+        fraction = math.log(price / low) / math.log(high / low)
+    return (below + histogram[index] * fraction) / count
+
+def _refresh_derived(stat: MarketPriceStat):
+    stat.mean = round(stat.total / stat.count, 2) if stat.count else None
+    stat.median = histogram_quantile(stat.histogram, stat.count, 0.5)
+    stat.p10 = histogram_quantile(stat.histogram, stat.count, 0.1)
+    stat.p90 = histogram_quantile(stat.histogram, stat.count, 0.9)
+
+def _as_dict(stat: MarketPriceStat) -> Dict[str, Any]:
+    return {
+        "category": stat.category,
+        "count": stat.count,
+        "mean": stat.mean,
+        "median": stat.median,
+        "p10": stat.p10,
+        "p90": stat.p90,
+    }
+
+class MarketStats:
+    """Per-category price statistics read from ``market_price_stats``.
+
+    Reads are one primary-key lookup, cached in process for
+    ``ttl_seconds``. Writes update the category's histogram under a row
+    lock, so concurrent acceptances never lose an update.
+    """
+
+    # Cached stand-in for categories without data, so misses are cached too
+    _EMPTY: Dict[str, Any] = {}
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 1000):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    async def get(self, db: AsyncSession, category: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stats for ``category``, or None when nothing has traded in it yet"""
+        if not category:
+            return None
+        stats = self._cache.get(category)
+        if stats is None:
+            stat = await db.get(MarketPriceStat, category)
+            stats = _as_dict(stat) if stat is not None and stat.count else self._EMPTY
+            self._cache.set(category, stats)
+        return stats or None
+
+    async def record(self, db: AsyncSession, category: str, amount: float):
+        """Add a traded price to its category; runs in the caller's transaction"""
+        await db.execute(
+            insert(MarketPriceStat)
+            .values(category=category, count=0, total=0.0, histogram=[0] * NUM_BUCKETS)
+            .on_conflict_do_nothing(index_elements=[MarketPriceStat.category])
+        )
+        result = await db.execute(
+            select(MarketPriceStat)
+            .where(MarketPriceStat.category == category)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        stat = result.scalar_one()
+
+        histogram = list(stat.histogram)
+        histogram[bucket_index(amount)] += 1
+        stat.histogram = histogram
+        stat.count += 1
+        stat.total += amount
+        _refresh_derived(stat)
+
+        # Other workers pick the change up when their cached copy expires
+        self._cache.delete(category)
+
+    async def rebuild(self, db: AsyncSession, window_days: int):
+        """Recompute every category from the last ``window_days`` of trades.
+
+        Bucketing and counting happen in the database, so only one row per
+        (category, bucket) comes back. Orders created from an offer are
+        represented by that offer and are not counted twice; pool orders
+        count under the pool's category, and product orders under their
+        products' category when every line shares one.
+
+        The table lock keeps ``record`` out until the rebuilt rows are
+        committed, so an acceptance is either in the aggregate or applied
+        on top of it, never lost.
+        """
+        since = datetime.utcnow() - timedelta(days=window_days)
+        await db.execute(text("LOCK TABLE market_price_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+        accepted = (
+            select(RFP.category.label("category"), Offer.price.label("amount"))
+            .join(RFP, RFP.id == Offer.rfp_id)
+            .where(Offer.status == "accepted", Offer.updated_at >= since)
+        )
+        completed_orders = and_(
+            Order.status == OrderStatus.COMPLETED, Order.offer_id.is_(None), Order.completion_date >= since
+        )
+        product_category = (
+            select(StockReservation.order_id, func.min(Product.category).label("category"))
+            .join(Product, Product.id == StockReservation.product_id)
+            .join(Order, Order.id == StockReservation.order_id)
+            .where(StockReservation.status == ReservationStatus.COMMITTED, completed_orders)
+            .group_by(StockReservation.order_id)
+            .having(func.count(Product.category.distinct()) == 1)
+            .subquery()
+        )
+        completed = (
+            select(
+                func.coalesce(RFP.category, Pool.category, product_category.c.category).label("category"),
+                Order.amount.label("amount"),
+            )
+            .outerjoin(RFP, RFP.id == Order.rfp_id)
+            .outerjoin(Pool, Pool.id == Order.pool_id)
+            .outerjoin(product_category, product_category.c.order_id == Order.id)
+            .where(completed_orders)
+        )
+        trades = union_all(accepted, completed).subquery()
+
+        amount = func.greatest(trades.c.amount, literal(MIN_PRICE))
+        bucket = func.least(
+            func.floor(func.log(amount / MIN_PRICE) * BUCKETS_PER_DECADE),
+            NUM_BUCKETS - 1,
+        )
+        result = await db.execute(
+            select(
+                trades.c.category,
+                bucket.label("bucket"),
+                func.count().label("count"),
+                func.sum(trades.c.amount).label("total"),
+            )
+            .where(and_(trades.c.category.isnot(None), trades.c.amount.isnot(None)))
+            .group_by(trades.c.category, bucket)
+        )
+
+        stats: Dict[str, MarketPriceStat] = {}
+        for row in result:
+            stat = stats.get(row.category)
+            if stat is None:
+                stat = stats[row.category] = MarketPriceStat(
+                    category=row.category, count=0, total=0.0, histogram=[0] * NUM_BUCKETS
+                )
+            stat.histogram[int(row.bucket)] += row.count
+            stat.count += row.count
+            stat.total += float(row.total)
+
+        await db.execute(delete(MarketPriceStat))
+        for stat in stats.values():
+            _refresh_derived(stat)
+            db.add(stat)
+        await db.commit()
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+# Global instance
+market_stats = MarketStats(ttl_seconds=settings.MARKET_STATS_CACHE_TTL_SECONDS)
+
+metrics.register("market_stats", market_stats.stats)
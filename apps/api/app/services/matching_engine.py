@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.product import Product, ProductStatus
+from app.models.reputation import ReputationMetric
+from app.models.user import User, UserRole
+
+# Hashed feature space sizes. Specialties use signed feature hashing; the
+# category space only needs to tell a few hundred categories apart.
+SPECIALTY_DIMENSIONS = 256
+CATEGORY_DIMENSIONS = 128
+
+# How much each signal contributes to the final 0-1 score
+SPECIALTY_WEIGHT = 0.55
+CATEGORY_WEIGHT = 0.25
+REPUTATION_WEIGHT = 0.20
+
+# Product titles describe a seller less precisely than its tags
+TITLE_TERM_WEIGHT = 0.5
+
+_TERM_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = {
+    "and", "for", "the", "with", "our", "you", "your", "are", "from", "that", "this",
+    "need", "needs", "will", "must", "should", "have", "has", "any", "all", "not",
+}
+
+def _terms(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [term for term in _TERM_RE.findall(str(text).lower()) if len(term) > 2 and term not in _STOPWORDS]
+
+def _hash(term: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _specialty_vector(weighted_terms: Dict[str, float]) -> np.ndarray:
+    vector = np.zeros(SPECIALTY_DIMENSIONS, dtype=np.float32)
+    for term, weight in weighted_terms.items():
+        h = _hash(term)
+        vector[h % SPECIALTY_DIMENSIONS] += weight if (h >> 32) & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _category_bucket(category: str) -> int:
+    return _hash("category:" + category.strip().lower()) % CATEGORY_DIMENSIONS
+
+def _flatten(value: Any) -> Iterable[str]:
+    """Strings inside a JSON requirements value, whatever its shape"""
+    if value is None:
+        return
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    else:
+        yield str(value)
+
+@dataclass
+class SellerMatch:
+    seller_id: str
+    score: float
+    specialty_score: float
+    category_match: bool
+    reputation_score: float
+
+class MatchingIndex:
+    """Precomputed seller feature matrices scored with a few NumPy operations"""
+
+    def __init__(self, seller_ids: List[str], specialties: np.ndarray, categories: np.ndarray, reputation: np.ndarray):
+        self.seller_ids = seller_ids
+        self.specialties = specialties  # (n, SPECIALTY_DIMENSIONS) float32, rows L2-normalized
+        self.categories = categories  # (n, CATEGORY_DIMENSIONS) bool
+        self.reputation = reputation  # (n,) float32 in [0, 1]
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.seller_ids)
+
+    def top_k(self, specialty_vector: np.ndarray, category_buckets: List[int], k: int) -> List[SellerMatch]:
+        if not self.seller_ids or k <= 0:
+            return []
+
+        specialty = np.clip(self.specialties @ specialty_vector, 0.0, 1.0)
+        if category_buckets:
+            category = self.categories[:, category_buckets].any(axis=1)
+        else:
+            category = np.zeros(len(self.seller_ids), dtype=bool)
+        scores = SPECIALTY_WEIGHT * specialty + CATEGORY_WEIGHT * category + REPUTATION_WEIGHT * self.reputation
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            SellerMatch(
+                seller_id=self.seller_ids[i],
+                score=round(float(scores[i]), 4),
+                specialty_score=round(float(specialty[i]), 4),
+                category_match=bool(category[i]),
+                reputation_score=round(float(self.reputation[i]) * 100, 2),
+            )
+            for i in top
+        ]
+
+def build_index(product_rows, reputation_rows, seller_rows) -> MatchingIndex:
+    """Build the seller matrices from raw query rows (CPU only, safe to run in a thread)"""
+    seller_ids = [str(row.id) for row in seller_rows]
+    position = {seller_id: i for i, seller_id in enumerate(seller_ids)}
+
+    terms: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    categories = np.zeros((len(seller_ids), CATEGORY_DIMENSIONS), dtype=bool)
+    for row in product_rows:
+        seller_id = str(row.seller_id)
+        i = position.get(seller_id)
+        if i is None:
+            continue
+        seller_terms = terms[seller_id]
+        for category in (row.category, row.subcategory):
+            if category:
+                categories[i, _category_bucket(category)] = True
+                for term in _terms(category):
+                    seller_terms[term] += 1.0
+        for tag in _flatten(row.tags):
+            for term in _terms(tag):
+                seller_terms[term] += 1.0
+        for term in _terms(row.title):
+            seller_terms[term] += TITLE_TERM_WEIGHT
+
+    specialties = np.zeros((len(seller_ids), SPECIALTY_DIMENSIONS), dtype=np.float32)
+    for seller_id, seller_terms in terms.items():
+        specialties[position[seller_id]] = _specialty_vector(seller_terms)
+
+    reputation = np.zeros(len(seller_ids), dtype=np.float32)
+    for row in reputation_rows:
+        i = position.get(str(row.user_id))
+        if i is not None and row.overall_score is not None:
+            reputation[i] = min(max(row.overall_score, 0.0), 100.0) / 100.0
+
+    return MatchingIndex(seller_ids, specialties, categories, reputation)
+
+def rfp_features(rfp) -> tuple:
+    """Specialty vector and category buckets for an RFP, from its normalized requirements"""
+    requirements = rfp.requirements or {}
+    weighted: Dict[str, float] = defaultdict(float)
+    for term in _terms(rfp.title):
+        weighted[term] += 1.0
+    for field in ("specifications", "technical_requirements", "quality_standards"):
+        for text in _flatten(requirements.get(field)):
+            for term in _terms(text):
+                weighted[term] += 1.0
+    if not requirements:
+        # Not normalized yet: fall back to the raw description
+        for term in _terms(rfp.description):
+            weighted[term] += 0.5
+
+    categories = {rfp.category, requirements.get("category")}
+    buckets = sorted({_category_bucket(category) for category in categories if isinstance(category, str) and category})
+    for category in categories:
+        if isinstance(category, str):
+            for term in _terms(category):
+                weighted[term] += 1.0
+    return _specialty_vector(weighted), buckets
+
+class MatchingEngine:
+    """Keeps a seller index per process, rebuilt by the first request that finds it stale"""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[MatchingIndex] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.queries = 0
+        self.last_query_ms = 0.0
+
+    async def _build(self, db: AsyncSession) -> MatchingIndex:
+        sellers = (await db.execute(
+            select(User.id).where(User.role == UserRole.SELLER, User.is_active == True)
+        )).all()
+        products = (await db.execute(
+            select(Product.seller_id, Product.category, Product.subcategory, Product.tags, Product.title)
+            .where(Product.status == ProductStatus.ACTIVE)
+        )).all()
+        reputation = (await db.execute(
+            select(ReputationMetric.user_id, ReputationMetric.overall_score)
+        )).all()
+
+        started = time.perf_counter()
+        index = await asyncio.to_thread(build_index, products, reputation, sellers)
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+        self.builds += 1
+        return index
+
+    async def get_index(self, db: AsyncSession) -> MatchingIndex:
+        index = self._index
+        if index is not None and time.monotonic() - index.built_at < self.refresh_seconds:
+            return index
+        async with self._lock:
+            # Another request may have rebuilt it while this one waited
+            if self._index is None or time.monotonic() - self._index.built_at >= self.refresh_seconds:
+                self._index = await self._build(db)
+            return self._index
+
+    async def match(self, db: AsyncSession, rfp, k: int) -> List[SellerMatch]:
+        """Top ``k`` sellers for ``rfp``, best first"""
+        index = await self.get_index(db)
+        specialty_vector, category_buckets = rfp_features(rfp)
+
+        started = time.perf_counter()
+        matches = index.top_k(specialty_vector, category_buckets, k)
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+        self.queries += 1
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sellers": len(self._index) if self._index is not None else 0,
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 2),
+            "queries": self.queries,
+            "last_query_ms": round(self.last_query_ms, 3),
+        }
+
+# Global instance
+matching_engine = MatchingEngine(refresh_seconds=settings.MATCHING_INDEX_REFRESH_SECONDS)
+
+metrics.register("matching_engine", matching_engine.stats)
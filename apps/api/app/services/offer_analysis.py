@@ -0,0 +1,213 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.market import MarketPriceStat
+from app.models.offer import Offer
+from app.models.reputation import ReputationMetric
+from app.models.rfp import RFP
+from app.services.market_stats import histogram_rank
+
+# Share of the value score carried by price; the rest comes from reputation
+PRICE_WEIGHT = 0.6
+
+# Reputation assumed for sellers without any history
+DEFAULT_REPUTATION = 50.0
+
+# Below this many recorded trades the market percentile is only indicative
+MIN_MARKET_TRADES = 5
+
+# Below this many orders a seller's completion and delivery rates mean little
+MIN_SELLER_ORDERS = 5
+
+RISK_RECOMMENDATIONS = {
+    "price_below_market": "Confirm the scope: the price is far below what this category usually trades at",
+    "price_above_market": "Ask the seller to justify the premium or negotiate toward the market median",
+    "over_budget": "Negotiate the price down to your budget or adjust the scope",
+    "new_seller": "Ask for references or start with a smaller milestone, the seller has no track record yet",
+    "low_completion_rate": "Use milestone payments, the seller has not completed many of their orders",
+    "late_deliveries": "Agree on a delivery schedule with penalties, the seller often delivers late",
+    "thin_market_data": "Compare with other offers, there is little price history for this category",
+}
+
+def analysis_query(*columns):
+    """Offers with everything the analysis needs, loaded in a single statement"""
+    return (
+        select(
+            *columns,
+            Offer.id,
+            Offer.rfp_id,
+            Offer.seller_id,
+            Offer.price,
+            Offer.delivery_time,
+            Offer.status,
+            Offer.created_at,
+            Offer.updated_at,
+            RFP.category,
+            RFP.budget_min,
+            RFP.budget_max,
+            ReputationMetric.overall_score,
+            ReputationMetric.total_orders,
+            ReputationMetric.completed_orders,
+            ReputationMetric.on_time_deliveries,
+            ReputationMetric.average_response_time_hours,
+            ReputationMetric.total_reviews,
+            ReputationMetric.updated_at.label("reputation_updated_at"),
+            MarketPriceStat.count.label("market_count"),
+            MarketPriceStat.histogram.label("market_histogram"),
+            MarketPriceStat.median.label("market_median"),
+            MarketPriceStat.p10.label("market_p10"),
+            MarketPriceStat.p90.label("market_p90"),
+            MarketPriceStat.updated_at.label("market_updated_at"),
+        )
+        .select_from(Offer)
+        .join(RFP, RFP.id == Offer.rfp_id)
+        .outerjoin(ReputationMetric, ReputationMetric.user_id == Offer.seller_id)
+        .outerjoin(MarketPriceStat, MarketPriceStat.category == RFP.category)
+    )
+
+def _rate(numerator: Optional[int], denominator: Optional[int]) -> Optional[float]:
+    if not denominator or numerator is None:
+        return None
+    return round(100.0 * numerator / denominator, 1)
+
+def analyze_row(row) -> Dict[str, Any]:
+    """Price percentile, value score and risk flags for one ``analysis_query`` row"""
+    flags: List[str] = []
+
+    percentile = None
+    if row.market_count:
+        percentile = round(100 * histogram_rank(row.market_histogram, row.market_count, row.price), 1)
+        if row.market_count < MIN_MARKET_TRADES:
+            flags.append("thin_market_data")
+        elif percentile < 10:
+            flags.append("price_below_market")
+        elif percentile > 90:
+            flags.append("price_above_market")
+    else:
+        flags.append("thin_market_data")
+
+    if row.budget_max and row.price > row.budget_max:
+        flags.append("over_budget")
+
+    completion_rate = _rate(row.completed_orders, row.total_orders)
+    on_time_rate = _rate(row.on_time_deliveries, row.completed_orders)
+    if not row.total_orders:
+        flags.append("new_seller")
+    elif row.total_orders >= MIN_SELLER_ORDERS:
+        if completion_rate is not None and completion_rate < 80:
+            flags.append("low_completion_rate")
+        if on_time_rate is not None and on_time_rate < 80:
+            flags.append("late_deliveries")
+
+    # Without market data, judge the price against the RFP budget instead
+    if percentile is not None:
+        price_score = 100 - percentile
+    elif row.budget_min is not None and row.budget_max and row.budget_max > row.budget_min:
+        position = (row.price - row.budget_min) / (row.budget_max - row.budget_min)
+        price_score = 100 * (1 - min(max(position, 0.0), 1.0))
+    else:
+        price_score = 50.0
+    reputation = row.overall_score if row.total_orders else DEFAULT_REPUTATION
+    value_score = round(PRICE_WEIGHT * price_score + (1 - PRICE_WEIGHT) * (reputation or 0.0))
+
+    if "price_below_market" in flags:
+        market_position = "low"
+    elif "price_above_market" in flags:
+        market_position = "high"
+    else:
+        market_position = "competitive"
+
+    serious = [flag for flag in flags if flag != "thin_market_data"]
+    overall_risk = "high" if len(serious) >= 2 else "medium" if serious else "low"
+
+    return {
+        "offer_id": str(row.id),
+        "rfp_id": str(row.rfp_id),
+        "seller_id": str(row.seller_id),
+        "price": row.price,
+        "delivery_time": row.delivery_time,
+        "status": row.status,
+        "price_analysis": {
+            "market_position": market_position,
+            "market_percentile": percentile,
+            "market_median": row.market_median,
+            "market_range": [row.market_p10, row.market_p90] if row.market_count else None,
+            "market_trades": row.market_count or 0,
+            "value_score": value_score,
+        },
+        "seller_analysis": {
+            "reputation_score": row.overall_score or 0.0,
+            "total_orders": row.total_orders or 0,
+            "completion_rate": completion_rate,
+            "on_time_rate": on_time_rate,
+            "average_response_time_hours": row.average_response_time_hours,
+            "total_reviews": row.total_reviews or 0,
+        },
+        "risk_assessment": {
+            "overall_risk": overall_risk,
+            "flags": flags,
+        },
+        "recommendations": [RISK_RECOMMENDATIONS[flag] for flag in flags],
+    }
+
+class OfferAnalyzer:
+    """Computes offer analyses, cached per version of their inputs.
+
+    The cache key carries the update timestamps of the offer, the seller's
+    reputation and the category stats, so editing any of them yields a
+    fresh analysis while unchanged offers are served from memory.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 10000):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def analyze(self, row) -> Dict[str, Any]:
+        key = (
+            str(row.id),
+            row.updated_at or row.created_at,
+            row.reputation_updated_at,
+            row.market_updated_at,
+        )
+        analysis = self._cache.get(key)
+        if analysis is None:
+            analysis = analyze_row(row)
+            self._cache.set(key, analysis)
+        return analysis
+
+    async def load_offer(self, db: AsyncSession, offer_id: str, user_id):
+        """The analysis row for one offer, or None, with the caller's relationship to it"""
+        result = await db.execute(
+            analysis_query(
+                (Offer.seller_id == user_id).label("is_seller"),
+                (RFP.buyer_id == user_id).label("is_buyer"),
+            ).where(Offer.id == offer_id)
+        )
+        return result.first()
+
+    async def analyze_rfp(self, db: AsyncSession, rfp_id: str) -> List[Dict[str, Any]]:
+        """Analyses of every offer on an RFP, best value first"""
+        result = await db.execute(analysis_query().where(Offer.rfp_id == rfp_id))
+        analyses = [self.analyze(row) for row in result]
+        # Equal scores go to the cheaper offer
+        analyses.sort(key=lambda analysis: (-analysis["price_analysis"]["value_score"], analysis["price"]))
+
+        # Side-by-side positions are relative to this RFP, so they are never cached
+        by_price = sorted(analyses, key=lambda analysis: analysis["price"])
+        price_ranks = {analysis["offer_id"]: rank for rank, analysis in enumerate(by_price, 1)}
+        return [
+            {**analysis, "value_rank": rank, "price_rank": price_ranks[analysis["offer_id"]]}
+            for rank, analysis in enumerate(analyses, 1)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+# Global instance
+offer_analyzer = OfferAnalyzer(ttl_seconds=settings.OFFER_ANALYSIS_CACHE_TTL_SECONDS)
+
+metrics.register("offer_analysis", offer_analyzer.stats)
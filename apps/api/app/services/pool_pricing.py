@@ -0,0 +1,11 @@
+from bisect import bisect_right
+from typing import Any, Dict, List
+
+def tier_discount(tiers: List[Dict[str, Any]], participants: int) -> float:
+    """Discount percentage of the highest tier reached; ``tiers`` must be sorted as PoolCreate leaves them"""
+    reached = bisect_right(tiers, participants, key=lambda tier: tier["participants"])
+    return tiers[reached - 1]["discount"] if reached else 0.0
+
+def pool_price(target_price: float, tiers: List[Dict[str, Any]], participants: int) -> float:
+    """Unit price for a pool with ``participants`` members, from its list price and tiers"""
+    return round(target_price * (1 - tier_discount(tiers, participants) / 100), 2)
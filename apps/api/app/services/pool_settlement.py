@@ -0,0 +1,120 @@
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.order import Order, OrderStatus, PaymentStatus
+from app.models.pool import Pool, PoolMember, PoolStatus
+
+class PoolSettlement:
+    """Moves pools past their end date out of ACTIVE and creates their orders.
+
+    Each batch claims due pools with FOR UPDATE SKIP LOCKED, so any number
+    of workers can run the scheduler at once without settling a pool
+    twice, and settles the whole batch with a few set-based statements in
+    one transaction. Only the claimed pool rows are locked; a worker that
+    dies mid-batch rolls back and the pools are picked up again.
+
+    Pools short of ``min_participants`` are cancelled. The rest are closed
+    with one order per confirmed member at the pool's final tier price,
+    sold by the pool's creator.
+    """
+
+    def __init__(self, batch_size: int, max_batches: int):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.runs = 0
+        self.pools_closed = 0
+        self.pools_cancelled = 0
+        self.orders_created = 0
+        self.last_run_ms = 0.0
+
+    async def settle_batch(self, db, now: datetime) -> int:
+        """Settle up to ``batch_size`` due pools; returns how many were claimed"""
+        due = (
+            select(Pool.id)
+            .where(Pool.status == PoolStatus.ACTIVE, Pool.end_date <= now)
+            .order_by(Pool.end_date)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        result = await db.execute(
+            update(Pool)
+            .where(Pool.id.in_(select(due.c.id)))
+            .values(
+                status=case(
+                    (Pool.participant_count < Pool.min_participants, literal(PoolStatus.CANCELLED, Pool.status.type)),
+                    else_=literal(PoolStatus.CLOSED, Pool.status.type),
+                ),
+                updated_at=now,
+            )
+            .returning(Pool.id, Pool.status)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.all()
+        if not claimed:
+            return 0
+
+        closed = [row.id for row in claimed if row.status == PoolStatus.CLOSED]
+        if closed:
+            result = await db.execute(
+                insert(Order).from_select(
+                    ["id", "buyer_id", "seller_id", "amount", "status", "payment_status", "pool_id", "notes", "created_at", "updated_at"],
+                    select(
+                        func.gen_random_uuid(),
+                        PoolMember.user_id,
+                        Pool.creator_id,
+                        Pool.current_price * PoolMember.quantity,
+                        literal(OrderStatus.PENDING, Order.status.type),
+                        literal(PaymentStatus.PENDING, Order.payment_status.type),
+                        Pool.id,
+                        literal("Group buy: ") + Pool.title,
+                        literal(now),
+                        literal(now),
+                    )
+                    .join(Pool, Pool.id == PoolMember.pool_id)
+                    .where(PoolMember.pool_id.in_(closed), PoolMember.is_confirmed == True)
+                )
+            )
+            self.orders_created += result.rowcount
+
+        await db.commit()
+        self.pools_closed += len(closed)
+        self.pools_cancelled += len(claimed) - len(closed)
+        return len(claimed)
+
+    async def run(self, session_factory) -> int:
+        """Settle due pools batch by batch until none are left; returns how many were settled"""
+        started = time.perf_counter()
+        settled = 0
+        for _ in range(self.max_batches):
+            async with session_factory() as db:
+                claimed = await self.settle_batch(db, datetime.utcnow())
+            settled += claimed
+            if claimed < self.batch_size:
+                break
+        self.runs += 1
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return settled
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "pools_closed": self.pools_closed,
+            "pools_cancelled": self.pools_cancelled,
+            "orders_created": self.orders_created,
+            "last_run_ms": round(self.last_run_ms, 1),
+        }
+
+# Global instance
+pool_settlement = PoolSettlement(
+    batch_size=settings.POOL_SETTLEMENT_BATCH_SIZE,
+    max_batches=settings.POOL_SETTLEMENT_MAX_BATCHES,
+)
+
+metrics.register("pool_settlement", pool_settlement.stats)
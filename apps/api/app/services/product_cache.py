@@ -0,0 +1,174 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Union
+
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.workers import background
+
+# Tag shared by every listing that is not narrowed to a category
+ALL_PRODUCTS_TAG = "all"
+
+# Session.info key of the categories whose listings expire when the session commits
+PENDING_CATEGORIES_KEY = "product_listing_categories"
+
+def listing_tag(query: Dict[str, Any]) -> str:
+    """The tag whose products a listing page can contain"""
+    category = query.get("category")
+    return f"category:{category}" if category else ALL_PRODUCTS_TAG
+
+class ProductListingCache:
+    """Cache of product listing pages with tag-based invalidation.
+
+    A page is stored under a hash of its query and the current version of
+    its tag (``category:<name>`` for category pages, ``all`` otherwise).
+    Changing a product bumps the versions of the tags it appears under, so
+    every page that could hold it misses from then on and the stale
+    entries simply age out. With Redis enabled, pages and tag versions are
+    shared by all workers; otherwise other workers may keep serving a
+    stale page for up to one TTL.
+    """
+
+    _VERSIONS_KEY = "products:tag-versions"
+
+    def __init__(self, ttl_seconds: int, max_entries: int, use_redis: bool):
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._local = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.invalidations = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"products:page:{key}"
+
+    async def _version(self, tag: str) -> Optional[str]:
+        if not self.use_redis:
+            return str(self._versions.get(tag, 0))
+        try:
+            return await get_redis().hget(self._VERSIONS_KEY, tag) or "0"
+        except RedisError:
+            # Without the shared version a cached page cannot be trusted
+            return None
+
+    def _key(self, query: Dict[str, Any], version: str) -> str:
+        payload = json.dumps({"query": query, "version": version}, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_create(
+        self, query: Dict[str, Any], create: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Return the cached page for ``query`` or build and cache it with ``create``"""
+        # The version is read before the page is built, so a page built
+        # while its products change is stored under the superseded version
+        version = await self._version(listing_tag(query))
+        if version is None:
+            self.misses += 1
+            return await create()
+
+        key = self._key(query, version)
+        page = self._local.get(key)
+        if page is not None:
+            self.hits += 1
+            return page
+
+        if self.use_redis:
+            try:
+                raw = await get_redis().get(self._redis_key(key))
+            except RedisError:
+                raw = None
+            if raw is not None:
+                page = json.loads(raw)
+                self._local.set(key, page)
+                self.hits += 1
+                self.redis_hits += 1
+                return page
+
+        self.misses += 1
+        page = await create()
+        self._local.set(key, page)
+        if self.use_redis:
+            try:
+                await get_redis().set(self._redis_key(key), json.dumps(page), ex=self.ttl_seconds)
+            except RedisError:
+                pass
+        return page
+
+    def _bump(self, categories: Iterable[Optional[str]]) -> Set[str]:
+        """Move the in-process versions of the tags of ``categories``; returns the tags"""
+        tags = {ALL_PRODUCTS_TAG, *(f"category:{category}" for category in categories if category)}
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+        self.invalidations += 1
+        return tags
+
+    async def _bump_shared(self, tags: Set[str]):
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.hincrby(self._VERSIONS_KEY, tag, 1)
+                await pipe.execute()
+        except RedisError:
+            pass
+
+    async def invalidate(self, categories: Iterable[Optional[str]]):
+        """Expire every listing that may show a product in ``categories``"""
+        tags = self._bump(categories)
+        if self.use_redis:
+            await self._bump_shared(tags)
+
+    def invalidate_on_commit(self, session: Union[Session, AsyncSession], categories: Iterable[Optional[str]]):
+        """Expire the listings of ``categories`` once ``session`` commits.
+
+        For changes made inside a caller's transaction, flush hooks
+        included: expiring before the commit would let a concurrent request
+        cache the old rows under the new version.
+        """
+        if isinstance(session, AsyncSession):
+            session = session.sync_session
+        session.info.setdefault(PENDING_CATEGORIES_KEY, set()).update(categories)
+
+    def _committed(self, categories: Iterable[Optional[str]]):
+        # Commit hooks cannot await, so the shared versions move in the background
+        tags = self._bump(categories)
+        if self.use_redis:
+            background.spawn(self._bump_shared(tags))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "local_entries": len(self._local),
+        }
+
+# Global instance
+product_listing_cache = ProductListingCache(
+    ttl_seconds=settings.PRODUCT_LISTING_CACHE_TTL_SECONDS,
+    max_entries=settings.PRODUCT_LISTING_CACHE_MAX_ENTRIES,
+    use_redis=settings.PRODUCT_LISTING_CACHE_USE_REDIS,
+)
+
+metrics.register("product_listing_cache", product_listing_cache.stats)
+
+@event.listens_for(Session, "after_commit")
+def _expire_committed(session: Session):
+    categories = session.info.pop(PENDING_CATEGORIES_KEY, None)
+    if categories:
+        product_listing_cache._committed(categories)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop(PENDING_CATEGORIES_KEY, None)
@@ -0,0 +1,153 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Float, cast, event, exists, func, inspect, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from app.core import metrics
+from app.models.product import Product, ProductReview
+from app.services.product_cache import product_listing_cache
+
+STARS = range(1, 6)
+COUNTERS = ("rating_sum", "rating_count", *[f"rating_{stars}" for stars in STARS])
+
+def _average(total, count):
+    return func.coalesce(cast(total, Float) / func.nullif(count, 0), 0.0)
+
+class ProductRatings:
+    """Keeps the rating aggregates on products current as reviews change.
+
+    Each review insert, edit or delete adjusts its product's counters with
+    a single relative UPDATE inside the flush that made the change, so the
+    aggregates commit or roll back with the review and concurrent reviews
+    of one product serialize on its row lock. Changes that bypass the ORM
+    unit of work (bulk statements) are corrected by ``backfill``. Cached
+    listings of the product's category expire when the change commits.
+    """
+
+    def __init__(self):
+        self.applied = 0
+        self.last_backfill = None
+
+    def apply(self, connection, product_id, rating: int, sign: int) -> Optional[str]:
+        """Add (``sign`` 1) or remove (``sign`` -1) one rating (sync, runs during a flush); returns the product's category"""
+        table = Product.__table__
+        total = table.c.rating_sum + sign * rating
+        count = table.c.rating_count + sign
+        values = {"rating_sum": total, "rating_count": count, "average_rating": _average(total, count)}
+        if rating in STARS:
+            values[f"rating_{rating}"] = table.c[f"rating_{rating}"] + sign
+        result = connection.execute(
+            update(table)
+            .where(table.c.id == product_id)
+            # A review is not an edit of the product itself
+            .values(**values, updated_at=table.c.updated_at)
+            .returning(table.c.category)
+        )
+        self.applied += 1
+        return result.scalar()
+
+    async def backfill(self, db: AsyncSession) -> Dict[str, Any]:
+        """Recompute every product's aggregates from its reviews with set-based SQL.
+
+        Review writes are blocked for the duration, so increments committed
+        meanwhile are neither lost nor double counted. Only products whose
+        stored aggregates differ are written.
+        """
+        await db.execute(text("LOCK TABLE product_reviews IN SHARE MODE"))
+        table = Product.__table__
+        counts = (
+            select(
+                ProductReview.product_id,
+                func.sum(ProductReview.rating).label("rating_sum"),
+                func.count().label("rating_count"),
+                *[func.count().filter(ProductReview.rating == stars).label(f"rating_{stars}") for stars in STARS],
+            )
+            .group_by(ProductReview.product_id)
+            .subquery()
+        )
+        reviewed = await db.execute(
+            update(table)
+            .where(
+                table.c.id == counts.c.product_id,
+                or_(*[table.c[name] != counts.c[name] for name in COUNTERS]),
+            )
+            .values(
+                **{name: counts.c[name] for name in COUNTERS},
+                average_rating=_average(counts.c.rating_sum, counts.c.rating_count),
+                updated_at=table.c.updated_at,
+            )
+            .returning(table.c.category)
+        )
+        corrected = reviewed.scalars().all()
+        # Products whose reviews are all gone
+        reset = await db.execute(
+            update(table)
+            .where(
+                table.c.rating_count != 0,
+                ~exists().where(ProductReview.product_id == table.c.id),
+            )
+            .values(**{name: 0 for name in COUNTERS}, average_rating=0.0, updated_at=table.c.updated_at)
+            .returning(table.c.category)
+        )
+        emptied = reset.scalars().all()
+        if corrected or emptied:
+            product_listing_cache.invalidate_on_commit(db, {*corrected, *emptied})
+        await db.commit()
+
+        self.last_backfill = {"corrected_products": len(corrected), "reset_products": len(emptied)}
+        return self.last_backfill
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "applied": self.applied,
+            "last_backfill": self.last_backfill,
+        }
+
+# Global instance
+product_ratings = ProductRatings()
+
+metrics.register("product_ratings", product_ratings.stats)
+
+def _review_inserted(mapper, connection, target):
+    category = product_ratings.apply(connection, target.product_id, target.rating, 1)
+    product_listing_cache.invalidate_on_commit(object_session(target), [category])
+
+def _review_updated(mapper, connection, target):
+    state = inspect(target)
+    rating = state.attrs.rating.history
+    product = state.attrs.product_id.history
+    if not (rating.has_changes() or product.has_changes()):
+        return
+    old_rating = rating.deleted[0] if rating.deleted else target.rating
+    old_product_id = product.deleted[0] if product.deleted else target.product_id
+    categories = [
+        product_ratings.apply(connection, old_product_id, old_rating, -1),
+        product_ratings.apply(connection, target.product_id, target.rating, 1),
+    ]
+    product_listing_cache.invalidate_on_commit(object_session(target), categories)
+
+def _review_deleted(mapper, connection, target):
+    category = product_ratings.apply(connection, target.product_id, target.rating, -1)
+    product_listing_cache.invalidate_on_commit(object_session(target), [category])
+
+event.listen(ProductReview, "after_insert", _review_inserted)
+event.listen(ProductReview, "after_update", _review_updated)
+event.listen(ProductReview, "after_delete", _review_deleted)
+
+async def _backfill():
+    from app.core.database import AsyncSessionLocal, engine
+    try:
+        async with AsyncSessionLocal() as db:
+            return await product_ratings.backfill(db)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    # One-off backfill: python -m app.services.product_ratings
+    import asyncio
+
+    # Register every mapped model so relationships resolve
+    from app.workers import celery_app  # noqa: F401
+
+    print(asyncio.run(_backfill()))
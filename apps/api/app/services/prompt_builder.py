@@ -0,0 +1,194 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+Message = Dict[str, str]
+
+# Fixed costs of the chat format: every message carries a few tokens of
+# framing and the reply is primed with a few more
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+SYSTEM_PROMPT = """You are an AI Concierge for an AI-powered marketplace platform. Your role is to help users with:
+
+1. **RFP Creation**: Help buyers write clear, detailed RFPs (Request for Proposals)
+2. **Offer Analysis**: Analyze and compare offers from sellers
+3. **Market Research**: Provide insights about market trends and pricing
+4. **Negotiation**: Offer advice for both buyers and sellers
+5. **Platform Guidance**: Help users navigate the marketplace features
+
+Key capabilities:
+- You can access user's RFPs, offers, and order history
+- You provide actionable advice with specific examples
+- You suggest relevant marketplace features
+- You maintain a helpful, professional tone
+
+For every user message, provide a helpful response with:
+1. Direct answer to their question
+2. Specific examples or templates if relevant
+3. Suggested next actions
+4. Relevant marketplace features they might want to use
+
+Keep the response conversational and actionable."""
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """Load the GPT-4 tokenizer once; None when tiktoken or its data is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.encoding_for_model("gpt-4")
+            except Exception:
+                _encoding = None
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text``, estimated at ~4 characters per token without tiktoken"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def count_message_tokens(message: Message) -> int:
+    return TOKENS_PER_MESSAGE + count_tokens(message["content"])
+
+@lru_cache(maxsize=1024)
+def _system_prompt(user_role: Optional[str], rfp_title: Optional[str], recent_orders: int) -> Tuple[str, int]:
+    prompt = SYSTEM_PROMPT
+    if user_role:
+        prompt += f"\n\nCurrent user is a {user_role}."
+    if rfp_title:
+        prompt += f"\n\nUser is currently working on RFP: {rfp_title}"
+    if recent_orders:
+        prompt += f"\n\nUser has {recent_orders} recent orders."
+    return prompt, count_message_tokens({"role": "system", "content": prompt})
+
+def _summarize(dropped: List[Message], token_budget: int) -> Optional[Message]:
+    """Fold dropped turns into one short system message, newest lines kept first"""
+    lines = []
+    for message in dropped:
+        if message["role"] == "user":
+            text = " ".join(message["content"].split())
+            lines.append(f"- User asked: {text[:120]}")
+
+    header = "Summary of earlier conversation:"
+    while lines:
+        content = "\n".join([header, *lines])
+        if count_tokens(content) + TOKENS_PER_MESSAGE <= token_budget:
+            return {"role": "system", "content": content}
+        lines.pop(0)
+    return None
+
+class PromptBuilder:
+    """Assembles concierge prompts that fit a token budget.
+
+    The system prompt only depends on a few context fields and is cached
+    per combination. History is kept newest first until the budget runs
+    out; older turns are replaced by a short extractive summary.
+    """
+
+    def __init__(self, token_budget: int, summary_token_budget: int):
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.trimmed_requests = 0
+        self.dropped_messages = 0
+
+    def system_prompt(self, context: Optional[Dict[str, Any]] = None) -> Tuple[str, int]:
+        """The system prompt for ``context`` and its token count"""
+        context = context or {}
+        active_rfp = context.get("active_rfp") or {}
+        return _system_prompt(
+            context.get("user_role"),
+            active_rfp.get("title"),
+            len(context.get("recent_orders") or []),
+        )
+
+    def build(
+        self,
+        message: str,
+        history: List[Message],
+        context: Optional[Dict[str, Any]] = None,
+        intent: Optional[str] = None
+    ) -> Tuple[List[Message], Dict[str, int]]:
+        """Return the messages to send and a breakdown of their prompt tokens"""
+        system_content, system_tokens = self.system_prompt(context)
+        user_message = {"role": "user", "content": f"{message}\n\n(User intent: {intent})" if intent else message}
+        user_tokens = count_message_tokens(user_message)
+
+        available = self.token_budget - TOKENS_PER_REPLY - system_tokens - user_tokens
+        history_tokens = [count_message_tokens(item) for item in history]
+
+        kept_from = 0
+        summary = None
+        if sum(history_tokens) > available:
+            # Leave room for the summary, then keep the newest turns that fit
+            remaining = available - self.summary_token_budget
+            kept_from = len(history)
+            while kept_from > 0 and history_tokens[kept_from - 1] <= remaining:
+                remaining -= history_tokens[kept_from - 1]
+                kept_from -= 1
+            # Never open the kept history with an orphaned assistant reply
+            while kept_from < len(history) and history[kept_from]["role"] != "user":
+                kept_from += 1
+            summary = _summarize(history[:kept_from], self.summary_token_budget)
+
+        kept = history[kept_from:]
+        summary_tokens = count_message_tokens(summary) if summary else 0
+        usage = {
+            "system": system_tokens,
+            "summary": summary_tokens,
+            "history": sum(history_tokens[kept_from:]),
+            "user": user_tokens,
+            "dropped_messages": kept_from,
+            "budget": self.token_budget,
+        }
+        usage["total"] = TOKENS_PER_REPLY + system_tokens + summary_tokens + usage["history"] + user_tokens
+
+        self.requests += 1
+        self.prompt_tokens += usage["total"]
+        self.max_prompt_tokens = max(self.max_prompt_tokens, usage["total"])
+        if kept_from:
+            self.trimmed_requests += 1
+            self.dropped_messages += kept_from
+
+        messages = [{"role": "system", "content": system_content}]
+        if summary:
+            messages.append(summary)
+        messages.extend(kept)
+        messages.append(user_message)
+        return messages, usage
+
+    def stats(self) -> Dict[str, Any]:
+        cache = _system_prompt.cache_info()
+        return {
+            "tokenizer": "tiktoken" if _get_encoding() is not None else "estimate",
+            "requests": self.requests,
+            "avg_prompt_tokens": self.prompt_tokens / self.requests if self.requests else 0.0,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "trimmed_requests": self.trimmed_requests,
+            "dropped_messages": self.dropped_messages,
+            "system_prompt_cache_hits": cache.hits,
+            "system_prompt_cache_misses": cache.misses,
+        }
+
+# Global instance
+prompt_builder = PromptBuilder(
+    token_budget=settings.CONCIERGE_PROMPT_TOKEN_BUDGET,
+    summary_token_budget=settings.CONCIERGE_SUMMARY_TOKEN_BUDGET,
+)
+
+metrics.register("concierge_prompt", prompt_builder.stats)
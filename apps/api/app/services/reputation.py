@@ -0,0 +1,270 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, delete, event, func, inspect, literal, or_, select, text, union, update
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.order import Order, OrderStatus
+from app.models.reputation import ReputationEvent, ReputationMetric, Review
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "total_orders",
+    "completed_orders",
+    "on_time_deliveries",
+    "total_reviews",
+    "positive_reviews",
+    "neutral_reviews",
+    "negative_reviews",
+)
+
+# Weights of the overall score; a component without data counts as neutral
+REVIEW_WEIGHT = 0.5
+COMPLETION_WEIGHT = 0.3
+ON_TIME_WEIGHT = 0.2
+NEUTRAL_SCORE = 50.0
+
+# Number of drifted users listed in a reconciliation report
+DRIFT_SAMPLE_SIZE = 10
+
+# Recomputed counters are materialized once per reconciliation and dropped at commit
+_expected_table = Table(
+    "reputation_expected",
+    MetaData(),
+    Column("user_id", UUID(as_uuid=True), primary_key=True),
+    *[Column(name, Integer, nullable=False) for name in COUNTERS],
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+def derived_scores(counters: Dict[str, Any]) -> Dict[str, Any]:
+    """SQL expressions for the scores derived from ``counters``.
+
+    Used by both the incremental updates and the reconciliation, so the
+    two can never disagree on the formula.
+    """
+    review = 100.0 * (counters["positive_reviews"] + 0.5 * counters["neutral_reviews"]) / func.nullif(counters["total_reviews"], 0)
+    completion = 100.0 * counters["completed_orders"] / func.nullif(counters["total_orders"], 0)
+    on_time = 100.0 * counters["on_time_deliveries"] / func.nullif(counters["completed_orders"], 0)
+    return {
+        "delivery_accuracy": func.coalesce(on_time, 0.0),
+        "overall_score": (
+            REVIEW_WEIGHT * func.coalesce(review, NEUTRAL_SCORE)
+            + COMPLETION_WEIGHT * func.coalesce(completion, NEUTRAL_SCORE)
+            + ON_TIME_WEIGHT * func.coalesce(on_time, NEUTRAL_SCORE)
+        ),
+    }
+
+def _review_deltas(rating: int) -> Dict[str, int]:
+    if rating >= 4:
+        bucket = "positive_reviews"
+    elif rating == 3:
+        bucket = "neutral_reviews"
+    else:
+        bucket = "negative_reviews"
+    return {"total_reviews": 1, bucket: 1}
+
+def _on_time(order: Order) -> bool:
+    if order.delivery_deadline is None:
+        return True
+    return order.completion_date is not None and order.completion_date <= order.delivery_deadline
+
+class ReputationAggregator:
+    """Keeps reputation_metrics counters current as orders and reviews change.
+
+    Every event carries an idempotency key that is claimed in
+    reputation_events before the counters move, so a replayed event is a
+    no-op. Events are applied inside the flush that produced them and
+    commit or roll back with it. Changes that bypass the ORM unit of work
+    (bulk UPDATE/INSERT ... SELECT) are picked up by ``reconcile``.
+    """
+
+    def __init__(self, event_retention_days: int):
+        self.event_retention_days = event_retention_days
+        self.applied = 0
+        self.duplicates = 0
+        self.last_reconciliation: Optional[Dict[str, Any]] = None
+
+    def apply(self, connection, key: str, user_id, deltas: Dict[str, int]):
+        """Apply counter ``deltas`` for ``user_id`` once per ``key`` (sync, runs during a flush)"""
+        now = datetime.utcnow()
+        claimed = connection.execute(
+            insert(ReputationEvent)
+            .values(key=key, user_id=user_id, created_at=now)
+            .on_conflict_do_nothing()
+            .returning(ReputationEvent.key)
+        ).first()
+        if claimed is None:
+            self.duplicates += 1
+            return
+
+        table = ReputationMetric.__table__
+        connection.execute(
+            insert(table)
+            .values(id=uuid.uuid4(), user_id=user_id, created_at=now, updated_at=now, **{name: 0 for name in COUNTERS})
+            .on_conflict_do_nothing(index_elements=[table.c.user_id])
+        )
+        counters = {name: table.c[name] + deltas.get(name, 0) for name in COUNTERS}
+        connection.execute(
+            update(table)
+            .where(table.c.user_id == user_id)
+            .values(**counters, **derived_scores(counters), updated_at=now)
+        )
+        self.applied += 1
+
+    def _expected_counters(self):
+        """Counters recomputed from orders and reviews, one row per user"""
+        review_counts = (
+            select(
+                Review.reviewed_user_id.label("user_id"),
+                func.count().label("total_reviews"),
+                func.count().filter(Review.rating >= 4).label("positive_reviews"),
+                func.count().filter(Review.rating == 3).label("neutral_reviews"),
+                func.count().filter(Review.rating <= 2).label("negative_reviews"),
+            )
+            .group_by(Review.reviewed_user_id)
+            .subquery()
+        )
+        completed = Order.status == OrderStatus.COMPLETED
+        on_time = or_(Order.delivery_deadline.is_(None), Order.completion_date <= Order.delivery_deadline)
+        order_counts = (
+            select(
+                Order.seller_id.label("user_id"),
+                func.count().label("total_orders"),
+                func.count().filter(completed).label("completed_orders"),
+                func.count().filter(completed, on_time).label("on_time_deliveries"),
+            )
+            .group_by(Order.seller_id)
+            .subquery()
+        )
+        # Users with metrics but no activity left are reset to zero
+        users = union(
+            select(review_counts.c.user_id),
+            select(order_counts.c.user_id),
+            select(ReputationMetric.user_id),
+        ).subquery()
+
+        counts = {name: (review_counts if name.endswith("_reviews") else order_counts).c[name] for name in COUNTERS}
+        return (
+            select(users.c.user_id, *[func.coalesce(counts[name], 0).label(name) for name in COUNTERS])
+            .select_from(users)
+            .outerjoin(review_counts, review_counts.c.user_id == users.c.user_id)
+            .outerjoin(order_counts, order_counts.c.user_id == users.c.user_id)
+        )
+
+    async def reconcile(self, db: AsyncSession) -> Dict[str, Any]:
+        """Rebuild every user's counters with set-based SQL and report drift.
+
+        The metrics table is locked against writers for the duration, so
+        increments committed meanwhile are neither lost nor double counted.
+        """
+        started = datetime.utcnow()
+        await db.execute(text("LOCK TABLE reputation_metrics IN SHARE ROW EXCLUSIVE MODE"))
+
+        expected = _expected_table
+        await db.run_sync(lambda session: expected.create(session.connection()))
+        await db.execute(insert(expected).from_select(["user_id", *COUNTERS], self._expected_counters()))
+        table = ReputationMetric.__table__
+        drifted = or_(
+            table.c.user_id.is_(None),
+            *[table.c[name].is_distinct_from(expected.c[name]) for name in COUNTERS],
+        )
+        drift = (
+            select(expected.c.user_id)
+            .select_from(expected)
+            .outerjoin(table, table.c.user_id == expected.c.user_id)
+            .where(drifted)
+            .subquery()
+        )
+        drifted_users = (await db.execute(select(func.count()).select_from(drift))).scalar_one()
+        sample = (await db.execute(select(drift.c.user_id).limit(DRIFT_SAMPLE_SIZE))).scalars().all()
+
+        if drifted_users:
+            counters = {name: expected.c[name] for name in COUNTERS}
+            source = (
+                select(
+                    func.gen_random_uuid(),
+                    expected.c.user_id,
+                    *counters.values(),
+                    *derived_scores(counters).values(),
+                    literal(started),
+                    literal(started),
+                )
+                .select_from(expected)
+                .outerjoin(table, table.c.user_id == expected.c.user_id)
+                .where(drifted)
+            )
+            stmt = insert(table).from_select(
+                ["id", "user_id", *COUNTERS, *derived_scores(counters).keys(), "created_at", "updated_at"],
+                source,
+            )
+            excluded = {name: stmt.excluded[name] for name in COUNTERS}
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[table.c.user_id],
+                    set_={**excluded, **derived_scores(excluded), "updated_at": started},
+                )
+            )
+
+        pruned = await db.execute(
+            delete(ReputationEvent)
+            .where(ReputationEvent.created_at < started - timedelta(days=self.event_retention_days))
+        )
+        await db.commit()
+
+        report = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "duration_ms": round((datetime.utcnow() - started).total_seconds() * 1000, 1),
+            "drifted_users": drifted_users,
+            "drift_sample": [str(user_id) for user_id in sample],
+            "pruned_events": pruned.rowcount,
+        }
+        if drifted_users:
+            logger.warning("Reputation reconciliation corrected %d drifted users: %s", drifted_users, report["drift_sample"])
+        self.last_reconciliation = report
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "applied": self.applied,
+            "duplicates": self.duplicates,
+            "last_reconciliation": self.last_reconciliation,
+        }
+
+# Global instance
+reputation_aggregator = ReputationAggregator(event_retention_days=settings.REPUTATION_EVENT_RETENTION_DAYS)
+
+metrics.register("reputation", reputation_aggregator.stats)
+
+def _review_inserted(mapper, connection, target):
+    reputation_aggregator.apply(
+        connection, f"review:{target.id}", target.reviewed_user_id, _review_deltas(target.rating)
+    )
+
+def _order_inserted(mapper, connection, target):
+    reputation_aggregator.apply(connection, f"order:{target.id}:created", target.seller_id, {"total_orders": 1})
+    if target.status == OrderStatus.COMPLETED:
+        _order_completed(connection, target)
+
+def _order_updated(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if history.has_changes() and target.status == OrderStatus.COMPLETED:
+        _order_completed(connection, target)
+
+def _order_completed(connection, order: Order):
+    reputation_aggregator.apply(
+        connection,
+        f"order:{order.id}:completed",
+        order.seller_id,
+        {"completed_orders": 1, "on_time_deliveries": int(_on_time(order))},
+    )
+
+event.listen(Review, "after_insert", _review_inserted)
+event.listen(Order, "after_insert", _order_inserted)
+event.listen(Order, "after_update", _order_updated)
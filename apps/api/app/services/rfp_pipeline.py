@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.rfp import RFP, RequirementsStatus
+from app.services.ai_service import normalize_rfp_requirements, generate_rfp_summary
+from app.workers import background
+
+logger = logging.getLogger(__name__)
+
+# RFPs re-queued per sweep
+SWEEP_BATCH_SIZE = 500
+
+def _claimable(now: datetime):
+    """RFPs waiting for a job, or whose job's lease has run out"""
+    lease = timedelta(seconds=settings.RFP_REQUIREMENTS_LEASE_SECONDS)
+    return or_(
+        RFP.requirements_status == RequirementsStatus.PENDING,
+        and_(
+            RFP.requirements_status == RequirementsStatus.PROCESSING,
+            RFP.requirements_claimed_at < now - lease,
+        ),
+    )
+
+async def process_rfp_requirements(rfp_id: str, session_factory: async_sessionmaker = AsyncSessionLocal):
+    """Fill in an RFP's normalized requirements and AI summary"""
+
+    async with session_factory() as db:
+        # Claim the RFP under a fresh token so a duplicate delivery of the job
+        # does not redo the work, while a job whose lease ran out (its worker
+        # died) is taken over and can no longer write back
+        claim = uuid.uuid4()
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(RFP)
+            .where(RFP.id == rfp_id, _claimable(now))
+            .values(requirements_status=RequirementsStatus.PROCESSING, requirements_claim=claim, requirements_claimed_at=now)
+            .returning(RFP.title, RFP.description, RFP.category, RFP.budget_min, RFP.budget_max, RFP.deadline)
+        )
+        row = result.first()
+        await db.commit()
+        if row is None:
+            return
+
+        rfp_data = {
+            "title": row.title,
+            "description": row.description,
+            "category": row.category,
+            "budget_min": row.budget_min,
+            "budget_max": row.budget_max,
+            "deadline": row.deadline,
+        }
+
+        try:
+            requirements, summary = await asyncio.gather(
+                normalize_rfp_requirements(row.description),
+                generate_rfp_summary(rfp_data),
+            )
+        except Exception:
+            await db.execute(
+                update(RFP)
+                .where(RFP.id == rfp_id, RFP.requirements_claim == claim)
+                .values(requirements_status=RequirementsStatus.FAILED)
+            )
+            await db.commit()
+            raise
+
+        # Only write back if this job still holds the claim and nobody reset
+        # the RFP (e.g. edited its description) meanwhile
+        await db.execute(
+            update(RFP)
+            .where(
+                RFP.id == rfp_id,
+                RFP.requirements_claim == claim,
+                RFP.requirements_status == RequirementsStatus.PROCESSING,
+            )
+            .values(
+                requirements=requirements,
+                ai_summary=summary,
+                requirements_status=RequirementsStatus.COMPLETED,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        await db.commit()
+
+async def enqueue_rfp_requirements(rfp_id: str):
+    """Schedule requirement normalization on the configured task backend"""
+
+    if settings.TASK_BACKEND == "celery":
+        from app.workers.tasks import normalize_rfp_task
+
+        # Publishing talks to the broker synchronously, keep it off the event loop
+        await asyncio.to_thread(normalize_rfp_task.delay, str(rfp_id))
+    else:
+        background.spawn(process_rfp_requirements(str(rfp_id)))
+
+async def requeue_stale_requirements(session_factory: async_sessionmaker = AsyncSessionLocal) -> List[str]:
+    """Re-queue RFPs whose requirements job was lost; returns their ids.
+
+    Covers jobs whose lease expired mid-run and jobs that never started
+    (an in-process task dropped by a restart), i.e. RFPs left PENDING for
+    longer than a lease.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.RFP_REQUIREMENTS_LEASE_SECONDS)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(RFP.id)
+            .where(
+                _claimable(now),
+                or_(RFP.requirements_status == RequirementsStatus.PROCESSING, RFP.updated_at < cutoff),
+            )
+            .limit(SWEEP_BATCH_SIZE)
+        )
+        rfp_ids = [str(rfp_id) for rfp_id in result.scalars()]
+
+    for rfp_id in rfp_ids:
+        await enqueue_rfp_requirements(rfp_id)
+    if rfp_ids:
+        logger.warning("Re-queued requirements of %d RFPs whose jobs were lost", len(rfp_ids))
+    return rfp_ids
+
+async def get_requirements_status(rfp_id: str) -> RequirementsStatus:
+    """Read the current status with a short-lived session"""
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(RFP.requirements_status).where(RFP.id == rfp_id))
+        return result.scalar_one_or_none()
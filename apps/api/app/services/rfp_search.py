@@ -0,0 +1,338 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, event, func, null, or_, select, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.rfp import RFP, RFPStatus
+
+# Budget facet buckets: (label, lower bound inclusive, upper bound exclusive)
+BUDGET_BUCKETS: List[Tuple[str, int, Optional[int]]] = [
+    ("under_1k", 0, 1000),
+    ("1k_5k", 1000, 5000),
+    ("5k_10k", 5000, 10000),
+    ("10k_50k", 10000, 50000),
+    ("50k_100k", 50000, 100000),
+    ("100k_plus", 100000, None),
+]
+UNSPECIFIED_BUDGET = "unspecified"
+
+def budget_bucket(budget_min: Optional[int], budget_max: Optional[int]) -> str:
+    """Bucket an RFP by its upper budget, falling back to the lower one"""
+    budget = budget_max if budget_max is not None else budget_min
+    if budget is None:
+        return UNSPECIFIED_BUDGET
+    for label, low, high in BUDGET_BUCKETS:
+        if budget >= low and (high is None or budget < high):
+            return label
+    return BUDGET_BUCKETS[0][0]
+
+def _budget_bucket_expr():
+    budget = func.coalesce(RFP.budget_max, RFP.budget_min)
+    # Checked from the highest bucket down, so only lower bounds matter
+    whens = [(budget.is_(None), UNSPECIFIED_BUDGET)]
+    whens += [(budget >= low, label) for label, low, _ in reversed(BUDGET_BUCKETS)]
+    return case(*whens, else_=BUDGET_BUCKETS[0][0])
+
+def facet_counts(rows, selected: Dict[str, Optional[str]]) -> Tuple[Dict[str, Dict[str, int]], int]:
+    """Facet counts and the number of hits from (category, status, budget, count) rows.
+
+    Each facet's counts apply every selected filter except its own, so the
+    client can switch values.
+    """
+    facets = {"category": Counter(), "status": Counter(), "budget": Counter()}
+    total = 0
+    for category, status, budget, count in rows:
+        values = {"category": category, "status": status, "budget": budget}
+        passes = {name: selected[name] is None or values[name] == selected[name] for name in facets}
+        for name in facets:
+            if all(ok for other, ok in passes.items() if other != name):
+                facets[name][values[name]] += count
+        if all(passes.values()):
+            total += count
+    return {name: dict(counts) for name, counts in facets.items()}, total
+
+# Without a query every public RFP matches, so its facet counts are the
+# same for everyone and too costly to recount per request
+_public_facets = TTLCache(max_entries=1, ttl_seconds=settings.RFP_SEARCH_FACET_CACHE_TTL_SECONDS)
+
+metrics.register("rfp_search_facets", _public_facets.stats)
+
+async def search_rfps(
+    db: AsyncSession,
+    user_id,
+    q: Optional[str],
+    category: Optional[str],
+    status: Optional[RFPStatus],
+    budget: Optional[str],
+    limit: int,
+    offset: int
+) -> Dict[str, Any]:
+    """Ranked RFP search with facet counts for category, status and budget"""
+    if db.get_bind().dialect.name == "postgresql":
+        return await _search_postgres(db, user_id, q, category, status, budget, limit, offset)
+    return await _search_fallback(db, user_id, q, category, status, budget, limit, offset)
+
+async def _search_postgres(db, user_id, q, category, status, budget, limit, offset):
+    if not q:
+        return await _browse_postgres(db, user_id, category, status, budget, limit, offset)
+
+    tsquery = func.websearch_to_tsquery("english", q)
+    visible = or_(RFP.is_private == False, RFP.buyer_id == user_id)
+    # Referenced twice below, so Postgres reads and ranks the matches once
+    matches = (
+        select(
+            RFP.id,
+            RFP.created_at,
+            RFP.category,
+            RFP.status,
+            _budget_bucket_expr().label("budget"),
+            func.ts_rank_cd(RFP.search_vector, tsquery).label("rank"),
+        )
+        .where(RFP.search_vector.op("@@")(tsquery), visible)
+        .cte("matches")
+    )
+
+    filters = [matches.c.category == category if category else true(), matches.c.status == status if status else true()]
+    if budget:
+        filters.append(matches.c.budget == budget)
+    page = (
+        select(matches.c.id, matches.c.rank, matches.c.created_at)
+        .where(*filters)
+        .order_by(matches.c.rank.desc(), matches.c.created_at.desc(), matches.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    # Per-(category, status, budget) counts, then the page's rows
+    counts = (
+        select(
+            matches.c.category,
+            matches.c.status,
+            matches.c.budget,
+            func.count().label("count"),
+            null().label("id"),
+            null().label("rank"),
+            null().label("created_at"),
+        )
+        .group_by(matches.c.category, matches.c.status, matches.c.budget)
+    )
+    rows = (await db.execute(union_all(
+        counts, select(null(), null(), null(), null(), page.c.id, page.c.rank, page.c.created_at)
+    ))).all()
+
+    # UNION ALL keeps no order, so the page is sorted again here
+    page_rows = sorted((row for row in rows if row.id is not None), key=lambda row: (row.rank, row.created_at, row.id), reverse=True)
+    ranked = [(row.id, float(row.rank)) for row in page_rows]
+    facets, total = _facets_from_counts(
+        [(row.category, row.status, row.budget, row.count) for row in rows if row.id is None], category, status, budget
+    )
+    if not ranked:
+        return {"hits": [], "total": total, "facets": facets}
+
+    result = await db.execute(select(RFP).where(RFP.id.in_([rfp_id for rfp_id, _ in ranked])))
+    rfps = {rfp.id: rfp for rfp in result.scalars()}
+    hits = [(rfps[rfp_id], rank) for rfp_id, rank in ranked if rfp_id in rfps]
+    return {"hits": hits, "total": total, "facets": facets}
+
+def _facets_from_counts(rows, category, status, budget):
+    selected = {"category": category, "status": status.value if status else None, "budget": budget}
+    return facet_counts(
+        [(row_category, row_status.value if row_status else None, row_budget, count)
+         for row_category, row_status, row_budget, count in rows],
+        selected,
+    )
+
+async def _browse_postgres(db, user_id, category, status, budget, limit, offset):
+    """Newest RFPs without a text query.
+
+    Public and the user's own private RFPs are read separately so each side
+    walks its (created_at, id) index; facets come from per-(category,
+    status, budget) counts, the public ones cached.
+    """
+    bucket = _budget_bucket_expr()
+    filters = [RFP.category == category if category else true(), RFP.status == status if status else true()]
+    if budget:
+        filters.append(bucket == budget)
+    public = RFP.is_private == False
+    own = and_(RFP.buyer_id == user_id, RFP.is_private.isnot(False))
+
+    def newest(visible):
+        return (
+            select(RFP.id, RFP.created_at)
+            .where(visible, *filters)
+            .order_by(RFP.created_at.desc(), RFP.id.desc())
+            .limit(offset + limit)
+        )
+
+    page = union_all(newest(public), newest(own)).subquery()
+    result = await db.execute(
+        select(RFP)
+        .join(page, page.c.id == RFP.id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    hits = [(rfp, 0.0) for rfp in result.scalars()]
+
+    def counts(visible):
+        return (
+            select(RFP.category, RFP.status, bucket, func.count())
+            .where(visible)
+            .group_by(RFP.category, RFP.status, bucket)
+        )
+
+    public_counts = _public_facets.get("public")
+    if public_counts is None:
+        public_counts = (await db.execute(counts(public))).all()
+        _public_facets.set("public", public_counts)
+    own_counts = (await db.execute(counts(own))).all()
+
+    facets, total = _facets_from_counts([*public_counts, *own_counts], category, status, budget)
+    return {"hits": hits, "total": total, "facets": facets}
+
+async def _search_fallback(db, user_id, q, category, status, budget, limit, offset):
+    await rfp_index.ensure_loaded(db)
+    ranked, total, facets = rfp_index.search(
+        q, str(user_id), category, status.value if status else None, budget, limit, offset
+    )
+
+    if not ranked:
+        return {"hits": [], "total": total, "facets": facets}
+
+    result = await db.execute(select(RFP).where(RFP.id.in_([rfp_id for rfp_id, _ in ranked])))
+    rfps = {str(rfp.id): rfp for rfp in result.scalars()}
+    hits = [(rfps[rfp_id], score) for rfp_id, score in ranked if rfp_id in rfps]
+    return {"hits": hits, "total": total, "facets": facets}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field weights mirroring the A/B/C weights of the Postgres search vector
+_FIELD_WEIGHTS = {"title": 1.0, "description": 0.4, "specifications": 0.2}
+
+def _stem(token: str) -> str:
+    """Crude plural folding so "laptops" matches "laptop" like the english config does"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def _tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN_RE.findall(text.lower())]
+
+def _specifications_text(requirements: Optional[Dict[str, Any]]) -> str:
+    specifications = (requirements or {}).get("specifications") or []
+    if isinstance(specifications, str):
+        return specifications
+    return " ".join(str(item) for item in specifications)
+
+class InvertedIndex:
+    """In-process inverted index used when the database has no full-text search.
+
+    Scoring is a weighted TF-IDF over title, description and requirement
+    specifications. It only sees ORM inserts, updates and deletes made by
+    this process, which is what single-process SQLite test runs need.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+
+    def upsert(self, rfp: RFP):
+        rfp_id = str(rfp.id)
+        self.remove(rfp_id)
+
+        weights: Counter = Counter()
+        fields = {
+            "title": rfp.title or "",
+            "description": rfp.description or "",
+            "specifications": _specifications_text(rfp.requirements),
+        }
+        for field, text in fields.items():
+            for token in _tokenize(text):
+                weights[token] += _FIELD_WEIGHTS[field]
+
+        for term, weight in weights.items():
+            self.postings[term][rfp_id] = weight
+        self.doc_terms[rfp_id] = list(weights)
+        self.docs[rfp_id] = {
+            "category": rfp.category,
+            "status": rfp.status.value if rfp.status else None,
+            "budget": budget_bucket(rfp.budget_min, rfp.budget_max),
+            "is_private": bool(rfp.is_private),
+            "buyer_id": str(rfp.buyer_id),
+            "created_at": rfp.created_at.timestamp() if rfp.created_at else 0.0,
+        }
+
+    def remove(self, rfp_id: str):
+        for term in self.doc_terms.pop(rfp_id, []):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(rfp_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.docs.pop(rfp_id, None)
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self.loaded:
+            return
+        result = await db.execute(select(RFP))
+        for rfp in result.scalars():
+            self.upsert(rfp)
+        self.loaded = True
+
+    def search(self, q, user_id, category, status, budget, limit, offset):
+        terms = set(_tokenize(q or ""))
+        if terms:
+            scores: Dict[str, float] = defaultdict(float)
+            matched_terms: Dict[str, int] = defaultdict(int)
+            for term in terms:
+                postings = self.postings.get(term, {})
+                if not postings:
+                    continue
+                idf = math.log(1 + len(self.docs) / len(postings))
+                for rfp_id, weight in postings.items():
+                    scores[rfp_id] += weight * idf
+                    matched_terms[rfp_id] += 1
+            # Every query term must match, like websearch_to_tsquery's AND
+            candidates = {rfp_id: score for rfp_id, score in scores.items() if matched_terms[rfp_id] == len(terms)}
+        else:
+            candidates = {rfp_id: 0.0 for rfp_id in self.docs}
+
+        selected = {"category": category, "status": status, "budget": budget}
+        counts: Counter = Counter()
+        results = []
+        for rfp_id, score in candidates.items():
+            doc = self.docs[rfp_id]
+            if doc["is_private"] and doc["buyer_id"] != user_id:
+                continue
+            counts[doc["category"], doc["status"], doc["budget"]] += 1
+            if all(value is None or doc[name] == value for name, value in selected.items()):
+                results.append((rfp_id, score))
+
+        results.sort(key=lambda item: (item[1], self.docs[item[0]]["created_at"], item[0]), reverse=True)
+        facets, total = facet_counts([(*key, count) for key, count in counts.items()], selected)
+        return results[offset:offset + limit], total, facets
+
+# Global instance
+rfp_index = InvertedIndex()
+
+def _index_rfp(mapper, connection, target):
+    if connection.dialect.name != "postgresql" and rfp_index.loaded:
+        rfp_index.upsert(target)
+
+def _unindex_rfp(mapper, connection, target):
+    if connection.dialect.name != "postgresql":
+        rfp_index.remove(str(target.id))
+
+event.listen(RFP, "after_insert", _index_rfp)
+event.listen(RFP, "after_update", _index_rfp)
+event.listen(RFP, "after_delete", _unindex_rfp)
@@ -0,0 +1,298 @@
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.order import Order, OrderStatus, PaymentStatus
+from app.models.payment import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock class of payment intents, so one worker at a time applies an intent's events
+PAYMENT_INTENT_LOCK_CLASS = 7342002
+
+# Intents considered per batch slot, so concurrent workers each find intents nobody holds
+CANDIDATES_PER_SLOT = 4
+
+# Lifecycle position of each event type applied to orders; breaks ties
+# between events Stripe created within the same second
+EVENT_RANK = {
+    "payment_intent.payment_failed": 1,
+    "payment_intent.canceled": 1,
+    "payment_intent.succeeded": 2,
+    "charge.refunded": 3,
+}
+
+# Outcomes of applying one event to its order
+APPLIED, IGNORED, WAIT = "applied", "ignored", "wait"
+
+# Longest pause between attempts at an event that cannot be applied yet
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+def route(event: Dict[str, Any]) -> Tuple[Optional[str], Optional[uuid.UUID]]:
+    """The payment intent and order (from its metadata) an event is about"""
+    obj = event.get("data", {}).get("object", {})
+    if event.get("type", "").startswith("payment_intent."):
+        payment_intent_id = obj.get("id")
+    else:
+        payment_intent_id = obj.get("payment_intent")
+    try:
+        order_id = uuid.UUID((obj.get("metadata") or {})["order_id"])
+    except (KeyError, TypeError, ValueError):
+        order_id = None
+    return payment_intent_id, order_id
+
+class StripeEventProcessor:
+    """Applies Stripe webhook events to the payment state of orders.
+
+    The webhook only verifies an event and inserts it into the
+    ``stripe_events`` inbox, keyed by event id so Stripe's redeliveries are
+    dropped by ON CONFLICT DO NOTHING. Workers then apply the inbox in
+    batches: each batch locks a set of payment intents with
+    transaction-level advisory locks (skipping intents another worker
+    holds), applies their pending events in the order Stripe created them
+    and writes the orders and events back in one transaction.
+
+    Stripe does not deliver events in order, so every transition checks
+    the order's current state: a failure after a success is stale and
+    ignored, while a refund whose payment has not been seen yet waits
+    for it and is retried with backoff until ``retry_window`` passes.
+    """
+
+    def __init__(self, batch_size: int, max_batches: int, retry_hours: int, escrow_hold_days: int):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.retry_window = timedelta(hours=retry_hours)
+        self.escrow_hold = timedelta(days=escrow_hold_days)
+        self.received = 0
+        self.duplicates = 0
+        self.applied = 0
+        self.ignored = 0
+        self.deferred = 0
+        self.dropped = 0
+        self.last_run_ms = 0.0
+
+    async def ingest(self, db: AsyncSession, event: Dict[str, Any], payload: str) -> bool:
+        """Store a verified event in the inbox; False when it was already received"""
+        now = datetime.utcnow()
+        payment_intent_id, order_id = route(event)
+        result = await db.execute(
+            insert(StripeEvent)
+            .values(
+                id=event["id"],
+                type=event["type"],
+                payment_intent_id=payment_intent_id,
+                order_id=order_id,
+                event_created_at=datetime.utcfromtimestamp(event["created"]),
+                payload=payload,
+                received_at=now,
+                # Nothing to apply for events that do not move an order's payment
+                processed_at=None if payment_intent_id and event["type"] in EVENT_RANK else now,
+            )
+            .on_conflict_do_nothing()
+            .returning(StripeEvent.id)
+        )
+        if result.first() is None:
+            self.duplicates += 1
+            return False
+        self.received += 1
+        return True
+
+    def _apply(self, order: Dict[str, Any], stored: StripeEvent, event: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Apply one event to an order's payment state in place; returns the outcome and any error"""
+        if order["payment_intent_id"] not in (None, stored.payment_intent_id):
+            return IGNORED, "Order is paid through another payment intent"
+
+        obj = event["data"]["object"]
+        status = order["payment_status"]
+        if stored.type == "payment_intent.succeeded":
+            if status not in (PaymentStatus.PENDING, PaymentStatus.FAILED):
+                return IGNORED, None
+            if obj.get("amount_received", 0) < round(order["amount"] * 100):
+                return IGNORED, f"Received {obj.get('amount_received')} cents for an order of {order['amount']}"
+            order["payment_status"] = PaymentStatus.PAID
+            if order["status"] == OrderStatus.PENDING:
+                order["status"] = OrderStatus.PAID
+            order["escrow_release_date"] = stored.event_created_at + self.escrow_hold
+        elif stored.type in ("payment_intent.payment_failed", "payment_intent.canceled"):
+            # A success that was already applied makes the failure stale
+            if status != PaymentStatus.PENDING:
+                return IGNORED, None
+            order["payment_status"] = PaymentStatus.FAILED
+        elif stored.type == "charge.refunded":
+            if not obj.get("refunded"):
+                # Partial refunds are settled by hand
+                return IGNORED, None
+            if status == PaymentStatus.REFUNDED:
+                return IGNORED, None
+            if status != PaymentStatus.PAID:
+                # The payment's own event has not arrived yet
+                return WAIT, None
+            order["payment_status"] = PaymentStatus.REFUNDED
+            if order["status"] != OrderStatus.COMPLETED:
+                order["status"] = OrderStatus.CANCELLED
+        else:
+            return IGNORED, None
+
+        order["payment_intent_id"] = stored.payment_intent_id
+        return APPLIED, None
+
+    async def apply_batch(self, db: AsyncSession, now: datetime) -> int:
+        """Apply the pending events of up to ``batch_size`` payment intents; returns how many intents were locked"""
+        # Intents with events due, oldest first, locked in the same statement.
+        # Intents other workers hold are skipped and the scan goes on; the
+        # outer query must not sort, so its LIMIT stops the lock calls once
+        # the batch is full.
+        due = (
+            select(StripeEvent.payment_intent_id)
+            .where(
+                StripeEvent.processed_at.is_(None),
+                or_(StripeEvent.next_attempt_at.is_(None), StripeEvent.next_attempt_at <= now),
+            )
+            .group_by(StripeEvent.payment_intent_id)
+            .order_by(func.min(StripeEvent.event_created_at))
+            .limit(self.batch_size * CANDIDATES_PER_SLOT)
+            .subquery()
+        )
+        result = await db.execute(
+            select(due.c.payment_intent_id)
+            .where(func.pg_try_advisory_xact_lock(PAYMENT_INTENT_LOCK_CLASS, func.hashtext(due.c.payment_intent_id)))
+            .limit(self.batch_size)
+        )
+        intents = result.scalars().all()
+        if not intents:
+            return 0
+
+        # Read after the locks, so events another worker applied meanwhile are not seen as pending
+        result = await db.execute(
+            select(StripeEvent)
+            .where(StripeEvent.payment_intent_id.in_(intents), StripeEvent.processed_at.is_(None))
+            .execution_options(populate_existing=True)
+        )
+        events = defaultdict(list)
+        for stored in result.scalars():
+            events[stored.payment_intent_id].append((stored, json.loads(stored.payload)))
+
+        # Orders are found by the intent once it is recorded, by metadata before that
+        order_ids = {stored.order_id for pending in events.values() for stored, _ in pending if stored.order_id}
+        result = await db.execute(
+            select(
+                Order.id,
+                Order.amount,
+                Order.status,
+                Order.payment_status,
+                Order.payment_intent_id,
+                Order.escrow_release_date,
+            )
+            .where(or_(Order.payment_intent_id.in_(intents), Order.id.in_(order_ids)))
+            .with_for_update()
+        )
+        orders = {row.id: {**row._asdict(), "amount": float(row.amount)} for row in result}
+        by_intent = {order["payment_intent_id"]: order for order in orders.values() if order["payment_intent_id"]}
+
+        changed = {}
+        processed: List[Dict[str, Any]] = []
+        for payment_intent_id, pending in events.items():
+            pending.sort(key=lambda item: (item[0].event_created_at, EVENT_RANK[item[0].type], item[0].id))
+            order = by_intent.get(payment_intent_id)
+            if order is None:
+                order = next((orders[stored.order_id] for stored, _ in pending if stored.order_id in orders), None)
+
+            for stored, event in pending:
+                if order is None:
+                    outcome, error = WAIT, None
+                else:
+                    outcome, error = self._apply(order, stored, event)
+                    if outcome == APPLIED:
+                        changed[order["id"]] = order
+
+                if outcome == WAIT and now - stored.received_at < self.retry_window:
+                    delay = min(timedelta(seconds=5 * 2 ** stored.attempts), MAX_RETRY_DELAY)
+                    processed.append({
+                        "id": stored.id,
+                        "attempts": stored.attempts + 1,
+                        "next_attempt_at": now + delay,
+                        "processed_at": None,
+                        "error": None,
+                    })
+                    self.deferred += 1
+                    continue
+
+                if outcome == WAIT:
+                    error = "No order could take this event"
+                    self.dropped += 1
+                    logger.warning("Dropping Stripe event %s: %s", stored.id, error)
+                elif outcome == APPLIED:
+                    self.applied += 1
+                else:
+                    self.ignored += 1
+                processed.append({
+                    "id": stored.id,
+                    "attempts": stored.attempts + 1,
+                    "next_attempt_at": None,
+                    "processed_at": now,
+                    "error": error,
+                })
+
+        if changed:
+            await db.execute(
+                update(Order),
+                [
+                    {
+                        "id": order["id"],
+                        "status": order["status"],
+                        "payment_status": order["payment_status"],
+                        "payment_intent_id": order["payment_intent_id"],
+                        "escrow_release_date": order["escrow_release_date"],
+                        "updated_at": now,
+                    }
+                    for order in changed.values()
+                ],
+            )
+        if processed:
+            await db.execute(update(StripeEvent), processed)
+        await db.commit()
+        return len(intents)
+
+    async def run(self, session_factory) -> int:
+        """Apply pending events batch by batch until none are due; returns how many intents were handled"""
+        started = time.perf_counter()
+        handled = 0
+        for _ in range(self.max_batches):
+            async with session_factory() as db:
+                locked = await self.apply_batch(db, datetime.utcnow())
+            handled += locked
+            if locked < self.batch_size:
+                break
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        return handled
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "applied": self.applied,
+            "ignored": self.ignored,
+            "deferred": self.deferred,
+            "dropped": self.dropped,
+            "last_run_ms": round(self.last_run_ms, 1),
+        }
+
+# Global instance
+stripe_events = StripeEventProcessor(
+    batch_size=settings.STRIPE_EVENT_BATCH_SIZE,
+    max_batches=settings.STRIPE_EVENT_MAX_BATCHES,
+    retry_hours=settings.STRIPE_EVENT_RETRY_HOURS,
+    escrow_hold_days=settings.ESCROW_HOLD_DAYS,
+)
+
+metrics.register("stripe_events", stripe_events.stats)
@@ -0,0 +1,28 @@
+import asyncio
+import logging
+from typing import Coroutine, Set
+
+logger = logging.getLogger(__name__)
+
+# Strong references to in-flight tasks so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+
+def _on_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task failed", exc_info=task.exception())
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """Run a coroutine in the API process without awaiting it"""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+async def shutdown(timeout: float = 10.0):
+    """Give in-flight tasks a chance to finish, then cancel the rest"""
+    if not _tasks:
+        return
+    done, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
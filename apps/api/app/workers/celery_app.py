@@ -0,0 +1,50 @@
+from celery import Celery
+from celery.schedules import crontab
+
+from app.core.config import settings
+
+# Register every mapped model so relationships resolve outside the API process
+from app.models import (  # noqa: F401
+    dispute, inventory, market, offer, order, organization, payment, pool, product, reputation, rfp, rfp_file, rfp_thread, user,
+)
+
+celery_app = Celery(
+    "ai_marketplace",
+    broker=settings.CELERY_BROKER_URL,
+    include=["app.workers.tasks"],
+)
+
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+)
+
+# Run with `celery -A app.workers.celery_app beat` alongside the workers
+celery_app.conf.beat_schedule = {
+    "rebuild-market-stats": {
+        "task": "market_stats.rebuild",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "settle-due-pools": {
+        "task": "pools.settle_due",
+        "schedule": 60.0,
+    },
+    "release-expired-reservations": {
+        "task": "inventory.release_expired",
+        "schedule": 60.0,
+    },
+    "apply-stripe-events": {
+        "task": "payments.apply_stripe_events",
+        "schedule": 5.0,
+    },
+    "requeue-stale-rfp-requirements": {
+        "task": "rfps.requeue_stale_requirements",
+        "schedule": 300.0,
+    },
+    "reconcile-reputation": {
+        "task": "reputation.reconcile",
+        "schedule": crontab(hour=3, minute=30),
+    },
+}
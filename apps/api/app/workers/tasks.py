@@ -0,0 +1,82 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.database import ASYNC_DATABASE_URL
+# Registers the reputation and product rating event listeners
+from app.services import product_ratings, reputation  # noqa: F401
+from app.services.llm_client import llm_client
+from app.workers import background
+from app.workers.celery_app import celery_app
+
+def _run(coro_factory):
+    """Run a coroutine on a fresh event loop with its own unpooled engine.
+
+    Celery tasks each get a new loop, and asyncpg connections cannot be
+    shared across loops, so nothing is pooled between tasks.
+    """
+    async def runner():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            return await coro_factory(session_factory)
+        finally:
+            # Work spawned by the task (e.g. shared cache invalidations) and
+            # the shared LLM client's connections belong to this loop too
+            await background.shutdown()
+            await llm_client.close()
+            await engine.dispose()
+
+    return asyncio.run(runner())
+
+@celery_app.task(name="rfps.normalize_requirements")
+def normalize_rfp_task(rfp_id: str):
+    from app.services.rfp_pipeline import process_rfp_requirements
+
+    _run(lambda session_factory: process_rfp_requirements(rfp_id, session_factory))
+
+@celery_app.task(name="market_stats.rebuild")
+def rebuild_market_stats_task():
+    from app.core.config import settings
+    from app.services.market_stats import market_stats
+
+    async def rebuild(session_factory):
+        async with session_factory() as db:
+            await market_stats.rebuild(db, settings.MARKET_STATS_WINDOW_DAYS)
+
+    _run(rebuild)
+
+@celery_app.task(name="reputation.reconcile")
+def reconcile_reputation_task():
+    from app.services.reputation import reputation_aggregator
+
+    async def reconcile(session_factory):
+        async with session_factory() as db:
+            return await reputation_aggregator.reconcile(db)
+
+    return _run(reconcile)
+
+@celery_app.task(name="pools.settle_due")
+def settle_due_pools_task():
+    from app.services.pool_settlement import pool_settlement
+
+    _run(pool_settlement.run)
+
+@celery_app.task(name="inventory.release_expired")
+def release_expired_reservations_task():
+    from app.services.inventory import inventory
+
+    _run(inventory.run)
+
+@celery_app.task(name="payments.apply_stripe_events")
+def apply_stripe_events_task():
+    from app.services.stripe_events import stripe_events
+
+    _run(stripe_events.run)
+
+@celery_app.task(name="rfps.requeue_stale_requirements")
+def requeue_stale_requirements_task():
+    from app.services.rfp_pipeline import requeue_stale_requirements
+
+    return _run(requeue_stale_requirements)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
@@ -6,21 +6,36 @@ import uvicorn
 from typing import List
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core import metrics
+from app.core.database import engine, Base, start_query_log
+from app.core.redis import close_redis
 from app.api.v1.api import api_router
-from app.core.security import get_current_user
+from app.core.security import get_current_user, password_hasher
+# Registers the reputation and product rating event listeners
+from app.services import product_ratings, reputation  # noqa: F401
+from app.services.llm_client import llm_client
+from app.services.rfp_pipeline import requeue_stale_requirements
+from app.workers import background
 from app.models.user import User
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting AI Marketplace API...")
+    # Create database tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # Without Celery beat, pick up requirement jobs a previous process lost
+    if settings.TASK_BACKEND != "celery":
+        background.spawn(requeue_stale_requirements())
     yield
     # Shutdown
     print("👋 Shutting down AI Marketplace API...")
+    await background.shutdown()
+    await llm_client.close()
+    await engine.dispose()
+    await close_redis()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="AI Marketplace API",
@@ -40,6 +55,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Report database round trips per request while debugging
+if settings.DEBUG:
+    @app.middleware("http")
+    async def count_queries(request: Request, call_next):
+        queries = start_query_log()
+        response = await call_next(request)
+        response.headers["X-DB-Query-Count"] = str(len(queries))
+        return response
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -55,6 +79,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 @app.get("/api/v1/me", response_model=dict)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return {
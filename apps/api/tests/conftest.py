@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+# Database tests run against TEST_DATABASE_URL, whose tables they drop and
+# recreate. It has to be in place before the app reads its settings.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+@pytest.fixture
+async def client():
+    """API client over a freshly created schema"""
+    import httpx
+
+    import main
+    from app.core.database import Base, engine
+    from app.workers import background
+    # Register every mapped model, so all tables are dropped and created
+    from app.workers import celery_app  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=600) as api:
+        yield api
+
+    # Every test gets its own event loop, which pooled connections cannot outlive
+    await background.shutdown()
+    await engine.dispose()
@@ -0,0 +1,85 @@
+"""Setup shared by the database tests"""
+import uuid
+from typing import Dict, List
+
+async def register(client, email: str, role: str = "buyer") -> Dict[str, str]:
+    """Sign up a user through the API; returns their auth headers"""
+    response = await client.post(
+        "/api/v1/auth/register", json={"email": email, "password": "password123", "role": role}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def create_buyers(count: int) -> List[uuid.UUID]:
+    """Insert ``count`` buyers directly, skipping password hashing"""
+    from sqlalchemy import insert
+
+    from app.core.database import AsyncSessionLocal
+    from app.models.user import User, UserRole
+
+    ids = [uuid.uuid4() for _ in range(count)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(User),
+            [
+                {"id": user_id, "email": f"{user_id}@example.com", "hashed_password": "-", "role": UserRole.BUYER}
+                for user_id in ids
+            ],
+        )
+        await db.commit()
+    return ids
+
+def auth_headers(user_id) -> Dict[str, str]:
+    from app.core.security import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+# Words the seeded RFPs are written from. Each word appears in roughly
+# 5 / SEED_VOCABULARY of them; the rest of the vocabulary is filler.
+SEED_VOCABULARY = 1000
+SEED_WORDS = [
+    "laptop", "desk", "chair", "server", "monitor", "printer", "cable", "router", "software", "license",
+    "consulting", "audit", "marketing", "campaign", "catering", "cleaning", "security", "logistics", "freight", "packaging",
+    "steel", "lumber", "paint", "solar", "panel", "battery", "vehicle", "fleet", "training", "design",
+]
+SEED_CATEGORIES = ["hardware", "software", "services", "construction", "logistics"]
+
+async def seed_rfps(count: int, buyer_ids: List[uuid.UUID]) -> None:
+    """Insert ``count`` RFPs in the database itself, one a minute going back from now.
+
+    Each is posted by a random one of ``buyer_ids``, and its title and
+    description are drawn from SEED_WORDS and filler words. Every tenth RFP
+    is private.
+    """
+    from sqlalchemy import text
+
+    from app.core.database import AsyncSessionLocal
+
+    vocabulary = SEED_WORDS + [f"part{n}" for n in range(SEED_VOCABULARY - len(SEED_WORDS))]
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in vocabulary) + "]"
+
+    def word(salt: int) -> str:
+        return f"({words})[1 + abs(hashtextextended((i * {salt})::text, 0) % {len(vocabulary)})]"
+
+    categories = "ARRAY[" + ", ".join(f"'{category}'" for category in SEED_CATEGORIES) + "]"
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text(f"""
+                INSERT INTO rfps (id, title, description, category, budget_max, deadline, status,
+                                  requirements_status, buyer_id, is_private, created_at, updated_at)
+                SELECT gen_random_uuid(),
+                       {word(1)} || ' ' || {word(2)},
+                       'Need ' || {word(3)} || ' and ' || {word(4)} || ' for ' || {word(5)},
+                       ({categories})[1 + i % {len(SEED_CATEGORIES)}],
+                       500 * (1 + abs(hashtextextended((i * 6)::text, 0) % 400)),
+                       timezone('utc', now()) + interval '30 days',
+                       CASE WHEN i % 7 = 0 THEN 'CLOSED'::rfpstatus ELSE 'PUBLISHED'::rfpstatus END,
+                       'COMPLETED'::requirementsstatus,
+                       (CAST(:buyer_ids AS uuid[]))[1 + abs(hashtextextended((i * 7)::text, 0) % :buyers)], i % 10 = 0,
+                       timezone('utc', now()) - i * interval '1 minute', timezone('utc', now())
+                FROM generate_series(1, :count) AS i
+            """),
+            {"buyer_ids": buyer_ids, "buyers": len(buyer_ids), "count": count},
+        )
+        await db.execute(text("ANALYZE rfps"))
+        await db.commit()
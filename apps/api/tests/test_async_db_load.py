@@ -0,0 +1,119 @@
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from helpers import create_buyers, seed_rfps
+
+pytestmark = pytest.mark.postgres
+
+CLIENTS = 200
+REQUESTS_PER_CLIENT = 2
+# One request in SLOW_EVERY also runs a slow report query
+SLOW_EVERY = 20
+SLOW_QUERY = "SELECT pg_sleep(0.5)"
+
+def _percentile(samples, fraction):
+    return samples[int(fraction * len(samples)) - 1]
+
+def _load_app():
+    """The same RFP lookup served the old way, with a blocking session, and the new way"""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.core.config import settings
+    from app.core.database import engine, get_db
+    from app.models.rfp import RFP
+
+    app = FastAPI()
+    # The server's event loop owns the pooled asyncpg connections, so it closes them
+    app.add_event_handler("shutdown", engine.dispose)
+    sync_engine = create_engine(
+        settings.DATABASE_URL, pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW
+    )
+    SessionLocal = sessionmaker(bind=sync_engine)
+
+    @app.get("/blocking/{n}")
+    async def blocking(n: int):
+        db = SessionLocal()
+        try:
+            if n % SLOW_EVERY == 0:
+                db.execute(text(SLOW_QUERY))
+            rfp = db.query(RFP).order_by(RFP.created_at.desc()).offset(n).limit(1).first()
+            return {"id": str(rfp.id)}
+        finally:
+            db.close()
+
+    @app.get("/async/{n}")
+    async def non_blocking(n: int, db: AsyncSession = Depends(get_db)):
+        if n % SLOW_EVERY == 0:
+            await db.execute(text(SLOW_QUERY))
+        rfp = await db.scalar(select(RFP).order_by(RFP.created_at.desc()).offset(n).limit(1))
+        return {"id": str(rfp.id)}
+
+    return app, sync_engine
+
+@contextmanager
+def _serve(app):
+    """Serve ``app`` with uvicorn in its own thread, so a blocked server loop can't also pause the clients"""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", timeout_keep_alive=60))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+async def _latencies(api, path):
+    """Per-request latencies in ms of CLIENTS clients each sending REQUESTS_PER_CLIENT requests in turn"""
+    async def run_client(client_number):
+        samples = []
+        for i in range(REQUESTS_PER_CLIENT):
+            started = time.perf_counter()
+            response = await api.get(f"{path}/{client_number * REQUESTS_PER_CLIENT + i}")
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+        return samples
+
+    results = await asyncio.gather(*[run_client(n) for n in range(CLIENTS)])
+    return sorted(sample for samples in results for sample in samples)
+
+async def test_slow_queries_no_longer_stall_the_worker(client):
+    """200 concurrent clients: with the async session a slow query only delays its own request"""
+    import httpx
+
+    from app.core.database import engine
+
+    await seed_rfps(CLIENTS * REQUESTS_PER_CLIENT, await create_buyers(10))
+    # Hand the pool over to the server's loop
+    await engine.dispose()
+    app, sync_engine = _load_app()
+    report = {}
+    try:
+        with _serve(app) as base_url:
+            limits = httpx.Limits(max_connections=CLIENTS, max_keepalive_connections=CLIENTS)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as api:
+                # Open the async pool's connections before measuring; the
+                # blocking handlers only ever use one connection at a time
+                await _latencies(api, "/async")
+                for path in ("/blocking", "/async"):
+                    samples = await _latencies(api, path)
+                    report[path] = (_percentile(samples, 0.5), _percentile(samples, 0.99))
+    finally:
+        sync_engine.dispose()
+
+    summary = " ".join(f"{path}: p50={p50:.1f}ms p99={p99:.1f}ms" for path, (p50, p99) in report.items())
+    # Blocking, every request queues behind all the slow queries on the one event loop
+    assert report["/async"][1] * 2 < report["/blocking"][1], summary
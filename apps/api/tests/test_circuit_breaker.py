@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import llm_client
+from app.services.llm_client import CircuitBreaker, LLMUnavailableError
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now[0])
+    return now
+
+def _fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    _fail(breaker, 2)
+    assert breaker.state == "closed"
+
+    _fail(breaker, 1)
+    assert breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    _fail(breaker, 2)
+    breaker.before_call()
+    breaker.record_success()
+    _fail(breaker, 2)
+    assert breaker.state == "closed"
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    assert breaker.state == "half_open"
+
+    breaker.before_call()
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock[0] += 29
+    assert breaker.state == "open"
+    clock[0] += 1
+    assert breaker.state == "half_open"
+
+def test_trial_without_verdict_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    breaker.before_call()
+    breaker.end_call()
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
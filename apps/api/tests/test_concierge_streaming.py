@@ -0,0 +1,98 @@
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import pytest
+
+from app.services import ai_concierge_service
+from app.services.ai_concierge_service import AIConciergeService
+from app.services.conversation_store import MemoryConversationStore
+from app.services.fake_openai import REPLY, create_app
+from app.services.llm_client import CircuitBreaker, LLMClient
+
+FIRST_TOKEN_SECONDS = 0.2
+TOKEN_SECONDS = 0.005
+STREAMS = 50
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    """The fake OpenAI API served by uvicorn on a free local port; real sockets, so tokens really stream"""
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(create_app(FIRST_TOKEN_SECONDS, TOKEN_SECONDS), log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+    server.should_exit = True
+    thread.join()
+
+@pytest.fixture
+async def concierge(fake_openai, monkeypatch):
+    client = LLMClient(
+        base_url=fake_openai,
+        api_key="",
+        timeout_seconds=10,
+        connect_timeout_seconds=5,
+        max_connections=STREAMS,
+        max_concurrency=STREAMS,
+        max_retries=0,
+        breaker=CircuitBreaker(failure_threshold=5, reset_seconds=30),
+    )
+    monkeypatch.setattr(ai_concierge_service, "llm_client", client)
+    concierge = AIConciergeService(MemoryConversationStore(max_users=100, max_bytes=1 << 20, max_messages=20, ttl_seconds=60))
+    # Measure a warm worker: tokenizer loaded, a pooled connection open
+    await _stream(concierge, "warmup")
+    yield concierge
+    await client.close()
+
+async def _stream(concierge, user_id: str):
+    """Events of one streamed reply, with seconds to the first token and to the end"""
+    started = time.perf_counter()
+    first_token = None
+    events = []
+    async for event in concierge.stream_message(user_id, "How do I write a good RFP?"):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        events.append(event)
+    return events, first_token, time.perf_counter() - started
+
+async def test_first_token_arrives_while_the_reply_streams(concierge):
+    events, first_token, total = await _stream(concierge, "buyer")
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+
+    assert events[-1]["type"] == "done"
+    assert "".join(tokens) == events[-1]["content"] == REPLY
+    # Time to first token is the upstream's, not the whole generation's
+    assert first_token < FIRST_TOKEN_SECONDS + 0.15
+    assert total - first_token >= 0.9 * TOKEN_SECONDS * (len(tokens) - 1)
+    assert [message["role"] for message in await concierge.history_store.get("buyer")] == ["user", "assistant"]
+
+async def test_concurrent_streams_keep_first_token_latency(concierge):
+    """50 conversations at once: p95 time to first token stays near the upstream's"""
+    results = await asyncio.gather(*[_stream(concierge, f"buyer{i}") for i in range(STREAMS)])
+    first_tokens = sorted(first_token for _, first_token, _ in results)
+    p95 = first_tokens[int(0.95 * len(first_tokens)) - 1]
+
+    assert all(events[-1]["type"] == "done" for events, _, _ in results)
+    assert p95 < FIRST_TOKEN_SECONDS + 0.25, f"p50={statistics.median(first_tokens):.3f}s p95={p95:.3f}s"
+
+async def test_failed_stream_is_logged_and_reported(concierge, monkeypatch, caplog):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    # Nothing listens on the port, so the connection is refused
+    unreachable = f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+    monkeypatch.setattr(ai_concierge_service.llm_client, "base_url", unreachable)
+    await ai_concierge_service.llm_client.close()
+
+    events, _, _ = await _stream(concierge, "buyer")
+    sock.close()
+
+    assert [event["type"] for event in events] == ["error"]
+    assert "Concierge stream failed" in caplog.text
+    assert await concierge.history_store.get("buyer") == []
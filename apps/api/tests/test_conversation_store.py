@@ -0,0 +1,99 @@
+import gc
+import os
+import resource
+
+import pytest
+
+from app.services import conversation_store
+from app.services.conversation_store import MemoryConversationStore
+
+SOAK_USERS = 1_000_000
+
+def _exchange(n: int):
+    return [{"role": "user", "content": f"Question {n}"}, {"role": "assistant", "content": f"Answer {n}"}]
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(conversation_store.time, "monotonic", lambda: now[0])
+    return now
+
+def _store(**overrides):
+    options = {"max_users": 100, "max_bytes": 1 << 20, "max_messages": 20, "ttl_seconds": 60, **overrides}
+    return MemoryConversationStore(**options)
+
+async def test_least_recently_active_user_is_evicted_first():
+    store = _store(max_users=3)
+    for user_id in "abc":
+        await store.append(user_id, _exchange(1))
+    # Reading a history counts as activity
+    await store.get("a")
+    await store.append("d", _exchange(1))
+
+    assert await store.get("b") == []
+    assert [len(await store.get(user_id)) for user_id in "acd"] == [2, 2, 2]
+    assert store.stats()["users"] == 3
+    assert store.evictions == 1
+
+async def test_total_size_is_bounded():
+    exchange_bytes = sum(conversation_store._message_size(message) for message in _exchange(1))
+    store = _store(max_bytes=int(2.5 * exchange_bytes))
+    for user_id in "abc":
+        await store.append(user_id, _exchange(1))
+
+    assert await store.get("a") == []
+    assert store.stats()["bytes"] == 2 * exchange_bytes
+    assert store.evictions == 1
+
+    # A history growing past the budget pushes out everyone else, then itself
+    await store.append("c", _exchange(2) + _exchange(3))
+    assert await store.get("b") == []
+    assert await store.get("c") == []
+    assert store.stats()["bytes"] == 0
+
+async def test_histories_keep_their_latest_messages():
+    store = _store(max_messages=3)
+    await store.append("a", _exchange(1))
+    await store.append("a", _exchange(2))
+
+    assert await store.get("a") == _exchange(1)[1:] + _exchange(2)
+    assert store.stats()["bytes"] == sum(conversation_store._message_size(message) for message in await store.get("a"))
+
+async def test_idle_histories_expire(clock):
+    store = _store(ttl_seconds=60)
+    await store.append("a", _exchange(1))
+    clock[0] += 59
+    await store.append("a", _exchange(2))
+    clock[0] += 59
+    assert len(await store.get("a")) == 4
+
+    clock[0] += 61
+    assert await store.get("a") == []
+    assert store.stats()["bytes"] == 0
+    # An expired history is not carried over into a new one
+    await store.append("a", _exchange(3))
+    assert await store.get("a") == _exchange(3)
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc to read RSS")
+async def test_rss_stays_flat_over_a_million_users():
+    """Soak: 1M distinct users chatting once leave the process no bigger than the first 100k did"""
+    store = _store(max_users=10_000, max_bytes=8 << 20)
+    for n in range(SOAK_USERS // 10):
+        await store.append(f"user-{n}", _exchange(n))
+    gc.collect()
+    warm = _rss_bytes()
+
+    for n in range(SOAK_USERS // 10, SOAK_USERS):
+        await store.append(f"user-{n}", _exchange(n))
+    gc.collect()
+    grown = _rss_bytes() - warm
+
+    stats = store.stats()
+    assert stats["users"] <= 10_000
+    assert stats["bytes"] <= 8 << 20
+    assert stats["evictions"] == SOAK_USERS - stats["users"]
+    assert grown < 4 << 20, f"RSS grew {grown / (1 << 20):.1f} MiB"
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.services.embeddings import IVFIndex, VectorStore
+
+def _unit_vectors(count: int, dimensions: int = 16) -> np.ndarray:
+    vectors = np.random.default_rng(0).normal(size=(count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _trained(tmp_path, count: int):
+    store = VectorStore(str(tmp_path), dimensions=16, initial_capacity=8)
+    vectors = _unit_vectors(count)
+    for i, vector in enumerate(vectors):
+        store.upsert(str(i), vector)
+    ivf = IVFIndex(store, nprobe=4)
+    ivf.train()
+    return store, ivf, vectors
+
+def test_store_leaves_no_file_behind(tmp_path):
+    store = VectorStore(str(tmp_path), dimensions=16, initial_capacity=8)
+    for i, vector in enumerate(_unit_vectors(100)):
+        store.upsert(str(i), vector)
+
+    # Growing the mapping keeps earlier rows and never names a file
+    assert store.capacity == 128
+    assert list(tmp_path.iterdir()) == []
+    assert np.allclose(store.data[3], _unit_vectors(100)[3])
+
+def test_removed_rows_leave_their_lists(tmp_path):
+    store, ivf, vectors = _trained(tmp_path, 400)
+    removed = set(range(0, 400, 3))
+    for i in removed:
+        ivf.remove(store.delete(str(i)))
+
+    members = [row for rows in ivf.lists for row in rows]
+    assert sorted(members) == sorted(set(range(400)) - removed)
+    for c, rows in enumerate(ivf.lists):
+        for position, row in enumerate(rows):
+            assert ivf.row_list[row] == (c, position)
+
+    hits = ivf.search(vectors[0], 400)
+    assert all(row not in removed for row, _ in hits)
+
+def test_readded_row_moves_to_its_new_list(tmp_path):
+    store, ivf, vectors = _trained(tmp_path, 400)
+    row, _ = store.upsert("1", vectors[2])
+    ivf.add(row, vectors[2])
+
+    c, position = ivf.row_list[row]
+    assert ivf.lists[c][position] == row
+    assert sum(rows.count(row) for rows in ivf.lists) == 1
+    assert ivf.search(vectors[2], 2)[0][1] > 0.999
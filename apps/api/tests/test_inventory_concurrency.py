@@ -0,0 +1,66 @@
+import asyncio
+import random
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+
+from helpers import auth_headers, create_buyers, register
+
+pytestmark = pytest.mark.postgres
+
+BUYERS = 1_000
+STOCK = 500
+
+async def _stock(product_id):
+    """Units left to sell and units held by reservations"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.inventory import ReservationStatus, StockReservation, StockShard
+    from app.models.product import Product
+
+    async with AsyncSessionLocal() as db:
+        counter = await db.scalar(select(Product.stock_quantity).where(Product.id == product_id))
+        shards = (await db.execute(select(StockShard.quantity).where(StockShard.sku_id == product_id))).scalars().all()
+        held = await db.scalar(
+            select(func.coalesce(func.sum(StockReservation.quantity), 0))
+            .where(StockReservation.product_id == product_id, StockReservation.status == ReservationStatus.HELD)
+        )
+    # Once striped, the product's counter is only a snapshot of its shards
+    assert all(quantity >= 0 for quantity in shards)
+    return sum(shards) if shards else counter, held
+
+@pytest.mark.parametrize("shards", [0, 16])
+async def test_parallel_buyers_never_oversell(client, shards):
+    """1k buyers reserving 1-3 units of 500 at once: every unit is held at most once"""
+    seller = await register(client, "seller@example.com", "seller")
+    response = await client.post("/api/v1/products/", headers=seller, json={
+        "title": "Laptop",
+        "description": "Refurbished laptop",
+        "category": "hardware",
+        "base_price": 5,
+        "status": "active",
+        "stock_quantity": STOCK,
+        "max_order_quantity": 5,
+    })
+    assert response.status_code == 200, response.text
+    product_id = response.json()["id"]
+    if shards:
+        response = await client.post(f"/api/v1/products/{product_id}/stripe", headers=seller, json={"shards": shards})
+        assert response.status_code == 200, response.text
+
+    rng = random.Random(shards)
+    wanted = [(user_id, rng.randint(1, 3)) for user_id in await create_buyers(BUYERS)]
+    responses = await asyncio.gather(*[
+        client.post(f"/api/v1/products/{product_id}/reservations", headers=auth_headers(user_id), json={"quantity": quantity})
+        for user_id, quantity in wanted
+    ])
+    statuses = Counter(response.status_code for response in responses)
+    reserved = sum(quantity for (_, quantity), response in zip(wanted, responses) if response.status_code == 200)
+
+    assert statuses[200] + statuses[409] == BUYERS, statuses
+    left, held = await _stock(product_id)
+    assert held == reserved
+    assert left >= 0
+    assert left + held == STOCK
+    # Demand is about four times the stock, so only scraps smaller than an ask remain
+    assert STOCK - reserved < 3
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_cache import LLMCache
+
+def _cache():
+    return LLMCache(max_entries=100, default_ttl_seconds=60, use_redis=False)
+
+async def test_concurrent_misses_share_one_call():
+    cache = _cache()
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Answer", 12
+
+    results = await asyncio.gather(*[cache.get_or_create("concierge", "key", 60, create) for _ in range(5)])
+    assert results == ["Answer"] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_create("concierge", "key", 60, create) == "Answer"
+
+    stats = cache.stats()["concierge"]
+    assert (stats["misses"], stats["coalesced"], stats["memory_hits"]) == (1, 4, 1)
+    assert stats["tokens_saved"] == 5 * 12
+
+async def test_callers_sharing_a_failed_call_are_counted():
+    cache = _cache()
+
+    async def create():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        *[cache.get_or_create("concierge", "key", 60, create) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    stats = cache.stats()["concierge"]
+    assert (stats["misses"], stats["coalesced"], stats["tokens_saved"]) == (1, 2, 0)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
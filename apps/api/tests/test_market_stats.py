@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.market_stats import NUM_BUCKETS, bucket_index, histogram_quantile, histogram_rank
+
+def _histogram(prices):
+    histogram = [0] * NUM_BUCKETS
+    for price in prices:
+        histogram[bucket_index(price)] += 1
+    return histogram
+
+def test_empty_histogram_has_no_estimates():
+    histogram = [0] * NUM_BUCKETS
+    assert histogram_quantile(histogram, 0, 0.5) is None
+    assert histogram_rank(histogram, 0, 100) is None
+
+def test_bucket_index_is_clamped():
+    assert bucket_index(0.5) == 0
+    assert bucket_index(1e12) == NUM_BUCKETS - 1
+
+def test_quantiles_track_the_recorded_prices():
+    prices = list(range(10, 1010, 10))
+    histogram = _histogram(prices)
+
+    # Buckets are 20 per decade, so estimates are within about 12%
+    assert histogram_quantile(histogram, len(prices), 0.5) == pytest.approx(500, rel=0.12)
+    assert histogram_quantile(histogram, len(prices), 0.1) == pytest.approx(100, rel=0.12)
+    assert histogram_quantile(histogram, len(prices), 0.9) == pytest.approx(900, rel=0.12)
+
+def test_quantiles_are_monotonic():
+    histogram = _histogram([3, 7, 15, 15, 40, 90, 250, 900, 5000])
+    estimates = [histogram_quantile(histogram, 9, q / 10) for q in range(11)]
+    assert estimates == sorted(estimates)
+
+def test_rank_is_the_fraction_priced_below():
+    prices = list(range(10, 1010, 10))
+    histogram = _histogram(prices)
+
+    assert histogram_rank(histogram, len(prices), 5) == 0.0
+    assert histogram_rank(histogram, len(prices), 2000) == 1.0
+    assert histogram_rank(histogram, len(prices), 500) == pytest.approx(0.5, abs=0.06)
+
+def test_rank_inverts_quantile():
+    prices = [12, 18, 25, 40, 55, 80, 120, 200, 310, 480]
+    histogram = _histogram(prices)
+    for q in (0.25, 0.5, 0.75):
+        price = histogram_quantile(histogram, len(prices), q)
+        assert histogram_rank(histogram, len(prices), price) == pytest.approx(q, abs=0.01)
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import create_buyers, register
+
+pytestmark = pytest.mark.postgres
+
+OFFERS = 40
+OFFER = {"description": "Twenty refurbished laptops", "delivery_time": "2 weeks"}
+
+async def _seed_orders(buyer_id, seller_id):
+    """Completed orders without an offer: one from a pool, one single- and one mixed-category product order"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.inventory import ReservationStatus, StockReservation
+    from app.models.order import Order, OrderStatus
+    from app.models.pool import Pool
+    from app.models.product import Product
+
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        pool = Pool(
+            title="Bulk paper", description="Office paper", category="office", target_price=40,
+            current_price=40, start_date=now, end_date=now, creator_id=seller_id,
+        )
+        products = {
+            category: Product(
+                title=category, description=category, category=category, base_price=10, seller_id=seller_id
+            )
+            for category in ("office", "garden")
+        }
+        db.add_all([pool, *products.values()])
+        await db.flush()
+
+        def order(amount, **values):
+            return Order(
+                id=uuid.uuid4(), buyer_id=buyer_id, seller_id=seller_id, amount=amount,
+                status=OrderStatus.COMPLETED, completion_date=now, **values
+            )
+
+        pooled, single, mixed = order(40, pool_id=pool.id), order(20), order(30)
+        db.add_all([pooled, single, mixed])
+        await db.flush()
+        for placed, categories in ((single, ["office"]), (mixed, ["office", "garden"])):
+            db.add_all([
+                StockReservation(
+                    product_id=products[category].id, user_id=buyer_id, order_id=placed.id, quantity=1,
+                    status=ReservationStatus.COMMITTED, expires_at=now + timedelta(minutes=15),
+                )
+                for category in categories
+            ])
+        await db.commit()
+
+async def test_rebuild_counts_pool_and_product_orders(client):
+    """Orders without an offer count under their pool's or products' category"""
+    from app.core.database import AsyncSessionLocal
+    from app.services.market_stats import market_stats
+
+    buyer_id, seller_id = await create_buyers(2)
+    await _seed_orders(buyer_id, seller_id)
+
+    async with AsyncSessionLocal() as db:
+        await market_stats.rebuild(db, window_days=30)
+        office = await market_stats.get(db, "office")
+
+    # The mixed-category order has no single category to count under
+    assert office["count"] == 2
+    assert office["mean"] == 30.0
+    async with AsyncSessionLocal() as db:
+        assert await market_stats.get(db, "garden") is None
+
+async def test_rebuild_never_loses_a_concurrent_accept(client):
+    """Accepts racing a rebuild are all counted, and none of them fails"""
+    from app.core.database import AsyncSessionLocal
+    from app.services.market_stats import market_stats
+
+    buyer = await register(client, "buyer@example.com")
+    seller = await register(client, "seller@example.com", "seller")
+    offer_ids = []
+    for i in range(OFFERS):
+        response = await client.post("/api/v1/rfps/", headers=buyer, json={
+            "title": f"Laptops {i}",
+            "description": "Need twenty laptops",
+            "category": "hardware",
+            "budget_min": 100,
+            "budget_max": 300,
+            "deadline": "2099-01-01T00:00:00",
+        })
+        rfp_id = response.json()["id"]
+        await client.post(f"/api/v1/rfps/{rfp_id}/publish", headers=buyer)
+        response = await client.post(f"/api/v1/rfps/{rfp_id}/offers", headers=seller, json={"price": 100 + i, **OFFER})
+        offer_ids.append(response.json()["id"])
+
+    async def rebuild():
+        async with AsyncSessionLocal() as db:
+            await market_stats.rebuild(db, window_days=30)
+
+    # A rebuild starts after every few accepts, so some land mid-rebuild
+    calls = []
+    for i, offer_id in enumerate(offer_ids):
+        calls.append(client.post(f"/api/v1/rfps/offers/{offer_id}/accept", headers=buyer))
+        if i % 4 == 3:
+            calls.append(rebuild())
+    responses = await asyncio.gather(*calls)
+
+    assert [response.status_code for response in responses if response is not None] == [200] * OFFERS
+    market_stats._cache.clear()
+    async with AsyncSessionLocal() as db:
+        stats = await market_stats.get(db, "hardware")
+    assert stats["count"] == OFFERS
+    assert stats["mean"] == 100 + (OFFERS - 1) / 2
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from helpers import register
+
+pytestmark = pytest.mark.postgres
+
+OFFER = {"description": "Twenty refurbished laptops", "delivery_time": "2 weeks"}
+
+async def test_parallel_accepts_award_exactly_one_offer(client):
+    """100 accepts racing each other and the sellers' edits: one offer wins, one order at its final price"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.offer import Offer
+    from app.models.order import Order
+    from app.models.rfp import RFP, RFPStatus
+
+    buyer = await register(client, "buyer@example.com")
+    sellers = [await register(client, f"seller{i}@example.com", "seller") for i in range(20)]
+    response = await client.post("/api/v1/rfps/", headers=buyer, json={
+        "title": "Laptops",
+        "description": "Need twenty laptops",
+        "category": "hardware",
+        "budget_min": 100,
+        "budget_max": 300,
+        "deadline": "2099-01-01T00:00:00",
+    })
+    rfp_id = response.json()["id"]
+    assert (await client.post(f"/api/v1/rfps/{rfp_id}/publish", headers=buyer)).status_code == 200
+
+    offer_ids = []
+    for i, seller in enumerate(sellers):
+        response = await client.post(f"/api/v1/rfps/{rfp_id}/offers", headers=seller, json={"price": 100 + i, **OFFER})
+        assert response.status_code == 200, response.text
+        offer_ids.append(response.json()["id"])
+
+    accepts = [client.post(f"/api/v1/rfps/offers/{offer_ids[i % 20]}/accept", headers=buyer) for i in range(100)]
+    edits = [
+        client.put(f"/api/v1/rfps/offers/{offer_id}", headers=seller, json={"price": 999, **OFFER})
+        for offer_id, seller in zip(offer_ids, sellers)
+    ]
+    responses = await asyncio.gather(*accepts, *edits)
+    accepted = [response for response in responses[:100] if response.status_code == 200]
+
+    assert len(accepted) == 1
+    assert {response.status_code for response in responses[:100]} <= {200, 400, 409}
+    assert {response.status_code for response in responses[100:]} <= {200, 400, 409}
+
+    async with AsyncSessionLocal() as db:
+        rfp = await db.get(RFP, rfp_id)
+        result = await db.execute(select(Offer.status, func.count()).group_by(Offer.status))
+        statuses = dict(result.all())
+        orders = (await db.execute(select(Order))).scalars().all()
+        winner = await db.get(Offer, rfp.awarded_offer_id)
+
+    assert rfp.status == RFPStatus.AWARDED
+    assert statuses == {"accepted": 1, "rejected": 19}
+    assert len(orders) == 1
+    # An edit either landed before the accept or was refused after it
+    assert orders[0].offer_id == winner.id
+    assert float(orders[0].amount) == float(winner.price)
@@ -0,0 +1,84 @@
+import pytest
+
+from helpers import register
+
+pytestmark = pytest.mark.postgres
+
+# Award RFP, accept offer, reject the rest, insert the order; market stats upsert, lock and
+# update; reputation event, metrics row and score update
+ACCEPT_QUERIES = 10
+# Access check plus the category's market stats
+SUGGESTIONS_QUERIES = 2
+# Writes recheck a cached principal's authorization fields first
+PRINCIPAL_RECHECK = 1
+
+OFFER = {"description": "Twenty refurbished laptops", "delivery_time": "2 weeks"}
+
+async def _count(request):
+    """Run an API request; returns its response and the SQL statements it ran"""
+    from app.core.database import start_query_log
+
+    queries = start_query_log()
+    response = await request
+    return response, list(queries)
+
+@pytest.fixture
+async def offers(client):
+    """A buyer's published RFP with two sellers' offers, every caller's principal already cached"""
+    buyer = await register(client, "buyer@example.com")
+    sellers = [await register(client, f"seller{i}@example.com", "seller") for i in range(2)]
+    response = await client.post("/api/v1/rfps/", headers=buyer, json={
+        "title": "Laptops",
+        "description": "Need twenty laptops",
+        "category": "hardware",
+        "budget_min": 100,
+        "budget_max": 300,
+        "deadline": "2099-01-01T00:00:00",
+    })
+    rfp_id = response.json()["id"]
+    await client.post(f"/api/v1/rfps/{rfp_id}/publish", headers=buyer)
+    offer_ids = []
+    for i, seller in enumerate(sellers):
+        response = await client.post(f"/api/v1/rfps/{rfp_id}/offers", headers=seller, json={"price": 150 + i, **OFFER})
+        offer_ids.append(response.json()["id"])
+    # Warm the principal cache so only the endpoint's own statements are counted
+    for headers in (buyer, *sellers):
+        assert (await client.get("/api/v1/users/me", headers=headers)).status_code == 200
+    return buyer, sellers, offer_ids
+
+async def test_get_offer_is_one_query(client, offers):
+    buyer, sellers, offer_ids = offers
+    response, queries = await _count(client.get(f"/api/v1/rfps/offers/{offer_ids[0]}", headers=sellers[0]))
+    assert response.status_code == 200
+    assert len(queries) == 1, queries
+
+    # Refusals are decided by the same query
+    response, queries = await _count(client.get(f"/api/v1/rfps/offers/{offer_ids[0]}", headers=sellers[1]))
+    assert response.status_code == 403
+    assert len(queries) == 1, queries
+
+async def test_update_offer_is_one_query(client, offers):
+    buyer, sellers, offer_ids = offers
+    response, queries = await _count(
+        client.put(f"/api/v1/rfps/offers/{offer_ids[0]}", headers=sellers[0], json={"price": 140, **OFFER})
+    )
+    assert response.status_code == 200
+    assert len(queries) == PRINCIPAL_RECHECK + 1, queries
+
+async def test_delete_offer_is_one_query(client, offers):
+    buyer, sellers, offer_ids = offers
+    response, queries = await _count(client.delete(f"/api/v1/rfps/offers/{offer_ids[1]}", headers=sellers[1]))
+    assert response.status_code == 200
+    assert len(queries) == PRINCIPAL_RECHECK + 1, queries
+
+async def test_accept_offer_query_count(client, offers):
+    buyer, sellers, offer_ids = offers
+    response, queries = await _count(client.post(f"/api/v1/rfps/offers/{offer_ids[0]}/accept", headers=buyer))
+    assert response.status_code == 200
+    assert len(queries) == PRINCIPAL_RECHECK + ACCEPT_QUERIES, queries
+
+async def test_get_offer_suggestions_query_count(client, offers):
+    buyer, sellers, offer_ids = offers
+    response, queries = await _count(client.get(f"/api/v1/rfps/offers/{offer_ids[0]}/suggestions", headers=buyer))
+    assert response.status_code == 200
+    assert len(queries) == SUGGESTIONS_QUERIES, queries
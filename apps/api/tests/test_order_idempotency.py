@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from helpers import register
+
+pytestmark = pytest.mark.postgres
+
+REQUESTS = 20
+
+async def test_parallel_retries_create_one_order(client):
+    """20 concurrent creates under one Idempotency-Key: one order, 19 replays of it"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.inventory import ReservationStatus, StockReservation
+    from app.models.order import Order
+
+    seller = await register(client, "seller@example.com", "seller")
+    buyer = await register(client, "buyer@example.com")
+    response = await client.post("/api/v1/products/", headers=seller, json={
+        "title": "Laptop",
+        "description": "Refurbished laptop",
+        "category": "hardware",
+        "base_price": 250,
+        "status": "active",
+        "stock_quantity": 10,
+        "max_order_quantity": 5,
+    })
+    product_id = response.json()["id"]
+    response = await client.post(f"/api/v1/products/{product_id}/reservations", headers=buyer, json={"quantity": 2})
+    assert response.status_code == 200, response.text
+    reservation_id = response.json()["id"]
+
+    body = {"reservation_ids": [reservation_id], "notes": "Leave at reception"}
+    keyed = {**buyer, "Idempotency-Key": "checkout-1"}
+    responses = await asyncio.gather(*[
+        client.post("/api/v1/orders/", headers=keyed, json=body) for _ in range(REQUESTS)
+    ])
+
+    assert [response.status_code for response in responses] == [200] * REQUESTS
+    assert len({response.json()["id"] for response in responses}) == 1
+    replayed = [response.headers.get("Idempotent-Replayed") == "true" for response in responses]
+    assert replayed.count(False) == 1
+    assert float(responses[0].json()["amount"]) == 500
+
+    async with AsyncSessionLocal() as db:
+        orders = await db.scalar(select(func.count()).select_from(Order))
+        reservation = await db.get(StockReservation, reservation_id)
+    assert orders == 1
+    assert reservation.status == ReservationStatus.COMMITTED
+
+    # The key now belongs to that order: a different body under it is refused
+    response = await client.post("/api/v1/orders/", headers=keyed, json={**body, "notes": "Ring the bell"})
+    assert response.status_code == 422
+    # A sequential retry still replays
+    response = await client.post("/api/v1/orders/", headers=keyed, json=body)
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+    # Without the key the reservations are simply gone
+    response = await client.post("/api/v1/orders/", headers=buyer, json=body)
+    assert response.status_code == 409
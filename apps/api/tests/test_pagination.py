@@ -0,0 +1,36 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, decode_timestamp_cursor, encode_cursor
+
+def test_timestamp_cursor_round_trips():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    row_id = uuid.uuid4()
+    assert decode_timestamp_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+def test_mixed_values_round_trip():
+    values = [4.5, 12, "laptops", None]
+    assert decode_cursor(encode_cursor(*values), 4) == values
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("?&/+=" * 10, datetime(2026, 1, 1))
+    assert cursor.replace("-", "").replace("_", "").isalnum()
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "!!!!", encode_cursor(1, 2, 3), encode_cursor({"a": 1})])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+def test_timestamp_cursor_rejects_bad_values():
+    with pytest.raises(HTTPException):
+        decode_timestamp_cursor(encode_cursor("yesterday", str(uuid.uuid4())))
+    with pytest.raises(HTTPException):
+        decode_timestamp_cursor(encode_cursor(datetime(2026, 1, 1), "not-a-uuid"))
+
+def test_unsupported_values_cannot_be_encoded():
+    with pytest.raises(TypeError):
+        encode_cursor(object())
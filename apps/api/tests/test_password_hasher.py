@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+import main
+from app.core import security
+from app.core.database import get_db
+from app.core.security import PasswordHasher
+from app.models.user import UserRole
+
+PASSWORD = "password123"
+LOGINS = 40
+
+class FakeSession:
+    """Just enough of AsyncSession for the login endpoint: one user, and a count of commits"""
+
+    def __init__(self, user):
+        self.user = user
+        self.commits = 0
+
+    async def execute(self, statement):
+        return SimpleNamespace(scalar_one_or_none=lambda: self.user)
+
+    async def commit(self):
+        self.commits += 1
+
+@pytest.fixture
+def login():
+    """Log the one known user in through the API; returns the response and the session it used"""
+    user = SimpleNamespace(
+        id=uuid.uuid4(), email="buyer@example.com", role=UserRole.BUYER, is_active=True,
+        hashed_password=security.pwd_context.hash(PASSWORD),
+    )
+    session = FakeSession(user)
+
+    async def get_fake_db():
+        yield session
+
+    main.app.dependency_overrides[get_db] = get_fake_db
+    transport = httpx.ASGITransport(app=main.app)
+
+    async def post():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+            return await api.post("/api/v1/auth/login", data={"username": user.email, "password": PASSWORD})
+
+    yield post, session
+    main.app.dependency_overrides.pop(get_db)
+
+def _rounds(hashed_password: str) -> int:
+    return int(hashed_password.split("$")[2])
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Make every hash wait until the returned event is set"""
+    release = threading.Event()
+    hash_password = security.pwd_context.hash
+    monkeypatch.setattr(security.pwd_context, "hash", lambda password: release.wait(5) and hash_password(password))
+    monkeypatch.setattr(security.pwd_context, "verify_and_update", lambda *args: release.wait(5) and (True, None))
+    yield release
+    release.set()
+
+async def test_saturated_pool_rejects_with_429(gate):
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    running = [asyncio.create_task(hasher.hash(PASSWORD)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as rejected:
+        await hasher.hash(PASSWORD)
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers == {"Retry-After": "1"}
+    assert hasher.stats() == {"pending": 2, "max_pending": 2, "completed": 0, "rejected": 1}
+
+    # Once the backlog drains there is room again
+    gate.set()
+    await asyncio.gather(*running)
+    assert (await hasher.hash(PASSWORD)).startswith("$2b$")
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+async def test_login_answers_429_while_hashing_is_saturated(login, gate, monkeypatch):
+    post, _ = login
+    hasher = PasswordHasher(max_workers=1, max_queue=0)
+    monkeypatch.setattr(security, "password_hasher", hasher)
+    first = asyncio.create_task(post())
+    await asyncio.sleep(0.05)
+
+    response = await post()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    gate.set()
+    assert (await first).status_code == 200
+    hasher.shutdown()
+
+async def test_login_rehashes_when_the_cost_changes(login, monkeypatch):
+    post, session = login
+    assert _rounds(session.user.hashed_password) == 4
+
+    # As after a deploy raising BCRYPT_ROUNDS
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    response = await post()
+    assert response.status_code == 200, response.text
+    assert _rounds(session.user.hashed_password) == 5
+    assert session.commits == 1
+
+    # The upgraded hash still verifies and is left alone from then on
+    response = await post()
+    assert response.status_code == 200
+    assert session.commits == 1
+
+async def test_logins_per_second_without_stalling_the_loop(login, monkeypatch):
+    """Microbenchmark: concurrent logins go as fast as bcrypt allows while other requests keep being served"""
+    post, session = login
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=10))
+    session.user.hashed_password = security.pwd_context.hash(PASSWORD)
+
+    # Inline, one bcrypt verify at a time, as the handlers used to run it
+    started = time.perf_counter()
+    for _ in range(5):
+        security.pwd_context.verify(PASSWORD, session.user.hashed_password)
+    inline_per_second = 5 / (time.perf_counter() - started)
+
+    lags = []
+
+    async def ticker(done):
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    done = asyncio.Event()
+    ticking = asyncio.create_task(ticker(done))
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[post() for _ in range(LOGINS)])
+    logins_per_second = LOGINS / (time.perf_counter() - started)
+    done.set()
+    await ticking
+
+    assert {response.status_code for response in responses} == {200}
+    stalled = sum(lags)
+    report = f"{logins_per_second:.1f} logins/s on the pool, {inline_per_second:.1f}/s inline, loop stalled {stalled * 1000:.0f}ms"
+    # bcrypt releases the GIL, so the pool keeps pace with inline hashing
+    # (and scales with cores). Inline, the loop would have been stalled for
+    # all LOGINS hashes; now only for the handlers' own work and, on a single
+    # core, the slices the hashing threads take from it.
+    assert logins_per_second > 0.7 * inline_per_second, report
+    assert stalled < 0.5 * LOGINS / inline_per_second, report
@@ -0,0 +1,96 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+
+from helpers import auth_headers, create_buyers, register
+
+pytestmark = pytest.mark.postgres
+
+JOINS = 10_000
+CAPACITY = 5_000
+
+async def test_parallel_joins_fill_the_pool_exactly(client):
+    """10k parallel joins of a 5k pool: exactly 5k members, counter and price in step"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.pool import Pool, PoolMember
+    from app.services.pool_pricing import pool_price
+
+    tiers = [
+        {"participants": 1000, "discount": 10},
+        {"participants": 10, "discount": 2},
+        {"participants": 4000, "discount": 25},
+    ]
+    organizer = await register(client, "organizer@example.com")
+    response = await client.post("/api/v1/pools/", headers=organizer, json={
+        "title": "Laptops",
+        "description": "Group order of laptops",
+        "category": "hardware",
+        "target_price": 100,
+        "max_participants": CAPACITY,
+        "end_date": "2099-01-01T00:00:00",
+        "discount_tiers": tiers,
+    })
+    assert response.status_code == 200, response.text
+    pool_id = response.json()["id"]
+
+    buyers = await create_buyers(JOINS)
+    semaphore = asyncio.Semaphore(200)
+
+    async def join(user_id):
+        async with semaphore:
+            return await client.post(f"/api/v1/pools/{pool_id}/join", headers=auth_headers(user_id), json={"quantity": 1})
+
+    responses = await asyncio.gather(*[join(user_id) for user_id in buyers])
+    statuses = Counter(response.status_code for response in responses)
+
+    assert statuses[200] == CAPACITY
+    assert sum(statuses.values()) - statuses[200] == statuses[400] + statuses[409]
+
+    async with AsyncSessionLocal() as db:
+        pool = await db.get(Pool, pool_id)
+        members = await db.scalar(select(func.count()).select_from(PoolMember).where(PoolMember.pool_id == pool_id))
+
+    assert pool.participant_count == members == CAPACITY
+    assert float(pool.current_price) == pool_price(100, sorted(tiers, key=lambda tier: tier["participants"]), CAPACITY)
+
+    # Joining twice is refused and leaves the count alone
+    joined = next(user_id for user_id, response in zip(buyers, responses) if response.status_code == 200)
+    response = await client.post(f"/api/v1/pools/{pool_id}/join", headers=auth_headers(joined))
+    assert response.status_code in (400, 409)
+
+async def test_tier_crossings_reprice_every_member(client):
+    """Crossing a tier either way rewrites all members' commitments, not just the joiner's"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.pool import PoolMember
+
+    organizer = await register(client, "organizer@example.com")
+    response = await client.post("/api/v1/pools/", headers=organizer, json={
+        "title": "Laptops",
+        "description": "Group order of laptops",
+        "category": "hardware",
+        "target_price": 100,
+        "end_date": "2099-01-01T00:00:00",
+        "discount_tiers": [{"participants": 3, "discount": 10}, {"participants": 2, "discount": 5}],
+    })
+    pool_id = response.json()["id"]
+
+    async def commitments():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(PoolMember.quantity, PoolMember.committed_amount).where(PoolMember.pool_id == pool_id))
+            return sorted((quantity, amount) for quantity, amount in result)
+
+    buyers = await create_buyers(3)
+    for quantity, user_id in enumerate(buyers, start=1):
+        response = await client.post(f"/api/v1/pools/{pool_id}/join", headers=auth_headers(user_id), json={"quantity": quantity})
+        assert response.status_code == 200, response.text
+    assert response.json()["current_price"] == 90
+    assert await commitments() == [(1, 90), (2, 180), (3, 270)]
+
+    response = await client.post(f"/api/v1/pools/{pool_id}/leave", headers=auth_headers(buyers[0]))
+    assert response.json()["current_price"] == 95
+    assert await commitments() == [(2, 190), (3, 285)]
+
+    response = await client.post(f"/api/v1/pools/{pool_id}/confirm", headers=auth_headers(buyers[1]))
+    assert response.json()["committed_amount"] == 190
@@ -0,0 +1,44 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.pool import PoolCreate
+from app.services.pool_pricing import pool_price, tier_discount
+
+POOL = {"title": "Laptops", "description": "Group order", "category": "hardware", "target_price": 100, "end_date": "2099-01-01T00:00:00"}
+TIERS = [
+    tier.dict() for tier in PoolCreate(**POOL, discount_tiers=[
+        {"participants": 1000, "discount": 10},
+        {"participants": 10, "discount": 2},
+        {"participants": 4000, "discount": 25},
+    ]).discount_tiers
+]
+
+def test_schema_sorts_tiers_by_threshold():
+    assert [tier["participants"] for tier in TIERS] == [10, 1000, 4000]
+    assert PoolCreate(**POOL).discount_tiers == []
+
+def test_schema_rejects_repeated_thresholds():
+    with pytest.raises(ValidationError):
+        PoolCreate(**POOL, discount_tiers=[{"participants": 10, "discount": 2}, {"participants": 10, "discount": 5}])
+
+def test_no_discount_below_the_first_tier():
+    assert tier_discount(TIERS, 0) == 0.0
+    assert tier_discount(TIERS, 9) == 0.0
+
+def test_tier_applies_from_its_threshold():
+    assert tier_discount(TIERS, 10) == 2
+    assert tier_discount(TIERS, 999) == 2
+    assert tier_discount(TIERS, 1000) == 10
+    assert tier_discount(TIERS, 3999) == 10
+
+def test_highest_tier_holds_beyond_it():
+    assert tier_discount(TIERS, 4000) == 25
+    assert tier_discount(TIERS, 100000) == 25
+
+def test_no_tiers_means_list_price():
+    assert tier_discount([], 500) == 0.0
+    assert pool_price(99.99, [], 500) == 99.99
+
+def test_price_is_rounded_to_cents():
+    assert pool_price(100, TIERS, 4000) == 75.0
+    assert pool_price(19.99, TIERS, 1000) == 17.99
@@ -0,0 +1,82 @@
+import asyncio
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from helpers import create_buyers
+
+pytestmark = pytest.mark.postgres
+
+POOLS = 120
+WORKERS = 8
+TIERS = [{"participants": 3, "discount": 5}, {"participants": 6, "discount": 15}]
+
+async def test_parallel_settlement_settles_each_pool_once(client):
+    """8 schedulers racing over 120 due pools: each pool settled once, orders only for confirmed members"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order
+    from app.models.pool import Pool, PoolMember, PoolStatus
+    from app.services.pool_pricing import pool_price
+    from app.services.pool_settlement import PoolSettlement
+
+    rng = random.Random(0)
+    buyers = await create_buyers(10)
+    creator = buyers[0]
+    now = datetime.utcnow()
+
+    pools = []
+    members = []
+    async with AsyncSessionLocal() as db:
+        for i in range(POOLS + 10):
+            participants = rng.randint(0, 9)
+            due = i < POOLS
+            pool = Pool(
+                title=f"Pool {i}", description="Group order", category="hardware",
+                target_price=100, current_price=pool_price(100, TIERS, participants), discount_tiers=TIERS,
+                min_participants=5, participant_count=participants, creator_id=creator,
+                start_date=now - timedelta(days=7), end_date=now - timedelta(minutes=1) if due else now + timedelta(days=1),
+                status=PoolStatus.ACTIVE,
+            )
+            db.add(pool)
+            await db.flush()
+            for user_id in rng.sample(buyers, participants):
+                member = PoolMember(
+                    pool_id=pool.id, user_id=user_id, quantity=rng.randint(1, 3),
+                    committed_amount=0, is_confirmed=rng.random() < 0.8,
+                )
+                db.add(member)
+                members.append(member)
+            pools.append(pool)
+        await db.commit()
+        expected_orders = {
+            (member.pool_id, member.user_id): member.quantity
+            for member in members
+            if member.is_confirmed and member.pool_id in {pool.id for pool in pools[:POOLS] if pool.participant_count >= 5}
+        }
+        prices = {pool.id: pool.current_price for pool in pools}
+
+    settlement = PoolSettlement(batch_size=7, max_batches=100)
+    settled = await asyncio.gather(*[settlement.run(AsyncSessionLocal) for _ in range(WORKERS)])
+    # Once everything is settled another run finds nothing
+    assert await settlement.run(AsyncSessionLocal) == 0
+
+    async with AsyncSessionLocal() as db:
+        statuses = dict((await db.execute(select(Pool.id, Pool.status))).all())
+        orders = (await db.execute(select(Order))).scalars().all()
+
+    assert sum(settled) == POOLS
+    for pool in pools[:POOLS]:
+        assert statuses[pool.id] == (PoolStatus.CLOSED if pool.participant_count >= 5 else PoolStatus.CANCELLED)
+    assert all(statuses[pool.id] == PoolStatus.ACTIVE for pool in pools[POOLS:])
+    assert Counter(statuses.values())[PoolStatus.CANCELLED] == settlement.pools_cancelled
+    assert 0 < settlement.pools_cancelled < POOLS
+
+    placed = Counter((order.pool_id, order.buyer_id) for order in orders)
+    assert max(placed.values()) == 1
+    assert set(placed) == set(expected_orders)
+    for order in orders:
+        assert order.seller_id == creator
+        assert float(order.amount) == pytest.approx(prices[order.pool_id] * expected_orders[order.pool_id, order.buyer_id])
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import update
+
+from helpers import register
+
+pytestmark = pytest.mark.postgres
+
+async def test_writes_recheck_a_user_deactivated_by_another_worker(client):
+    """Without Redis, a deactivation made elsewhere still stops writes at once"""
+    from app.core.database import AsyncSessionLocal
+    from app.core.principal_cache import principal_cache
+    from app.models.user import User
+
+    buyer = await register(client, "buyer@example.com")
+    me = (await client.get("/api/v1/users/me", headers=buyer)).json()
+    rfp = {"title": "Laptops", "description": "Need laptops", "category": "hardware", "deadline": "2099-01-01T00:00:00"}
+    response = await client.post("/api/v1/rfps/", headers=buyer, json=rfp)
+    assert response.status_code == 200, response.text
+    stats = principal_cache.stats()
+
+    # As another worker's deactivation would: the database changes, this
+    # worker's cache is not told
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(User).where(User.id == me["id"]).values(is_active=False))
+        await db.commit()
+
+    # Reads may go on from the cache until its TTL runs out
+    assert (await client.get("/api/v1/users/me", headers=buyer)).status_code == 200
+    response = await client.post("/api/v1/rfps/", headers=buyer, json=rfp)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+    after = principal_cache.stats()
+    assert after["revalidations"] - stats["revalidations"] == 1
+    assert after["stale"] - stats["stale"] == 1
+    # The stale entry was replaced, so reads see the deactivation too
+    assert (await client.get("/api/v1/users/me", headers=buyer)).status_code == 400
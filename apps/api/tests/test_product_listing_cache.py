@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services.product_cache import product_listing_cache
+
+def _versions():
+    return dict(product_listing_cache._versions)
+
+def test_invalidation_waits_for_commit():
+    before = _versions()
+    with Session(create_engine("sqlite://")) as db:
+        db.execute(text("SELECT 1"))
+        product_listing_cache.invalidate_on_commit(db, ["hardware"])
+        assert _versions() == before
+        db.commit()
+
+    after = _versions()
+    assert after["category:hardware"] == before.get("category:hardware", 0) + 1
+    assert after["all"] == before.get("all", 0) + 1
+
+def test_rollback_drops_pending_invalidation():
+    before = _versions()
+    with Session(create_engine("sqlite://")) as db:
+        db.execute(text("SELECT 1"))
+        product_listing_cache.invalidate_on_commit(db, ["hardware"])
+        db.rollback()
+        db.execute(text("SELECT 1"))
+        db.commit()
+
+    assert _versions() == before
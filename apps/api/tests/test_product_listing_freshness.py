@@ -0,0 +1,50 @@
+import pytest
+
+from helpers import register
+
+pytestmark = pytest.mark.postgres
+
+async def _listed(client, headers):
+    response = await client.get("/api/v1/products/?category=hardware", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["items"][0]
+
+async def test_listings_follow_stock_and_ratings(client):
+    """Cached listing pages pick up reservations, releases and reviews as they commit"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order
+    from app.models.product import ProductReview
+
+    seller = await register(client, "seller@example.com", "seller")
+    buyer = await register(client, "buyer@example.com")
+    response = await client.post("/api/v1/products/", headers=seller, json={
+        "title": "Laptop",
+        "description": "Refurbished laptop",
+        "category": "hardware",
+        "base_price": 5,
+        "status": "active",
+        "stock_quantity": 10,
+    })
+    product = response.json()
+    assert (await _listed(client, buyer))["stock_quantity"] == 10
+
+    response = await client.post(f"/api/v1/products/{product['id']}/reservations", headers=buyer, json={"quantity": 3})
+    assert response.status_code == 200, response.text
+    assert (await _listed(client, buyer))["stock_quantity"] == 7
+
+    reservation_id = response.json()["id"]
+    response = await client.post(f"/api/v1/products/reservations/{reservation_id}/release", headers=buyer)
+    assert response.status_code == 200, response.text
+    assert (await _listed(client, buyer))["stock_quantity"] == 10
+
+    me = (await client.get("/api/v1/users/me", headers=buyer)).json()
+    async with AsyncSessionLocal() as db:
+        order = Order(buyer_id=me["id"], seller_id=product["seller_id"], amount=5)
+        db.add(order)
+        await db.flush()
+        db.add(ProductReview(product_id=product["id"], reviewer_id=me["id"], order_id=order.id, rating=4))
+        await db.commit()
+
+    listed = await _listed(client, buyer)
+    assert listed["rating_count"] == 1
+    assert listed["average_rating"] == 4.0
@@ -0,0 +1,142 @@
+import time
+
+import pytest
+from sqlalchemy import text, update
+
+from helpers import auth_headers, create_buyers
+
+pytestmark = pytest.mark.postgres
+
+PRODUCTS = 100
+REVIEWS = 100_000
+
+async def _create_products(seller_id, count: int):
+    from app.core.database import AsyncSessionLocal
+    from app.models.product import Product, ProductStatus
+
+    async with AsyncSessionLocal() as db:
+        products = [
+            Product(title=f"Laptop {n}", description="Refurbished laptop", category="hardware", base_price=5 + n,
+                    seller_id=seller_id, status=ProductStatus.ACTIVE)
+            for n in range(count)
+        ]
+        db.add_all(products)
+        await db.commit()
+    return [product.id for product in products]
+
+async def _aggregates(product_id):
+    from app.core.database import AsyncSessionLocal
+    from app.models.product import Product
+
+    async with AsyncSessionLocal() as db:
+        product = await db.get(Product, product_id)
+    return product.rating_sum, product.rating_count, product.rating_histogram, product.average_rating
+
+async def test_review_changes_keep_aggregates_current(client):
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order
+    from app.models.product import Product, ProductReview
+    from app.services.product_ratings import product_ratings
+
+    buyer_id, seller_id = await create_buyers(2)
+    first, second, unreviewed = await _create_products(seller_id, 3)
+    async with AsyncSessionLocal() as db:
+        order = Order(buyer_id=buyer_id, seller_id=seller_id, amount=5)
+        db.add(order)
+        await db.flush()
+        order_id = order.id
+        reviews = [ProductReview(product_id=first, reviewer_id=buyer_id, order_id=order_id, rating=rating) for rating in (4, 2)]
+        db.add_all(reviews)
+        await db.commit()
+        assert await _aggregates(first) == (6, 2, [0, 1, 0, 1, 0], 3.0)
+
+        # Edit, then move a review to another product
+        reviews[0].rating = 5
+        await db.commit()
+        assert await _aggregates(first) == (7, 2, [0, 1, 0, 0, 1], 3.5)
+        reviews[1].product_id = second
+        await db.commit()
+        assert await _aggregates(first) == (5, 1, [0, 0, 0, 0, 1], 5.0)
+        assert await _aggregates(second) == (2, 1, [0, 1, 0, 0, 0], 2.0)
+
+        await db.delete(reviews[1])
+        await db.commit()
+        assert await _aggregates(second) == (0, 0, [0, 0, 0, 0, 0], 0.0)
+
+        # A change that fails rolls back with its aggregates
+        db.add(ProductReview(product_id=first, reviewer_id=buyer_id, order_id=order_id, rating=1))
+        await db.flush()
+        await db.rollback()
+        assert await _aggregates(first) == (5, 1, [0, 0, 0, 0, 1], 5.0)
+
+        # Bulk statements bypass the listeners: a review inserted directly,
+        # and counts left on a product with no reviews
+        await db.execute(text(
+            "INSERT INTO product_reviews (id, product_id, reviewer_id, order_id, rating) "
+            "VALUES (gen_random_uuid(), :product, :buyer, :order, 3)"
+        ), {"product": second, "buyer": buyer_id, "order": order_id})
+        await db.execute(update(Product).where(Product.id == unreviewed).values(rating_sum=4, rating_count=1, rating_4=1))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        assert await product_ratings.backfill(db) == {"corrected_products": 1, "reset_products": 1}
+    assert await _aggregates(first) == (5, 1, [0, 0, 0, 0, 1], 5.0)
+    assert await _aggregates(second) == (3, 1, [0, 0, 1, 0, 0], 3.0)
+    assert await _aggregates(unreviewed) == (0, 0, [0, 0, 0, 0, 0], 0.0)
+
+    async with AsyncSessionLocal() as db:
+        assert await product_ratings.backfill(db) == {"corrected_products": 0, "reset_products": 0}
+
+async def test_hundred_rated_products_list_in_one_query(client):
+    """Benchmark: a 100-product page sorted by rating reads its ratings off the products, without touching reviews"""
+    from app.core.database import AsyncSessionLocal, start_query_log
+    from app.services.product_ratings import product_ratings
+
+    buyer_id, seller_id = await create_buyers(2)
+    product_ids = await _create_products(seller_id, PRODUCTS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(
+            "INSERT INTO orders (id, buyer_id, seller_id, amount) VALUES (gen_random_uuid(), :buyer, :seller, 5)"
+        ), {"buyer": buyer_id, "seller": seller_id})
+        await db.execute(text(
+            "INSERT INTO product_reviews (id, product_id, reviewer_id, order_id, rating) "
+            "SELECT gen_random_uuid(), (CAST(:products AS uuid[]))[1 + i % :count], :buyer, "
+            "       (SELECT id FROM orders LIMIT 1), 1 + abs(hashtextextended(i::text, 0) % 5) "
+            "FROM generate_series(1, :reviews) AS i"
+        ), {"products": product_ids, "count": PRODUCTS, "buyer": buyer_id, "reviews": REVIEWS})
+        await db.commit()
+    async with AsyncSessionLocal() as db:
+        assert (await product_ratings.backfill(db))["corrected_products"] == PRODUCTS
+        expected = {
+            str(row.product_id): (row.count, row.average)
+            for row in await db.execute(text(
+                "SELECT product_id, count(*) AS count, avg(rating) AS average FROM product_reviews GROUP BY product_id"
+            ))
+        }
+
+    headers = auth_headers(buyer_id)
+    params = {"limit": PRODUCTS, "sort": "rating"}
+    # Warm the principal cache, then bypass the listing cache
+    await client.get("/api/v1/users/me", headers=headers)
+    samples = []
+    for n in range(10):
+        params["min_price"] = n / 100
+        log = start_query_log()
+        started = time.perf_counter()
+        response = await client.get("/api/v1/products/", headers=headers, params=params)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+
+    items = response.json()["items"]
+    assert len(items) == PRODUCTS
+    assert {item["id"]: (item["rating_count"], pytest.approx(item["average_rating"])) for item in items} == {
+        product_id: (count, float(average)) for product_id, (count, average) in expected.items()
+    }
+    assert [item["average_rating"] for item in items] == sorted((item["average_rating"] for item in items), reverse=True)
+    # The page itself, then one query each for images and variants
+    products = [statement for statement in log if "FROM products" in statement]
+    assert len(products) == 1
+    assert len(log) == 3, log
+    assert not any("product_reviews" in statement for statement in log)
+    samples.sort()
+    assert samples[len(samples) // 2] < 100, f"p50={samples[len(samples) // 2]:.1f}ms"
@@ -0,0 +1,45 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.database import start_query_log
+
+def _session() -> Session:
+    return Session(create_engine("sqlite://"))
+
+def test_counts_statements_run_on_a_session():
+    with _session() as db:
+        queries = start_query_log()
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+        db.execute(text("SELECT 3"))
+
+    assert len(queries) == 3
+    assert queries[0] == "SELECT 1"
+
+def test_restarting_the_log_starts_from_zero():
+    with _session() as db:
+        first = start_query_log()
+        db.execute(text("SELECT 1"))
+        second = start_query_log()
+        db.execute(text("SELECT 2"))
+
+    assert first == ["SELECT 1"]
+    assert second == ["SELECT 2"]
+
+def test_logs_are_kept_per_task():
+    engine = create_engine("sqlite://")
+
+    async def run(statements: int) -> int:
+        queries = start_query_log()
+        with Session(engine) as db:
+            for _ in range(statements):
+                db.execute(text("SELECT 1"))
+                await asyncio.sleep(0)
+        return len(queries)
+
+    async def main():
+        return await asyncio.gather(run(1), run(4))
+
+    assert asyncio.run(main()) == [1, 4]
@@ -0,0 +1,151 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text, update
+
+from helpers import create_buyers
+
+pytestmark = pytest.mark.postgres
+
+BENCHMARK_REVIEWS = 10_000_000
+BENCHMARK_SELLERS = 20_000
+
+async def _metrics(user_id):
+    from app.core.database import AsyncSessionLocal
+    from app.models.reputation import ReputationMetric
+    from app.services.reputation import COUNTERS
+
+    async with AsyncSessionLocal() as db:
+        metric = await db.scalar(select(ReputationMetric).where(ReputationMetric.user_id == user_id))
+    return {name: getattr(metric, name) for name in (*COUNTERS, "overall_score")}
+
+async def test_replayed_events_move_counters_once(client):
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order, OrderStatus
+    from app.models.reputation import Review
+    from app.services.reputation import reputation_aggregator
+
+    buyer_id, seller_id = await create_buyers(2)
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        order = Order(buyer_id=buyer_id, seller_id=seller_id, amount=100, delivery_deadline=now + timedelta(days=1))
+        db.add(order)
+        await db.flush()
+        db.add_all([
+            Review(reviewer_id=buyer_id, reviewed_user_id=seller_id, order_id=order.id, rating=rating, category="overall")
+            for rating in (5, 3, 1)
+        ])
+        await db.commit()
+        order_id = order.id
+
+    # Completing the same order twice, as a status flip-flop would
+    async with AsyncSessionLocal() as db:
+        for status in (OrderStatus.COMPLETED, OrderStatus.DISPUTED, OrderStatus.COMPLETED):
+            order = await db.get(Order, order_id)
+            order.status = status
+            order.completion_date = now
+            await db.commit()
+
+    expected = {
+        "total_orders": 1, "completed_orders": 1, "on_time_deliveries": 1,
+        "total_reviews": 3, "positive_reviews": 1, "neutral_reviews": 1, "negative_reviews": 1,
+    }
+    metrics = await _metrics(seller_id)
+    assert {name: value for name, value in metrics.items() if name != "overall_score"} == expected
+    # Reviews average 50%; every order was completed on time
+    assert metrics["overall_score"] == pytest.approx(0.5 * 50 + 0.3 * 100 + 0.2 * 100)
+
+    # The same event delivered again is claimed once
+    duplicates = reputation_aggregator.duplicates
+    async with AsyncSessionLocal() as db:
+        for _ in range(2):
+            await db.run_sync(lambda session: reputation_aggregator.apply(
+                session.connection(), "review:replayed", seller_id, {"total_reviews": 1, "positive_reviews": 1}
+            ))
+        await db.commit()
+    metrics = await _metrics(seller_id)
+    assert (metrics["total_reviews"], metrics["positive_reviews"]) == (4, 2)
+    assert reputation_aggregator.duplicates - duplicates == 1
+
+async def test_reconcile_reports_and_fixes_drift(client):
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order, OrderStatus
+    from app.models.reputation import ReputationMetric, Review
+    from app.services.reputation import reputation_aggregator
+
+    buyer_id, seller_id, other_id = await create_buyers(3)
+    async with AsyncSessionLocal() as db:
+        order = Order(buyer_id=buyer_id, seller_id=seller_id, amount=100, status=OrderStatus.COMPLETED)
+        db.add(order)
+        await db.flush()
+        db.add(Review(reviewer_id=buyer_id, reviewed_user_id=seller_id, order_id=order.id, rating=4, category="overall"))
+        await db.commit()
+    correct = await _metrics(seller_id)
+
+    async with AsyncSessionLocal() as db:
+        assert (await reputation_aggregator.reconcile(db))["drifted_users"] == 0
+
+    # A corrupted counter, and a review inserted behind the ORM's back
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(ReputationMetric).where(ReputationMetric.user_id == seller_id).values(positive_reviews=99, overall_score=0)
+        )
+        await db.execute(text(
+            "INSERT INTO reviews (id, reviewer_id, reviewed_user_id, order_id, rating, category) "
+            "VALUES (gen_random_uuid(), :buyer, :other, :order, 2, 'overall')"
+        ), {"buyer": buyer_id, "other": other_id, "order": order.id})
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        report = await reputation_aggregator.reconcile(db)
+    assert report["drifted_users"] == 2
+    assert set(report["drift_sample"]) == {str(seller_id), str(other_id)}
+    assert await _metrics(seller_id) == pytest.approx(correct)
+    assert (await _metrics(other_id))["negative_reviews"] == 1
+    assert reputation_aggregator.stats()["last_reconciliation"] == report
+
+    async with AsyncSessionLocal() as db:
+        assert (await reputation_aggregator.reconcile(db))["drifted_users"] == 0
+
+async def test_reconcile_ten_million_reviews(client):
+    """Benchmark: nightly reconciliation over 10M reviews, then incremental updates at that size"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.reputation import Review
+    from app.services.reputation import reputation_aggregator
+
+    buyer_id, *seller_ids = await create_buyers(BENCHMARK_SELLERS + 1)
+    async with AsyncSessionLocal() as db:
+        # One order per seller, every review of a seller hangs off it
+        await db.execute(text(
+            "INSERT INTO orders (id, buyer_id, seller_id, amount, status, payment_status) "
+            "SELECT gen_random_uuid(), :buyer, seller, 100, 'COMPLETED', 'PAID' FROM unnest(CAST(:sellers AS uuid[])) AS seller"
+        ), {"buyer": buyer_id, "sellers": seller_ids})
+        await db.execute(text(
+            "INSERT INTO reviews (id, reviewer_id, reviewed_user_id, order_id, rating, category) "
+            "SELECT gen_random_uuid(), :buyer, orders.seller_id, orders.id, 1 + i % 5, 'overall' "
+            "FROM generate_series(1, :reviews) AS i JOIN orders ON orders.seller_id = (CAST(:sellers AS uuid[]))[1 + i % :count]"
+        ), {"buyer": buyer_id, "sellers": seller_ids, "reviews": BENCHMARK_REVIEWS, "count": BENCHMARK_SELLERS})
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        report = await reputation_aggregator.reconcile(db)
+    assert report["drifted_users"] == BENCHMARK_SELLERS
+
+    # Incremental updates don't get slower with the table's size
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        order_id = await db.scalar(text("SELECT id FROM orders WHERE seller_id = :seller"), {"seller": seller_ids[0]})
+        for _ in range(100):
+            db.add(Review(reviewer_id=buyer_id, reviewed_user_id=seller_ids[0], order_id=order_id, rating=5, category="overall"))
+            await db.commit()
+    per_review_ms = (time.perf_counter() - started) * 10
+
+    metrics = await _metrics(seller_ids[0])
+    assert metrics["total_reviews"] == BENCHMARK_REVIEWS // BENCHMARK_SELLERS + 100
+    async with AsyncSessionLocal() as db:
+        assert (await reputation_aggregator.reconcile(db))["drifted_users"] == 0
+    summary = f"reconcile {report['duration_ms'] / 1000:.1f}s, {per_review_ms:.1f}ms per incremental review"
+    assert report["duration_ms"] < 60_000, summary
+    assert per_review_ms < 20, summary
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from sqlalchemy import or_, select
+
+from helpers import auth_headers, create_buyers, seed_rfps
+
+pytestmark = pytest.mark.postgres
+
+RFPS = 1_000_000
+LIMIT = 20
+# Filters to list by, and how deep a page to compare with the first
+LISTINGS = [
+    ({}, 10_000),
+    ({"status": "published"}, 10_000),
+    ({"category": "hardware"}, 5_000),
+    ({"category": "hardware", "status": "closed"}, 500),
+]
+ROUNDS = 10
+
+async def _cursor_for_page(buyer_id, params, page):
+    """The cursor a client would hold after paging ``page - 1`` times, computed by offset"""
+    from app.core.database import AsyncSessionLocal
+    from app.core.pagination import encode_cursor
+    from app.models.rfp import RFP, RFPStatus
+
+    query = select(RFP.created_at, RFP.id).where(or_(RFP.is_private.is_(False), RFP.buyer_id == buyer_id))
+    if "category" in params:
+        query = query.where(RFP.category == params["category"])
+    if "status" in params:
+        query = query.where(RFP.status == RFPStatus(params["status"]))
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            query.order_by(RFP.created_at.desc(), RFP.id.desc()).offset((page - 1) * LIMIT - 1).limit(1)
+        )).one()
+    return encode_cursor(row.created_at, row.id)
+
+async def _time(client, headers, params):
+    """Median latency in ms of listing a page, and the last response"""
+    samples = []
+    for _ in range(ROUNDS + 1):
+        started = time.perf_counter()
+        response = await client.get("/api/v1/rfps/", headers=headers, params={"limit": LIMIT, **params})
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    # The first round warms the buffer cache and the principal cache
+    samples = sorted(samples[1:])
+    return samples[len(samples) // 2], response
+
+async def test_deep_pages_are_as_fast_as_the_first(client):
+    """Over 1M RFPs, page 10,000 of a listing costs about what page 1 does"""
+    buyer_ids = await create_buyers(1000)
+    await seed_rfps(RFPS, buyer_ids)
+    # A buyer with about 1k RFPs of their own, a tenth of them private
+    headers = auth_headers(buyer_ids[0])
+
+    report = {}
+    for params, page in LISTINGS:
+        cursor = await _cursor_for_page(buyer_ids[0], params, page)
+        first, _ = await _time(client, headers, params)
+        deep, response = await _time(client, headers, {**params, "cursor": cursor})
+        body = response.json()
+        assert len(body["items"]) == LIMIT
+        assert body["next_cursor"] is not None
+        report[str(params)] = (page, first, deep)
+
+    summary = " ".join(f"{params} page 1={first:.1f}ms page {page}={deep:.1f}ms" for params, (page, first, deep) in report.items())
+    for page, first, deep in report.values():
+        assert deep < 2 * first + 5, summary
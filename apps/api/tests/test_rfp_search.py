@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.rfp import RFPStatus
+from app.services.rfp_search import InvertedIndex, budget_bucket
+
+BUYER = str(uuid.uuid4())
+OTHER_BUYER = str(uuid.uuid4())
+
+def _rfp(title, description="", category="hardware", status=RFPStatus.PUBLISHED, budget_max=2000,
+         is_private=False, buyer_id=BUYER, age_days=0, specifications=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        title=title,
+        description=description,
+        requirements={"specifications": specifications} if specifications else None,
+        category=category,
+        status=status,
+        budget_min=None,
+        budget_max=budget_max,
+        is_private=is_private,
+        buyer_id=buyer_id,
+        created_at=datetime(2024, 1, 1) - timedelta(days=age_days),
+    )
+
+def _index(*rfps):
+    index = InvertedIndex()
+    for rfp in rfps:
+        index.upsert(rfp)
+    return index
+
+def _search(index, q=None, user_id=BUYER, category=None, status=None, budget=None, limit=20, offset=0):
+    return index.search(q, user_id, category, status, budget, limit, offset)
+
+def test_title_matches_outrank_description_and_specification_matches():
+    in_specs = _rfp("Office refresh", specifications=["laptop docking stations"])
+    in_description = _rfp("Office refresh", "Twenty laptops for the sales team")
+    in_title = _rfp("Laptops for sales", "Twenty machines")
+    index = _index(in_specs, in_description, in_title, _rfp("Standing desks"))
+
+    hits, total, _ = _search(index, "laptop")
+
+    assert [rfp_id for rfp_id, _ in hits] == [str(in_title.id), str(in_description.id), str(in_specs.id)]
+    assert total == 3
+    assert hits[0][1] > hits[1][1] > hits[2][1] > 0
+
+def test_equal_scores_list_newest_first():
+    older, newer = _rfp("Laptops", age_days=3), _rfp("Laptops", age_days=1)
+    hits, _, _ = _search(_index(older, newer), "laptops")
+    assert [rfp_id for rfp_id, _ in hits] == [str(newer.id), str(older.id)]
+
+def test_every_query_term_must_match():
+    both = _rfp("Dell laptops")
+    only_laptop = _rfp("Lenovo laptops")
+    only_dell = _rfp("Dell monitors")
+    index = _index(both, only_laptop, only_dell)
+
+    hits, total, _ = _search(index, "dell laptop")
+    assert [rfp_id for rfp_id, _ in hits] == [str(both.id)]
+    assert total == 1
+    # A term no RFP contains matches nothing rather than being ignored
+    assert _search(index, "dell tablets")[1] == 0
+
+def test_facet_counts_ignore_their_own_filter():
+    index = _index(
+        _rfp("Laptops", category="hardware", status=RFPStatus.PUBLISHED, budget_max=2000),
+        _rfp("Laptops", category="hardware", status=RFPStatus.CLOSED, budget_max=20000),
+        _rfp("Laptop repair", category="services", status=RFPStatus.PUBLISHED, budget_max=500),
+        _rfp("Desks", category="furniture", status=RFPStatus.PUBLISHED, budget_max=2000),
+    )
+
+    hits, total, facets = _search(index, "laptop", category="hardware", status=RFPStatus.PUBLISHED.value)
+
+    assert total == len(hits) == 1
+    # Other categories are counted under the status filter, so the client can switch to them
+    assert facets["category"] == {"hardware": 1, "services": 1}
+    assert facets["status"] == {RFPStatus.PUBLISHED.value: 1, RFPStatus.CLOSED.value: 1}
+    assert facets["budget"] == {budget_bucket(None, 2000): 1}
+
+def test_private_rfps_are_only_visible_to_their_buyer():
+    public = _rfp("Laptops")
+    private = _rfp("Laptops", is_private=True)
+    index = _index(public, private)
+
+    own_hits, own_total, own_facets = _search(index, "laptops", user_id=BUYER)
+    other_hits, other_total, other_facets = _search(index, "laptops", user_id=OTHER_BUYER)
+
+    assert {rfp_id for rfp_id, _ in own_hits} == {str(public.id), str(private.id)}
+    assert [rfp_id for rfp_id, _ in other_hits] == [str(public.id)]
+    assert (own_total, other_total) == (2, 1)
+    assert own_facets["category"] == {"hardware": 2}
+    assert other_facets["category"] == {"hardware": 1}
+
+def test_updates_and_removals_reach_the_postings():
+    rfp = _rfp("Laptops")
+    index = _index(rfp, _rfp("Desks"))
+
+    rfp.title = "Monitors"
+    index.upsert(rfp)
+    assert _search(index, "laptops")[1] == 0
+    assert _search(index, "monitors")[1] == 1
+
+    index.remove(str(rfp.id))
+    assert _search(index, "monitors")[1] == 0
+    assert "monitor" not in index.postings
+
+@pytest.mark.parametrize("offset, expected", [(0, 2), (2, 1), (3, 0)])
+def test_pages_are_slices_of_the_full_ranking(offset, expected):
+    index = _index(*[_rfp("Laptops", age_days=i) for i in range(3)])
+    hits, total, _ = _search(index, "laptops", limit=2, offset=offset)
+    assert (len(hits), total) == (expected, 3)
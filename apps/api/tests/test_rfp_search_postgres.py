@@ -0,0 +1,98 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import auth_headers, create_buyers, seed_rfps
+
+pytestmark = pytest.mark.postgres
+
+RFPS = 1_000_000
+QUERIES = [
+    {"q": "laptop"},
+    {"q": "solar panel"},
+    {"q": "freight logistics", "category": "logistics"},
+    {"q": "security audit", "status": "published"},
+    {"q": "steel", "budget": "10k_50k"},
+    {"category": "hardware"},
+    {"q": "catering", "offset": 200},
+]
+ROUNDS = 10
+P95_MS = 50
+
+async def _add_rfps(buyer_id, rfps):
+    from app.core.database import AsyncSessionLocal
+    from app.models.rfp import RFP, RFPStatus
+
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        for age, (title, description, category, status, budget_max, is_private) in enumerate(rfps):
+            db.add(RFP(
+                title=title, description=description, category=category, status=RFPStatus(status),
+                budget_max=budget_max, is_private=is_private, buyer_id=buyer_id,
+                deadline=now + timedelta(days=30), created_at=now - timedelta(minutes=age),
+            ))
+        await db.commit()
+
+async def test_search_ranks_filters_and_counts_facets(client):
+    from app.services import rfp_search
+
+    owner_id, other_id = await create_buyers(2)
+    await _add_rfps(owner_id, [
+        ("Laptops for sales", "Twenty machines", "hardware", "published", 2000, False),
+        ("Office refresh", "Twenty laptops for the sales team", "hardware", "closed", 20000, False),
+        ("Laptop repair", "Fix our fleet", "services", "published", 500, False),
+        ("Private laptop order", "Confidential", "hardware", "published", 2000, True),
+        ("Standing desks", "For the office", "furniture", "published", 2000, False),
+    ])
+    rfp_search._public_facets.clear()
+
+    response = await client.get("/api/v1/rfps/search", headers=auth_headers(other_id), params={"q": "laptops"})
+    body = response.json()
+    assert [item["title"] for item in body["items"]] == ["Laptops for sales", "Laptop repair", "Office refresh"]
+    assert body["total"] == 3
+    assert body["facets"]["category"] == {"hardware": 2, "services": 1}
+
+    # The owner also sees their private RFP; a facet's own filter doesn't narrow it
+    response = await client.get(
+        "/api/v1/rfps/search", headers=auth_headers(owner_id), params={"q": "laptop", "category": "hardware", "status": "published"}
+    )
+    body = response.json()
+    assert {item["title"] for item in body["items"]} == {"Laptops for sales", "Private laptop order"}
+    assert body["facets"]["category"] == {"hardware": 2, "services": 1}
+    assert body["facets"]["status"] == {"published": 2, "closed": 1}
+    assert body["facets"]["budget"] == {"1k_5k": 2}
+
+    # Without a query: newest first, the same facet rules
+    for headers, titles, total in [
+        (auth_headers(other_id), ["Laptops for sales", "Office refresh"], 2),
+        (auth_headers(owner_id), ["Laptops for sales", "Office refresh", "Private laptop order"], 3),
+    ]:
+        response = await client.get("/api/v1/rfps/search", headers=headers, params={"category": "hardware"})
+        body = response.json()
+        assert [item["title"] for item in body["items"]] == titles
+        assert body["total"] == total
+        assert body["facets"]["category"]["furniture"] == 1
+
+async def test_search_p95_over_a_million_rfps(client):
+    """Ranked search with facets stays under 50 ms at p95 over 1M RFPs"""
+    buyer_ids = await create_buyers(1000)
+    await seed_rfps(RFPS, buyer_ids)
+    # A buyer with about 1k RFPs of their own, a tenth of them private
+    headers = auth_headers(buyer_ids[0])
+
+    timings = {}
+    for params in QUERIES:
+        samples = []
+        for _ in range(ROUNDS + 1):
+            started = time.perf_counter()
+            response = await client.get("/api/v1/rfps/search", headers=headers, params=params)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+        # The first round warms the buffer cache and the principal cache
+        timings[str(params)] = sorted(samples[1:])
+
+    everything = sorted(sample for samples in timings.values() for sample in samples)
+    p95 = everything[int(0.95 * len(everything)) - 1]
+    report = {params: f"p50={samples[len(samples) // 2]:.1f}ms max={samples[-1]:.1f}ms" for params, samples in timings.items()}
+    assert p95 < P95_MS, f"p95={p95:.1f}ms {report}"
@@ -0,0 +1,114 @@
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select, update
+
+from helpers import create_buyers
+
+pytestmark = pytest.mark.postgres
+
+ORDERS_PER_OUTCOME = 10
+WEBHOOK = "/api/v1/payments/stripe/webhook"
+SECRET = "whsec_test"
+
+async def _create_orders(count: int):
+    """Unpaid orders between two fresh users; returns their ids and amounts"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order
+
+    buyer_id, seller_id = await create_buyers(2)
+    orders = [(uuid.uuid4(), 10 + i * 7.5) for i in range(count)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            insert(Order),
+            [{"id": order_id, "buyer_id": buyer_id, "seller_id": seller_id, "amount": amount} for order_id, amount in orders],
+        )
+        await db.commit()
+    return orders
+
+async def test_shuffled_redeliveries_settle_every_order(client, monkeypatch):
+    """Duplicated, shuffled deliveries: each event is stored once and every order ends in its outcome's state"""
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal
+    from app.models.order import Order, OrderStatus, PaymentStatus
+    from app.models.payment import StripeEvent
+    from app.services.fake_stripe import OUTCOMES, FakeStripe
+    from app.services.stripe_events import StripeEventProcessor, stripe_events
+
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", SECRET)
+    fake = FakeStripe(SECRET, seed=7)
+    processor = StripeEventProcessor(batch_size=8, max_batches=50, retry_hours=72, escrow_hold_days=7)
+
+    orders = await _create_orders(ORDERS_PER_OUTCOME * len(OUTCOMES) + 1)
+    # The last order's payment never arrives, only its refund
+    *orders, orphan = orders
+    outcomes = {order_id: list(OUTCOMES)[i % len(OUTCOMES)] for i, (order_id, _) in enumerate(orders)}
+    created = int(time.time()) - 600
+    events = []
+    for order_id, amount in orders:
+        events.extend(fake.payment_events(str(order_id), amount, outcomes[order_id], created))
+    orphan_refund = fake.payment_events(str(orphan[0]), orphan[1], "refunded", created)[-1]
+
+    # Refunds arriving before their payments wait for them
+    refunds = [event for event in events if event["type"] == "charge.refunded"] + [orphan_refund]
+    responses = await fake.deliver(client, WEBHOOK, fake.deliveries(refunds, duplicate_rate=0.5))
+    assert {response.status_code for response in responses} == {200}
+    await processor.run(AsyncSessionLocal)
+    assert processor.deferred == len(refunds)
+    assert processor.applied == 0
+
+    async with AsyncSessionLocal() as db:
+        waiting = (await db.execute(select(StripeEvent))).scalars().all()
+    assert all(event.processed_at is None and event.attempts == 1 for event in waiting)
+    assert all(event.next_attempt_at > datetime.utcnow() for event in waiting)
+
+    # Everything again, refunds included, duplicated and out of order
+    duplicates_before = stripe_events.duplicates
+    requests = fake.deliveries(events, duplicate_rate=0.3)
+    responses = await fake.deliver(client, WEBHOOK, requests)
+    assert {response.status_code for response in responses} == {200}
+    await processor.run(AsyncSessionLocal)
+
+    async with AsyncSessionLocal() as db:
+        stored = await db.scalar(select(func.count()).select_from(StripeEvent))
+        result = await db.execute(select(Order.id, Order.status, Order.payment_status, Order.payment_intent_id))
+        final = {row.id: row for row in result}
+
+    # Each event is stored once however often it was delivered
+    assert stored == len(events) + 1
+    assert stripe_events.duplicates - duplicates_before == len(requests) - (len(events) - len(refunds) + 1)
+
+    expected = {
+        "succeeded": (OrderStatus.PAID, PaymentStatus.PAID),
+        "failed_then_succeeded": (OrderStatus.PAID, PaymentStatus.PAID),
+        "failed": (OrderStatus.PENDING, PaymentStatus.FAILED),
+        "refunded": (OrderStatus.CANCELLED, PaymentStatus.REFUNDED),
+    }
+    states = Counter()
+    for order_id, outcome in outcomes.items():
+        row = final[order_id]
+        assert (row.status, row.payment_status) == expected[outcome], outcome
+        assert row.payment_intent_id is not None
+        states[outcome] += 1
+    assert set(states.values()) == {ORDERS_PER_OUTCOME}
+    assert (final[orphan[0]].status, final[orphan[0]].payment_status) == (OrderStatus.PENDING, PaymentStatus.PENDING)
+
+    # The orphan's refund keeps waiting until the retry window closes, then is dropped
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(StripeEvent)
+            .where(StripeEvent.id == orphan_refund["id"])
+            .values(next_attempt_at=None, received_at=datetime.utcnow() - timedelta(hours=73))
+        )
+        await db.commit()
+    assert await processor.run(AsyncSessionLocal) == 1
+    async with AsyncSessionLocal() as db:
+        dropped = await db.get(StripeEvent, orphan_refund["id"])
+        pending = await db.scalar(select(func.count()).select_from(StripeEvent).where(StripeEvent.processed_at.is_(None)))
+    assert dropped.processed_at is not None
+    assert dropped.error == "No order could take this event"
+    assert pending == 0
+    assert processor.dropped == 1